@@ -311,6 +311,7 @@ class WindSpeedRecalculation(DatabaseFix):
         max_update_str = "UPDATE %s_day_%s SET %s=?,%s=? " \
                          "WHERE datetime=?" % (self.dbm.table_name, obs, 'max', 'maxtime')
         _cursor.execute(max_update_str, (value, when_ts, row_ts))
+        self.dbm.mark_dirty([row_ts], _cursor)
         if cursor is None:
             _cursor.close()
 
@@ -412,41 +413,44 @@ class CalcMissing(DatabaseFix):
             with weedb.Transaction(self.dbm.connection) as _cursor:
                 # iterate over each day in the tranche we are to work in
                 for tranche_day in weeutil.weeutil.genDaySpans(tr_start_ts, tr_stop_ts):
-                    # initialise a counter for records processed on this day
-                    records_updated = 0
-                    # iterate over each record in this day
-                    for record in self.dbm.genBatchRecords(startstamp=tranche_day.start,
-                                                           stopstamp=tranche_day.stop):
-                        # but we are only concerned with records after the
-                        # start and before or equal to the stop timestamps
-                        if self.start_ts < record['dateTime'] <= self.stop_ts:
-                            # first obtain a list of the fields that may be calculated
-                            extras_list = []
-                            for obs in wxcalculate.calc_dict:
-                                directive = wxcalculate.calc_dict[obs]
-                                if directive == 'software' \
-                                        or directive == 'prefer_hardware' \
-                                        and (obs not in record or record[obs] is None):
-                                    extras_list.append(obs)
-
-                            # calculate the missing derived fields for the record
-                            wxcalculate.do_calculations(record)
-
-                            # Obtain a new record dictionary that contains only those items
-                            # that wxcalculate calculated. Use dictionary comprehension.
-                            extras_dict = {k: v for (k, v) in record.items() if k in extras_list}
-
-                            # update the archive with the calculated data
-                            records_updated += self.update_record_fields(record['dateTime'],
-                                                                         extras_dict)
-                            # update the total records processed
-                            total_records_processed += 1
-                        # Give the user some information on progress
-                        if total_records_processed % 1000 == 0:
-                            p_msg = "Processing record: %d; Last record: %s" \
-                                    % (total_records_processed,
-                                       timestamp_to_string(record['dateTime']))
-                            self._progress(p_msg)
+                    # Gather the records in this day, but we are only concerned with records
+                    # after the start and before or equal to the stop timestamps
+                    records = [record for record in
+                               self.dbm.genBatchRecords(startstamp=tranche_day.start,
+                                                        stopstamp=tranche_day.stop)
+                               if self.start_ts < record['dateTime'] <= self.stop_ts]
+
+                    updates = []
+                    for record in records:
+                        # first obtain a list of the fields that may be calculated
+                        extras_list = []
+                        for obs in wxcalculate.calc_dict:
+                            directive = wxcalculate.calc_dict[obs]
+                            if directive == 'software' \
+                                    or directive == 'prefer_hardware' \
+                                    and (obs not in record or record[obs] is None):
+                                extras_list.append(obs)
+
+                        # calculate the missing derived fields for the record
+                        wxcalculate.do_calculations(record)
+
+                        # Obtain a new record dictionary that contains only those items
+                        # that wxcalculate calculated. Use dictionary comprehension.
+                        updates.append((record['dateTime'],
+                                        {k: v for (k, v) in record.items() if k in extras_list}))
+
+                    # update the archive with the calculated data, a day at a time
+                    records_updated = self.update_records_fields(updates, _cursor)
+
+                    # Give the user some information on progress
+                    if records and (total_records_processed + len(records)) // 1000 \
+                            > total_records_processed // 1000:
+                        p_msg = "Processing record: %d; Last record: %s" \
+                                % (total_records_processed + len(records),
+                                   timestamp_to_string(records[-1]['dateTime']))
+                        self._progress(p_msg)
+                    # update the total records processed
+                    total_records_processed += len(records)
                     # update the total records updated
                     total_records_updated += records_updated
                     # if we updated any records on this day increment the count
@@ -558,6 +562,49 @@ class CalcMissing(DatabaseFix):
         # there were no fields to update so return 0
         return 0
 
+    def update_records_fields(self, updates, cursor=None):
+        """Updates fields in many archive records, using batched update queries.
+
+        Records that update the same set of fields share a single update statement, which is
+        executed for all of them at once.
+
+        Args:
+            updates (list[tuple]): A list of two-way tuples. The first element is the epoch
+                timestamp of the record to be updated, the second a dictionary containing the
+                updated data in field name-value pairs.
+            cursor (weedb.Cursor): sqlite cursor
+
+        Returns:
+            int: The number of records updated.
+        """
+
+        # Group the updates by the fields they update. Only data types that appear in the
+        # database schema can be updated.
+        batches = {}
+        for ts, record in updates:
+            key_tuple = tuple(sorted(set(record.keys()).intersection(self.dbm.sqlkeys)))
+            # only update if we have data for at least one field that is in the schema
+            if key_tuple:
+                batches.setdefault(key_tuple, []).append(
+                    tuple(record[k] for k in key_tuple) + (ts,))
+
+        # obtain a cursor if we don't have one
+        _cursor = cursor or self.dbm.connection.cursor()
+        nrecs = 0
+        for key_tuple, value_tuples in batches.items():
+            # Enclose field names in backquotes, just in case. See update_record_fields().
+            set_str = ','.join(["`%s`=?" % k for k in key_tuple])
+            sql_update_stmt = "UPDATE %s SET %s WHERE dateTime=?" % (self.dbm.table_name,
+                                                                     set_str)
+            # execute the update statement but only if it's not a dry run
+            if not self.dry_run:
+                _cursor.executemany(sql_update_stmt, value_tuples)
+            nrecs += len(value_tuples)
+        # close the cursor if we opened one
+        if cursor is None:
+            _cursor.close()
+        return nrecs
+
     @staticmethod
     def _progress(message, overprint=True):
         """Utility function to show our progress."""
@@ -0,0 +1,117 @@
+#
+#    Copyright (c) 2009-2024 Tom Keffer <tkeffer@gmail.com>
+#
+#    See the file LICENSE.txt for your full rights.
+#
+"""Test the database utilities."""
+import shutil
+import tempfile
+import unittest
+
+import configobj
+
+import weecfg.database
+import weewx
+import weewx.manager
+
+START_TS = 1719817200
+INTERVAL = 300
+
+CONFIG_STR = """
+[DataBindings]
+    [[wx_binding]]
+        database = archive_sqlite
+        table_name = archive
+        manager = weewx.manager.DaySummaryManager
+        schema = schemas.wview_extended.schema
+[Databases]
+    [[archive_sqlite]]
+        database_name = weewx.sdb
+        database_type = SQLite
+[DatabaseTypes]
+    [[SQLite]]
+        driver = weedb.sqlite
+"""
+
+
+class SpyCursor:
+    """Wraps a cursor, recording the calls to executemany()"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.calls = []
+
+    def executemany(self, sql_string, seq_of_tuples):
+        seq_of_tuples = list(seq_of_tuples)
+        self.calls.append((sql_string, seq_of_tuples))
+        return self.cursor.executemany(sql_string, seq_of_tuples)
+
+
+class CalcMissingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sqlite_root = tempfile.mkdtemp()
+        self.config_dict = configobj.ConfigObj(CONFIG_STR.splitlines(), encoding='utf-8')
+        self.config_dict['WEEWX_ROOT'] = self.sqlite_root
+        self.config_dict['DatabaseTypes']['SQLite']['SQLITE_ROOT'] = self.sqlite_root
+        with weewx.manager.open_manager_with_config(self.config_dict, 'wx_binding',
+                                                    initialize=True) as dbm:
+            dbm.addRecord([{'dateTime': START_TS + i * INTERVAL, 'usUnits': weewx.US,
+                            'interval': INTERVAL // 60, 'outTemp': 60.0 + i,
+                            'outHumidity': 50.0}
+                           for i in range(1, 7)])
+
+    def tearDown(self):
+        shutil.rmtree(self.sqlite_root, ignore_errors=True)
+
+    def calc_missing(self, dry_run):
+        return weecfg.database.CalcMissing(self.config_dict,
+                                           {'name': 'test', 'binding': 'wx_binding',
+                                            'start_ts': START_TS,
+                                            'stop_ts': START_TS + 7 * INTERVAL,
+                                            'dry_run': dry_run})
+
+    def updates(self):
+        return [(START_TS + 1 * INTERVAL, {'dewpoint': 40.0, 'heatindex': 61.0}),
+                (START_TS + 2 * INTERVAL, {'heatindex': 62.0, 'dewpoint': 41.0}),
+                (START_TS + 3 * INTERVAL, {'dewpoint': 42.0}),
+                # Types that are not in the schema are left out
+                (START_TS + 4 * INTERVAL, {'dewpoint': 43.0, 'notInSchema': 1.0}),
+                # Records with nothing to update are skipped
+                (START_TS + 5 * INTERVAL, {'notInSchema': 1.0}),
+                (START_TS + 6 * INTERVAL, {})]
+
+    def get_rows(self, dbm):
+        return list(dbm.genSql("SELECT dateTime, dewpoint, heatindex FROM archive "
+                               "ORDER BY dateTime"))
+
+    def test_update_records_fields(self):
+        calc_missing = self.calc_missing(False)
+        with calc_missing.dbm as dbm:
+            cursor = SpyCursor(dbm.connection.cursor())
+            self.assertEqual(calc_missing.update_records_fields(self.updates(), cursor), 4)
+            # There is one statement for each set of fields
+            self.assertEqual(len(cursor.calls), 2)
+            self.assertEqual(sorted(len(values) for _, values in cursor.calls), [2, 2])
+            dbm.connection.commit()
+            self.assertEqual(self.get_rows(dbm),
+                             [(START_TS + 1 * INTERVAL, 40.0, 61.0),
+                              (START_TS + 2 * INTERVAL, 41.0, 62.0),
+                              (START_TS + 3 * INTERVAL, 42.0, None),
+                              (START_TS + 4 * INTERVAL, 43.0, None),
+                              (START_TS + 5 * INTERVAL, None, None),
+                              (START_TS + 6 * INTERVAL, None, None)])
+
+    def test_update_records_fields_dry_run(self):
+        calc_missing = self.calc_missing(True)
+        with calc_missing.dbm as dbm:
+            cursor = SpyCursor(dbm.connection.cursor())
+            # The records are counted, but not updated
+            self.assertEqual(calc_missing.update_records_fields(self.updates(), cursor), 4)
+            self.assertEqual(cursor.calls, [])
+            self.assertEqual(self.get_rows(dbm),
+                             [(START_TS + i * INTERVAL, None, None) for i in range(1, 7)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,6 +14,7 @@ import weewx
 import weewx.engine
 import weewx.manager
 import weewx.reportengine
+import weewx.reportprofile
 import weewx.station
 from weeutil.weeutil import bcolors, timestamp_to_string, to_bool
 
@@ -50,7 +51,8 @@ def list_reports(config_dict):
 def run_reports(config_dict,
                 epoch=None,
                 report_date=None, report_time=None,
-                reports=None):
+                reports=None,
+                profile_file=None, sort_by='total', top=20):
     if reports:
         print(f"The following reports will be run: {', '.join(reports)}")
     else:
@@ -96,6 +98,14 @@ def run_reports(config_dict,
         ts = gen_ts or db_manager.lastGoodStamp()
         record = db_manager.getRecord(ts)
 
+    if profile_file:
+        # Reports running in other processes could not be timed. Run them one at a time.
+        config_dict['StdReport']['report_workers'] = 1
+        profile = weewx.reportprofile.ReportProfile(config_dict['WEEWX_ROOT'])
+        profile.install()
+    else:
+        profile = None
+
     # Instantiate the report engine with the retrieved record and required timestamp
     t = weewx.reportengine.StdReportEngine(config_dict, stn_info, record=record, gen_ts=ts)
 
@@ -104,6 +114,14 @@ def run_reports(config_dict,
         t.run(reports)
     except KeyError as e:
         print(f"Unknown report: {e}", file=sys.stderr)
+    finally:
+        if profile:
+            profile.uninstall()
+
+    if profile:
+        profile.print_table(sort_by, top)
+        profile.save(profile_file)
+        print(f"Profile saved to {profile_file}")
 
     # Shut down any running services,
     engine.shutDown()
@@ -10,6 +10,7 @@ import time
 import weecfg
 import weectllib
 import weectllib.report_actions
+import weewx.reportprofile
 from weeutil.weeutil import bcolors
 
 report_list_usage = f"""{bcolors.BOLD}weectl report list
@@ -17,7 +18,9 @@ report_list_usage = f"""{bcolors.BOLD}weectl report list
 """
 report_run_usage = f"""  {bcolors.BOLD}weectl report run [NAME ...]
             [--config=FILENAME]
-            [--epoch=EPOCH_TIME | --date=YYYY-mm-dd --time=HH:MM]{bcolors.ENDC}
+            [--epoch=EPOCH_TIME | --date=YYYY-mm-dd --time=HH:MM]
+            [--profile [--profile-file=FILENAME]
+                [--sort=(total|count|max|name)] [--top=N]]{bcolors.ENDC}
 """
 
 report_usage = '\n     '.join((report_list_usage, report_run_usage))
@@ -67,6 +70,19 @@ def add_subparser(subparsers):
     run_report_parser.add_argument("--time", metavar="HH:MM",
                                    type=lambda t: time.strptime(t, '%H:%M'),
                                    help="Time of day for the report")
+    run_report_parser.add_argument("--profile", action="store_true",
+                                   help="Time each report, template, plot, and tag. Print the "
+                                        "slowest ones, and save all of them to a JSON file.")
+    run_report_parser.add_argument("--profile-file", metavar="FILENAME",
+                                   default="report-profile.json",
+                                   help="Where to save the profile. "
+                                        "Default is 'report-profile.json'.")
+    run_report_parser.add_argument("--sort", choices=weewx.reportprofile.SORT_KEYS,
+                                   default='total',
+                                   help="How to sort the profile tables. Default is 'total'.")
+    run_report_parser.add_argument("--top", metavar="N", type=int, default=20,
+                                   help="How many rows to print in each profile table. "
+                                        "Default is 20.")
     run_report_parser.add_argument('reports',
                                    nargs="*",
                                    metavar='NAME',
@@ -93,4 +109,7 @@ def run_reports(config_dict, namespace):
     weectllib.report_actions.run_reports(config_dict,
                                          epoch=namespace.epoch,
                                          report_date=namespace.date, report_time=namespace.time,
-                                         reports=namespace.reports)
+                                         reports=namespace.reports,
+                                         profile_file=namespace.profile_file
+                                         if namespace.profile else None,
+                                         sort_by=namespace.sort, top=namespace.top)
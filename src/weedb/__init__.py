@@ -201,7 +201,13 @@ class Connection:
 
 
 class Cursor:
-    pass
+
+    def executemany(self, sql_string, seq_of_tuples):
+        """Execute a sql statement once for each tuple in seq_of_tuples. Drivers that can do
+        this more efficiently should override it."""
+        for sql_tuple in seq_of_tuples:
+            self.execute(sql_string, sql_tuple)
+        return self
 
 
 class Transaction:
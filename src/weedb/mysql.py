@@ -253,6 +253,17 @@ class Cursor(weedb.Cursor):
 
         return self
 
+    @guard
+    def executemany(self, sql_string, seq_of_tuples):
+        """Execute a SQL statement on the MySQL server, once for each tuple in seq_of_tuples."""
+
+        # MySQL uses '%s' as placeholders, so replace the ?'s with %s
+        mysql_string = sql_string.replace('?', '%s')
+
+        self.cursor.executemany(mysql_string, [tuple(sql_tuple) for sql_tuple in seq_of_tuples])
+
+        return self
+
     @property
     def rowcount(self):
         """Return the number of rows affected by the last execute() call."""
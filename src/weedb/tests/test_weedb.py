@@ -133,6 +133,20 @@ class Common(unittest.TestCase):
                 self.assertIsNotNone(_row)
                 self.assertIsNone(_row[0])
 
+    def test_executemany(self):
+        self.populate_db()
+        with weedb.connect(self.db_dict) as _connect:
+            with weedb.Transaction(_connect) as _cursor:
+                _cursor.executemany("UPDATE test1 SET max=?, maxtime=? WHERE dateTime=?",
+                                    [(20 * irec, irec, irec) for irec in range(0, 20, 2)])
+            with _connect.cursor() as _cursor:
+                _cursor.execute("SELECT dateTime, max, maxtime FROM test1")
+                for i, _row in enumerate(_cursor):
+                    if i % 2:
+                        self.assertEqual(_row[1:], (None, None))
+                    else:
+                        self.assertEqual(_row[1:], (20 * i, i))
+
     def test_bad_select(self):
         self.populate_db()
         with weedb.connect(self.db_dict) as _connect:
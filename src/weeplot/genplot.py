@@ -6,12 +6,16 @@
 """Routines for generating image plots."""
 
 import colorsys
+import functools
+import itertools
 import locale
+import math
 import os
 import time
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageChops, ImageDraw, ImageFont
 
+import weeplot.svg
 import weeplot.utilities
 import weeutil.weeutil
 from weeplot.utilities import tobgr
@@ -25,6 +29,43 @@ except AttributeError:
 else:
     PIL_HAS_BBOX = True
 
+# Day/night bands that have been drawn, keyed by everything that goes into drawing them. Each
+# value is a three-way tuple (band, mask, xleft). See GeneralPlot._renderDayNightBand().
+_daynight_bands = {}
+# How many bands to keep
+MAX_DAYNIGHT_BANDS = 32
+
+
+class PILRenderer:
+    """Draws plots as PNG images, using PIL."""
+
+    # The format to be given to image.save(), and the extension of the file name
+    format = 'PNG'
+    extension = 'png'
+    # Plots can be drawn at a bigger size, then shrunk, to smooth them out (option anti_alias)
+    raster = True
+
+    @staticmethod
+    def new_image(width, height, color):
+        """Returns a two-way tuple (image, draw) for a new plot."""
+        image = Image.new("RGB", (width, height), color)
+        return image, ImageDraw.ImageDraw(image)
+
+
+# The renderers that can be chosen with option 'renderer'
+renderers = {
+    'pil': PILRenderer,
+    'svg': weeplot.svg.SVGRenderer,
+}
+
+
+def get_renderer(name):
+    """Return the renderer with the given name, such as 'pil' or 'svg'."""
+    try:
+        return renderers[name.lower()]
+    except KeyError:
+        raise ValueError("Unknown renderer '%s'" % name)
+
 
 class GeneralPlot:
     """Holds various parameters necessary for a plot. It should be specialized by the type of plot.
@@ -40,7 +81,10 @@ class GeneralPlot:
         self.xscale = (None, None, None)
         self.yscale = (None, None, None)
 
-        self.anti_alias             = int(plot_dict.get('anti_alias', 1))
+        self.renderer               = get_renderer(plot_dict.get('renderer', 'pil'))
+        # Vector images are smooth already
+        self.anti_alias             = int(plot_dict.get('anti_alias', 1)) \
+            if self.renderer.raster else 1
 
         self.image_width            = int(plot_dict.get('image_width', 300)) * self.anti_alias
         self.image_height           = int(plot_dict.get('image_height', 180)) * self.anti_alias
@@ -199,8 +243,8 @@ class GeneralPlot:
         # NB: In what follows the variable 'draw' is an instance of an ImageDraw object and is in pixel units.
         # The variable 'sdraw' is an instance of ScaledDraw and its units are in the "scaled" units of the plot
         # (e.g., the horizontal scaling might be for seconds, the vertical for degrees Fahrenheit.)
-        image = Image.new("RGB", (self.image_width, self.image_height), self.image_background_color)
-        draw = ImageDraw.ImageDraw(image)
+        image, draw = self.renderer.new_image(self.image_width, self.image_height,
+                                              self.image_background_color)
         draw.rectangle(((self.lmargin,self.tmargin),
                         (self.image_width - self.rmargin, self.image_height - self.bmargin)),
                         fill=self.chart_background_color)
@@ -215,7 +259,10 @@ class GeneralPlot:
 
         sdraw = self._getScaledDraw(draw)
         if self.show_daynight:
-            self._renderDayNight(sdraw)
+            if self.renderer.raster:
+                self._pasteDayNight(image, sdraw)
+            else:
+                self._renderDayNight(sdraw)
         self._renderXAxes(sdraw)
         self._renderYAxes(sdraw)
         self._renderPlotLines(sdraw)
@@ -236,10 +283,7 @@ class GeneralPlot:
         """
         sdraw = weeplot.utilities.ScaledDraw(
             draw,
-            (
-                (self.lmargin + self.padding, self.tmargin + self.padding),
-                (self.image_width - self.rmargin - self.padding, self.image_height - self.bmargin - self.padding)
-            ),
+            self._getPlotBox(),
             (
                 (self.xscale[0], self.yscale[0]),
                 (self.xscale[1], self.yscale[1])
@@ -247,9 +291,84 @@ class GeneralPlot:
         )
         return sdraw
 
+    def _getPlotBox(self):
+        """Returns the box of the image, in pixels, that holds the plot area."""
+        return ((self.lmargin + self.padding, self.tmargin + self.padding),
+                (self.image_width - self.rmargin - self.padding,
+                 self.image_height - self.bmargin - self.padding))
+
+    def getXTranslator(self):
+        """Returns a function that gives the pixel column in which an x value will be drawn.
+        The x scaling must have been set with setXScaling().
+        """
+        # Only the x scaling matters, so any y scaling will do
+        sdraw = weeplot.utilities.ScaledDraw(None,
+                                             self._getPlotBox(),
+                                             ((self.xscale[0], 0.0), (self.xscale[1], 1.0)))
+        return sdraw.xtranslate
+
+    def _pasteDayNight(self, image, sdraw):
+        """Paste vertical bands for day/night onto the image.
+
+        Plots of the same time span and size, such as all the day plots, have the same bands, so
+        they are cached.
+        """
+        ytop = sdraw.ytranslate(self.yscale[1])
+        ybottom = sdraw.ytranslate(self.yscale[0])
+        key = (self.image_width, self.lmargin, self.rmargin, self.padding, ybottom - ytop + 1,
+               self.xscale[0], self.xscale[1], self.latitude, self.longitude,
+               self.daynight_day_color, self.daynight_night_color, self.daynight_edge_color,
+               self.daynight_gradient, self.anti_alias)
+        if key in _daynight_bands:
+            band, mask, xleft = _daynight_bands[key]
+        else:
+            band, mask, xleft = self._renderDayNightBand(ybottom - ytop + 1)
+            if len(_daynight_bands) >= MAX_DAYNIGHT_BANDS:
+                # Forget the oldest
+                del _daynight_bands[next(iter(_daynight_bands))]
+            _daynight_bands[key] = (band, mask, xleft)
+        image.paste(band, (xleft, ytop), mask)
+
+    def _renderDayNightBand(self, height):
+        """Draw the day/night bands on their own image.
+
+        The bands look the same from the top of the plot to the bottom, so they are drawn on an
+        image only one pixel high, which is then stretched to the given height.
+
+        Returns:
+            tuple: A three-way tuple (band, mask, xleft). The band is to be pasted at x
+                coordinate xleft. The mask marks the pixels that were drawn. It is None if that
+                is all of them.
+        """
+        (ulx, _), (lrx, _) = self._getPlotBox()
+        # Every y value maps to the only row
+        imagebox = ((ulx, 0), (lrx, 0))
+        scaledbox = ((self.xscale[0], 0.0), (self.xscale[1], 1.0))
+        # Draw the bands twice, starting from black, then from white. The pixels that were
+        # drawn are the ones that ended up the same.
+        bands = []
+        for background in (0x000000, 0xffffff):
+            band = Image.new("RGB", (self.image_width, 1), background)
+            self._renderDayNight(weeplot.utilities.ScaledDraw(ImageDraw.ImageDraw(band),
+                                                              imagebox, scaledbox))
+            bands.append(band)
+        mask = ImageChops.difference(*bands).convert('L').point(lambda v: 255 if v == 0 else 0)
+
+        band = bands[0]
+        xleft = 0
+        bbox = mask.getbbox()
+        if bbox and mask.crop(bbox).getextrema()[0] == 255:
+            # The usual case: the pixels that were drawn are all next to each other
+            band = band.crop(bbox)
+            mask = None
+            xleft = bbox[0]
+        else:
+            mask = mask.resize((mask.width, height), Image.NEAREST)
+        return band.resize((band.width, height), Image.NEAREST), mask, xleft
+
     def _renderDayNight(self, sdraw):
         """Draw vertical bands for day/night."""
-        (first, transitions) = weeutil.weeutil.getDayNightTransitions(
+        (first, transitions) = _getDayNightTransitions(
             self.xscale[0], self.xscale[1], self.latitude, self.longitude)
         color = self.daynight_day_color \
             if first == 'day' else self.daynight_night_color
@@ -389,16 +508,13 @@ class GeneralPlot:
                            width = width,
                            maxdx = maxdx)
             elif this_line.plot_type == 'bar' :
-                for x, y, bar_width in zip(this_line.x, this_line.y, this_line.bar_width):
-                    if y is None:
-                        continue
-                    sdraw.rectangle(((x - bar_width, self.yscale[0]), (x, y)), fill=fill_color, outline=color)
+                sdraw.bars(this_line.x, this_line.y, this_line.bar_width, self.yscale[0],
+                           fill=fill_color, outline=color)
             elif this_line.plot_type == 'vector' :
-                for (x, vec) in zip(this_line.x, this_line.y):
-                    sdraw.vector(x, vec,
-                                 vector_rotate = this_line.vector_rotate,
-                                 fill  = color,
-                                 width = width)
+                sdraw.vectors(this_line.x, this_line.y,
+                              vector_rotate = this_line.vector_rotate,
+                              fill  = color,
+                              width = width)
                 self.render_rose = True
                 self.rose_rotation = this_line.vector_rotate
                 if self.rose_color is None:
@@ -631,6 +747,160 @@ class TimePlot(GeneralPlot) :
         return xlabel
 
 
+class WindRosePlot(GeneralPlot):
+    """Class that specializes GeneralPlot for wind roses. A wind rose shows how often the wind
+    came from each direction, broken down by speed."""
+
+    def __init__(self, plot_dict):
+        super().__init__(plot_dict)
+
+        self.rose_nrings            = int(plot_dict.get('rose_rings', 4))
+        self.rose_wedge_fraction    = float(plot_dict.get('rose_wedge_fraction', 0.8))
+        self.calm_label             = plot_dict.get('calm_label', 'Calm')
+        speed_colors                = plot_dict.get('speed_colors')
+        self.speed_colors           = [tobgr(v) for v in option_as_list(speed_colors)] \
+            if speed_colors else None
+        self.direction_labels       = ('N', 'E', 'S', 'W')
+        self.bins                   = []
+        self.calm                   = None
+
+    def setBins(self, bins, calm, speed_labels):
+        """Set the frequencies to be plotted.
+
+        bins: A list with an element for each direction, clockwise from north. Each element is
+        a list of the percent of the time the wind came from that direction, for each speed
+        class, slowest first.
+
+        calm: The percent of the time the wind was calm, or None to leave it out.
+
+        speed_labels: A label for each speed class. Together, they make up the top label.
+        """
+        self.bins = bins
+        self.calm = calm
+        # If no colors were given, the speed classes go from blue to red
+        colors = self.speed_colors or _speedColors(len(speed_labels))
+        self.line_list = [PlotLine([], [], label=label, color=colors[i % len(colors)])
+                          for i, label in enumerate(speed_labels)]
+
+    def setDirectionLabels(self, direction_labels):
+        """Set the labels of north, east, south, and west, in that order."""
+        self.direction_labels = direction_labels
+
+    def render(self):
+        """Render the wind rose, returning the results as a new Image object."""
+        image, draw = self.renderer.new_image(self.image_width, self.image_height,
+                                              self.image_background_color)
+        draw.rectangle(((self.lmargin,self.tmargin),
+                        (self.image_width - self.rmargin, self.image_height - self.bmargin)),
+                        fill=self.chart_background_color)
+
+        self._renderBottom(draw)
+        self._renderTopBand(draw)
+        self._renderWindRose(draw)
+
+        if self.anti_alias != 1:
+            image.thumbnail((self.image_width / self.anti_alias,
+                             self.image_height / self.anti_alias),
+                            Image.LANCZOS)
+
+        return image
+
+    def _renderWindRose(self, draw):
+        """Draw the rings, the wedges, and their labels."""
+        axis_label_font = weeplot.utilities.get_font_handle(self.axis_label_font_path,
+                                                            self.axis_label_font_size)
+        (ulx, uly), (lrx, lry) = self._getPlotBox()
+        cx = (ulx + lrx) / 2.0
+        cy = (uly + lry) / 2.0
+        # Leave room for the direction labels
+        radius = min(lrx - ulx, lry - uly) / 2.0 - 1.5 * self.axis_label_font_size
+
+        # The rings are at round numbers of percent
+        rmax = max([sum(speeds) for speeds in self.bins] + [0.0])
+        _, rmax, rinc = weeplot.utilities.scale(0.0, rmax or 1.0, (0.0, None, None),
+                                                nsteps=self.rose_nrings)
+        nrings = int(round(rmax / rinc))
+        rscale = radius / rmax
+
+        for i in range(1, nrings + 1):
+            r = i * rinc * rscale
+            draw.ellipse(((cx - r, cy - r), (cx + r, cy + r)),
+                         outline=self.chart_gridline_color, width=self.anti_alias)
+        for angle in (0, 90, 180, 270):
+            draw.line(((cx, cy), _polarToXY(cx, cy, radius, angle)),
+                      fill=self.chart_gridline_color, width=self.anti_alias)
+
+        # Draw the wedge of each speed class over the ones of the faster classes
+        if self.bins:
+            sector = 360.0 / len(self.bins)
+            half_width = sector * self.rose_wedge_fraction / 2.0
+            for i, speeds in enumerate(self.bins):
+                cumulative = list(itertools.accumulate(speeds))
+                for k in reversed(range(len(speeds))):
+                    if speeds[k] > 0:
+                        draw.polygon(_wedge(cx, cy, cumulative[k] * rscale,
+                                            i * sector - half_width, i * sector + half_width),
+                                     fill=self.line_list[k].color)
+
+        for i in range(1, nrings + 1):
+            draw.text((cx + 2 * self.anti_alias, cy - i * rinc * rscale),
+                      '%g%%' % (i * rinc),
+                      fill=self.axis_label_font_color,
+                      font=axis_label_font,
+                      anchor="lt")
+
+        for angle, label in zip((0, 90, 180, 270), self.direction_labels):
+            if PIL_HAS_BBOX:
+                left, top, right, bottom = axis_label_font.getbbox(label)
+                label_width, label_height = right - left, bottom - top
+            else:
+                label_width, label_height = draw.textsize(label, font=axis_label_font)
+            x, y = _polarToXY(cx, cy, radius + 0.8 * self.axis_label_font_size, angle)
+            draw.text((x - label_width / 2, y - label_height / 2),
+                      label,
+                      fill=self.axis_label_font_color,
+                      font=axis_label_font,
+                      anchor="lt")
+
+        if self.calm is not None:
+            draw.text((ulx, lry - self.axis_label_font_size),
+                      '%s %.1f%%' % (self.calm_label, self.calm),
+                      fill=self.axis_label_font_color,
+                      font=axis_label_font,
+                      anchor="lt")
+
+
+def _polarToXY(cx, cy, radius, angle):
+    """Return the point at a distance radius from (cx, cy), in the compass direction angle (in
+    degrees clockwise from north)."""
+    a = math.radians(angle)
+    return cx + radius * math.sin(a), cy - radius * math.cos(a)
+
+
+def _wedge(cx, cy, radius, start, stop):
+    """Return the vertices of a polygon that looks like a wedge of a circle with center (cx, cy),
+    from compass direction start to stop."""
+    nsteps = max(2, int((stop - start) / 5.0))
+    return [(cx, cy)] + [_polarToXY(cx, cy, radius, start + (stop - start) * i / nsteps)
+                         for i in range(nsteps + 1)]
+
+
+def _speedColors(n):
+    """Return n colors, going from blue to red."""
+    colors = []
+    for i in range(n):
+        r, g, b = colorsys.hsv_to_rgb(2.0 / 3.0 * (1.0 - i / max(n - 1, 1)), 0.7, 0.9)
+        colors.append(rgb2int(int(r * 255), int(g * 255), int(b * 255)))
+    return colors
+
+
+@functools.lru_cache(maxsize=32)
+def _getDayNightTransitions(start_ts, end_ts, lat, lon):
+    """Like weeutil.weeutil.getDayNightTransitions(), but remembers the results."""
+    first, transitions = weeutil.weeutil.getDayNightTransitions(start_ts, end_ts, lat, lon)
+    return first, tuple(transitions)
+
+
 class PlotLine:
     """Represents a single line (or bar) in a plot. """
     def __init__(self, x, y, label='', color=None, fill_color=None, width=None, plot_type='line',
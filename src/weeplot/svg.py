@@ -0,0 +1,222 @@
+#
+#    Copyright (c) 2009-2024 Tom Keffer <tkeffer@gmail.com>
+#
+#    See the file LICENSE.txt for your full rights.
+#
+"""Draw plots as Scalable Vector Graphics (SVG).
+
+Classes SVGImage and SVGDraw stand in for a PIL Image and ImageDraw, respectively. They support
+only what the plots in weeplot.genplot use. Text is measured using the PIL fonts, so the layout
+is the same as for raster images, but it is up to the browser to draw it.
+"""
+
+import base64
+import io
+from xml.sax.saxutils import escape, quoteattr
+
+
+class SVGRenderer:
+    """Draws plots as SVG documents."""
+
+    # The format to be given to image.save(), and the extension of the file name
+    format = 'SVG'
+    extension = 'svg'
+    # Vectors can be scaled by the browser, so there is no need to draw at a bigger size first
+    raster = False
+
+    @staticmethod
+    def new_image(width, height, color):
+        """Returns a two-way tuple (image, draw) for a new plot."""
+        image = SVGImage(width, height, color)
+        return image, SVGDraw(image)
+
+
+class SVGImage:
+    """An SVG document, with just enough of the interface of a PIL Image."""
+
+    def __init__(self, width, height, color=None):
+        self.width = width
+        self.height = height
+        self.elements = []
+        if color is not None:
+            self.elements.append('<rect width="100%%" height="100%%" fill="%s"/>'
+                                 % svg_color(color))
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def paste(self, im, box=None, mask=None):
+        """Embed a PIL image, as a PNG.
+
+        Args:
+            im (PIL.Image.Image): The image to be pasted.
+            box (tuple|None): The upper-left corner (x, y) where it goes. Default is (0, 0).
+            mask (PIL.Image.Image|None): Only the pixels where the mask is not zero are pasted.
+        """
+        if mask is not None:
+            if mask is not im or im.mode != 'RGBA':
+                im = im.convert('RGBA')
+                im.putalpha(mask.convert('L'))
+        x, y = box[:2] if box else (0, 0)
+        buf = io.BytesIO()
+        im.save(buf, format='PNG')
+        self.elements.append('<image x="%s" y="%s" width="%d" height="%d" href="data:image/png;'
+                             'base64,%s"/>' % (_num(x), _num(y), im.width, im.height,
+                                               base64.b64encode(buf.getvalue()).decode('ascii')))
+
+    def save(self, fp, format=None):
+        """Write the SVG document to a file object opened in binary mode."""
+        fp.write(self.tostring().encode('utf-8'))
+
+    def tostring(self):
+        """Return the SVG document as a string."""
+        return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" '
+                'viewBox="0 0 %d %d">\n%s\n</svg>\n'
+                % (self.width, self.height, self.width, self.height, '\n'.join(self.elements)))
+
+
+class SVGDraw:
+    """Draws on an SVGImage, with just enough of the interface of a PIL ImageDraw.
+
+    Coordinates are in pixels, as for ImageDraw. A pixel at (x, y) covers the square from (x, y)
+    to (x+1, y+1), so lines run through the middle of the pixels.
+    """
+
+    def __init__(self, image):
+        self.image = image
+
+    def rectangle(self, xy, fill=None, outline=None, width=1):
+        (x0, y0), (x1, y1) = _corners(xy)
+        if fill is not None:
+            self.image.elements.append('<rect x="%s" y="%s" width="%s" height="%s" fill="%s"/>'
+                                       % (_num(x0), _num(y0), _num(x1 - x0 + 1),
+                                          _num(y1 - y0 + 1), svg_color(fill)))
+        if outline is not None:
+            self.image.elements.append('<rect x="%s" y="%s" width="%s" height="%s" fill="none" '
+                                       'stroke="%s" stroke-width="%s"/>'
+                                       % (_num(x0 + 0.5), _num(y0 + 0.5), _num(x1 - x0),
+                                          _num(y1 - y0), svg_color(outline), _num(width or 1)))
+
+    def line(self, xy, fill=None, width=0, joint=None):
+        points = _points(xy)
+        if len(points) < 2:
+            self.point(points, fill=fill)
+            return
+        self.image.elements.append('<polyline points="%s" fill="none" stroke="%s" '
+                                   'stroke-width="%s"%s/>'
+                                   % (' '.join('%s,%s' % (_num(x + 0.5), _num(y + 0.5))
+                                               for x, y in points),
+                                      svg_color(fill), _num(width or 1),
+                                      ' stroke-linejoin="round"' if joint == 'curve' else ''))
+
+    def point(self, xy, fill=None):
+        for x, y in _points(xy):
+            self.image.elements.append('<rect x="%s" y="%s" width="1" height="1" fill="%s"/>'
+                                       % (_num(x), _num(y), svg_color(fill)))
+
+    def ellipse(self, xy, fill=None, outline=None, width=1):
+        (x0, y0), (x1, y1) = _corners(xy)
+        self.image.elements.append('<ellipse cx="%s" cy="%s" rx="%s" ry="%s" fill="%s"%s/>'
+                                   % (_num((x0 + x1 + 1) / 2), _num((y0 + y1 + 1) / 2),
+                                      _num((x1 - x0) / 2), _num((y1 - y0) / 2),
+                                      svg_color(fill),
+                                      ' stroke="%s" stroke-width="%s"'
+                                      % (svg_color(outline), _num(width or 1))
+                                      if outline is not None else ''))
+
+    def polygon(self, xy, fill=None, outline=None, width=1):
+        self.image.elements.append('<polygon points="%s" fill="%s"%s/>'
+                                   % (' '.join('%s,%s' % (_num(x + 0.5), _num(y + 0.5))
+                                               for x, y in _points(xy)),
+                                      svg_color(fill),
+                                      ' stroke="%s" stroke-width="%s"'
+                                      % (svg_color(outline), _num(width or 1))
+                                      if outline is not None else ''))
+
+    def text(self, xy, text, fill=None, font=None, anchor=None, **kwargs):
+        """Draw text. Only anchors 'la' (left, ascender; the default) and 'lt' (left, top) are
+        supported, which are the ones used by the plots."""
+        x, y = xy
+        attrs = ''
+        if font is not None:
+            y += _baseline_offset(font, text, anchor or 'la')
+            try:
+                family, style = font.getname()
+            except (AttributeError, TypeError):
+                family, style = 'sans-serif', ''
+            attrs = ' font-family=%s font-size="%s"' % (quoteattr(family), _num(font.size))
+            if style and 'bold' in style.lower():
+                attrs += ' font-weight="bold"'
+            if style and ('italic' in style.lower() or 'oblique' in style.lower()):
+                attrs += ' font-style="italic"'
+        self.image.elements.append('<text x="%s" y="%s" fill="%s"%s>%s</text>'
+                                   % (_num(x), _num(y), svg_color(fill), attrs, escape(text)))
+
+    @staticmethod
+    def textlength(text, font=None):
+        return font.getlength(text)
+
+    @staticmethod
+    def textsize(text, font=None):
+        # Only used by old versions of Pillow, whose fonts have getsize()
+        return font.getsize(text)
+
+
+def svg_color(color):
+    """Convert a color, as used by PIL, to an SVG color.
+
+    Example:
+        >>> print(svg_color(0x0000ff))
+        #ff0000
+        >>> print(svg_color((0, 128, 255)))
+        #0080ff
+        >>> print(svg_color('#aabbcc'))
+        #aabbcc
+    """
+    if color is None:
+        return 'none'
+    if isinstance(color, int):
+        # PIL integers are little-endian: 0xBBGGRR
+        return '#%02x%02x%02x' % (color & 0xff, (color >> 8) & 0xff, (color >> 16) & 0xff)
+    if isinstance(color, tuple):
+        return '#%02x%02x%02x' % color[:3]
+    return color
+
+
+def _baseline_offset(font, text, anchor):
+    """How far below y the baseline of text drawn at y, with the given anchor, will be."""
+    try:
+        if anchor == 'lt':
+            return -font.getbbox(text, anchor='ls')[1]
+        return font.getmetrics()[0]
+    except (AttributeError, TypeError, ValueError):
+        # Bitmap fonts know neither anchors nor metrics
+        return font.getbbox(text)[3]
+
+
+def _points(xy):
+    """Return a list of (x, y) tuples, from either a sequence of pairs, or a flat sequence."""
+    xy = list(xy)
+    if xy and not isinstance(xy[0], (tuple, list)):
+        return list(zip(xy[0::2], xy[1::2]))
+    return [tuple(p) for p in xy]
+
+
+def _corners(xy):
+    """Return the upper-left and lower-right corners of a box."""
+    (x0, y0), (x1, y1) = _points(xy)
+    return (min(x0, x1), min(y0, y1)), (max(x0, x1), max(y0, y1))
+
+
+def _num(x):
+    """Format a coordinate as compactly as possible."""
+    return '%d' % x if x == int(x) else '%.2f' % x
+
+
+if __name__ == '__main__':
+    import doctest
+
+    if not doctest.testmod().failed:
+        print("PASSED")
@@ -0,0 +1,49 @@
+#
+#    Copyright (c) 2009-2024 Tom Keffer <tkeffer@gmail.com>
+#
+#    See the file LICENSE.txt for your full rights.
+#
+"""Test the plots in weeplot.genplot"""
+
+import unittest
+
+import weeplot.genplot
+
+
+class DayNightTest(unittest.TestCase):
+    """Test the cache of day/night bands"""
+
+    def render(self, cached, anti_alias, gradient, location, start_ts, time_length):
+        plot = weeplot.genplot.TimePlot({'anti_alias': anti_alias,
+                                         'daynight_gradient': gradient})
+        plot.setLocation(*location)
+        plot.setDayNight(True, 0xdfdfdf, 0xbbbbbb, 0x0000ff)
+        x = [start_ts + i * time_length / 24 for i in range(25)]
+        y = [60.0 + i % 7 for i in range(25)]
+        plot.setXScaling((start_ts, start_ts + time_length, time_length / 8))
+        plot.setYScaling((None, None, None))
+        plot.addLine(weeplot.genplot.PlotLine(x, y, label='Temperature', color=0xff0000))
+        if not cached:
+            # Draw the bands straight onto the plot
+            plot._pasteDayNight = lambda image, sdraw: plot._renderDayNight(sdraw)
+        return plot.render().tobytes()
+
+    def test_daynight(self):
+        """Plots with cached bands should be the same as those with the bands drawn on them"""
+        weeplot.genplot._daynight_bands.clear()
+        for anti_alias in (1, 2):
+            for gradient in (0, 20):
+                for location in ((45.0, -122.0), (-33.9, 151.2), (78.2, 15.6)):
+                    for start_ts, time_length in ((1719817200, 86400),
+                                                  (1719817200, 7 * 86400),
+                                                  (1704096000, 2 * 86400)):
+                        args = (anti_alias, gradient, location, start_ts, time_length)
+                        expected = self.render(False, *args)
+                        # The first time the band is drawn, then it comes from the cache
+                        self.assertEqual(self.render(True, *args), expected)
+                        self.assertEqual(self.render(True, *args), expected)
+        self.assertTrue(weeplot.genplot._daynight_bands)
+
+
+if __name__ == '__main__':
+    unittest.main()
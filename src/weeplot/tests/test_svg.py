@@ -0,0 +1,67 @@
+#
+#    Copyright (c) 2009-2024 Tom Keffer <tkeffer@gmail.com>
+#
+#    See the file LICENSE.txt for your full rights.
+#
+"""Test the SVG renderer in weeplot.svg"""
+
+import io
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+import weeplot.genplot
+from weeplot.svg import svg_color
+
+SVG = '{http://www.w3.org/2000/svg}'
+
+
+class SVGTest(unittest.TestCase):
+    """Test drawing plots as SVG"""
+
+    def render(self, renderer, **options):
+        plot = weeplot.genplot.TimePlot(dict(options, renderer=renderer))
+        plot.setBottomLabel('Bottom <label>')
+        plot.setUnitLabel('°F')
+        plot.setLocation(45.0, -122.0)
+        plot.setDayNight(True, 0xdfdfdf, 0xbbbbbb, 0x000000)
+        start_ts = 1719817200
+        x = [start_ts + i * 3600 for i in range(25)]
+        y = [60.0 + i % 7 for i in range(25)]
+        plot.setXScaling((start_ts, start_ts + 86400, 10800))
+        plot.setYScaling((None, None, None))
+        plot.addLine(weeplot.genplot.PlotLine(x, y, label='Temperature', color=0x0000ff))
+        plot.addLine(weeplot.genplot.PlotLine(x, y, label='Rain', plot_type='bar',
+                                              color=0x00ff00, bar_width=[3600] * 25))
+        return plot, plot.render()
+
+    def test_svg(self):
+        plot, image = self.render('svg', anti_alias=2, image_width=400, image_height=200)
+        self.assertEqual(plot.renderer.extension, 'svg')
+        buf = io.BytesIO()
+        image.save(buf, format=plot.renderer.format)
+        root = ElementTree.fromstring(buf.getvalue())
+        self.assertEqual(root.tag, SVG + 'svg')
+        # Anti-aliasing is not needed for vectors, so the plot is drawn at its real size
+        self.assertEqual((root.get('width'), root.get('height')), ('400', '200'))
+        texts = [element.text for element in root.iter(SVG + 'text')]
+        self.assertIn('Bottom <label>', texts)
+        self.assertIn('Temperature', texts)
+        # The temperature line
+        self.assertEqual(len(root.findall(SVG + 'polyline[@stroke="#ff0000"]')), 1)
+        # The bars touch, so they are drawn as a single polygon, with a single outline
+        self.assertEqual(len(root.findall(SVG + 'polygon')), 1)
+        self.assertEqual(len(root.findall(SVG + 'polyline[@stroke="#00ff00"]')), 1)
+
+    def test_unknown_renderer(self):
+        with self.assertRaises(ValueError):
+            weeplot.genplot.TimePlot({'renderer': 'foo'})
+
+    def test_svg_color(self):
+        self.assertEqual(svg_color(0x0000ff), '#ff0000')
+        self.assertEqual(svg_color((0x12, 0x34, 0x56, 0x78)), '#123456')
+        self.assertEqual(svg_color('red'), 'red')
+        self.assertEqual(svg_color(None), 'none')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@
 #
 """Test functions in weeplot.utilities"""
 
+import logging
 import os
 import unittest
 
@@ -12,6 +13,8 @@ from weeplot.utilities import *
 from weeplot.utilities import _rel_approx_equal
 from weeutil.weeutil import timestamp_to_string as to_string
 
+log = logging.getLogger(__name__)
+
 
 class WeePlotUtilTest(unittest.TestCase):
     """Test the functions in weeplot.utilities"""
@@ -170,6 +173,93 @@ class WeePlotUtilTest(unittest.TestCase):
                                                      [(5.1, 50), (6, 60), (7, 70),
                                                       (8, 80), (9, 90)]])
 
+    def test_scale_line(self):
+        """Test ScaledDraw.scale_line() against scaling the segments of xy_seq_line()"""
+        sdraw = ScaledDraw(None, ((10, 10), (310, 190)), ((0.0, -5.0), (10.0, 100.0)))
+        cases = [
+            ([1, 2, 3], [10, 20, 30], None),
+            ([0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [0, 10, None, 30, None, None, 60, 70, 80, None],
+             None),
+            ([0], [None], None),
+            ([], [], None),
+            ([0, 1, 2, 3, 5.1, 6, 7, 8, 9], [0, 10, 20, 30, 50, 60, 70, 80, 90], 2),
+            ([0, 1, 2, 3, 5.1, 6, 7, 8, 9], [0, None, 20, 30, 50, None, 70, 80, 90], 1.5),
+        ]
+        for x, y, maxdx in cases:
+            self.assertEqual(sdraw.scale_line(x, y, maxdx),
+                             [[(sdraw.xtranslate(xc), sdraw.ytranslate(yc)) for xc, yc in xy_seq]
+                              for xy_seq in xy_seq_line(x, y, maxdx)])
+
+    def test_scale_line_benchmark(self):
+        """Benchmark scaling a line of 10,000 points"""
+        import random
+        import timeit
+        random.seed(1)
+        x = list(range(10000))
+        y = [random.uniform(-5.0, 100.0) if i % 500 else None for i in x]
+        sdraw = ScaledDraw(None, ((10, 10), (310, 190)), ((0.0, -5.0), (10000.0, 100.0)))
+
+        def per_point():
+            return [[(sdraw.xtranslate(xc), sdraw.ytranslate(yc)) for xc, yc in xy_seq]
+                    for xy_seq in xy_seq_line(x, y, 5)]
+
+        def one_pass():
+            return sdraw.scale_line(x, y, 5)
+
+        self.assertEqual(one_pass(), per_point())
+        N = 20
+        t_per_point = timeit.timeit(per_point, number=N) / N
+        t_one_pass = timeit.timeit(one_pass, number=N) / N
+        log.info("Scaling 10,000 points: %.2f ms point by point, %.2f ms in one pass",
+                 t_per_point * 1000, t_one_pass * 1000)
+
+    def test_bars(self):
+        """Test ScaledDraw.bars() against drawing one rectangle per bar"""
+        import random
+        from PIL import Image, ImageDraw
+        random.seed(1)
+
+        def draw(x, y, bar_width, fill, outline, one_by_one):
+            image = Image.new('RGB', (220, 120), (255, 255, 255))
+            sdraw = ScaledDraw(ImageDraw.Draw(image), ((10, 10), (210, 110)),
+                               ((-2.0, 0.0), (x[-1] + 1.0, 10.0)))
+            if one_by_one:
+                for xc, yc, width in zip(x, y, bar_width):
+                    if yc is not None:
+                        sdraw.rectangle(((xc - width, 0.0), (xc, yc)), fill=fill, outline=outline)
+            else:
+                sdraw.bars(x, y, bar_width, 0.0, fill=fill, outline=outline)
+            return image.tobytes()
+
+        for _ in range(200):
+            # Bars that touch, bars with gaps between them, and bars that overlap
+            x = []
+            bar_width = []
+            xc = 0
+            for _ in range(random.randint(1, 40)):
+                step = random.choice([1, 1, 1, 2, 0.5])
+                xc += step
+                x.append(xc)
+                bar_width.append(random.choice([1, 1, 2, 0.5, step]))
+            # Including missing data, and bars with no height
+            y = [random.choice([None, 0, 0.01, random.uniform(0.0, 10.0)]) for _ in x]
+            for fill, outline in [((0, 0, 255), (255, 0, 0)), ((0, 0, 255), None),
+                                  (None, (255, 0, 0)), ((0, 0, 255), (0, 0, 255))]:
+                self.assertEqual(draw(x, y, bar_width, fill, outline, False),
+                                 draw(x, y, bar_width, fill, outline, True))
+
+    def test_scale_bars(self):
+        """Test splitting bars into runs of bars that touch"""
+        sdraw = ScaledDraw(None, ((0, 0), (100, 100)), ((0.0, 0.0), (10.0, 10.0)))
+        self.assertEqual(sdraw.scale_bars([1, 2, 4, 5, 6], [1, 2, 4, None, 6], [1] * 5, 0.0),
+                         [[(0, 100), (0, 90), (10, 90), (10, 80), (20, 80), (20, 100)],
+                          [(30, 100), (30, 60), (40, 60), (40, 100)],
+                          [(50, 100), (50, 40), (60, 40), (60, 100)]])
+        # A bar that overlaps the one before it starts a new run
+        self.assertEqual(sdraw.scale_bars([1, 1.5], [1, 2], [1, 1], 0.0),
+                         [[(0, 100), (0, 90), (10, 90), (10, 100)],
+                          [(5, 100), (5, 80), (15, 80), (15, 100)]])
+
     def test_pickLabelFormat(self):
         """Test function pickLabelFormat"""
 
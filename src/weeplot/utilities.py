@@ -334,6 +334,10 @@ def scaletime(tmin_ts, tmax_ts):
     return start_ts, stop_ts, interval
 
 
+# The most bars filled by a single polygon
+BARS_PER_POLYGON = 64
+
+
 class ScaledDraw:
     """Like an ImageDraw object, but lines are scaled. """
 
@@ -388,40 +392,85 @@ class ScaledDraw:
 
         For a scatter plot, set line_type to None and marker_type to something other than None.
         """
-        # Break the line around any nulls or gaps between samples
-        for xy_seq in xy_seq_line(x, y, maxdx):
-            # Create a list with the scaled coordinates...
-            xy_seq_scaled = [(self.xtranslate(xc), self.ytranslate(yc)) for (xc, yc) in xy_seq]
-            if line_type == 'solid':
+        # Break the line around any nulls or gaps between samples, and scale it
+        segments = self.scale_line(x, y, maxdx)
+        if line_type == 'solid':
+            for xy_seq_scaled in segments:
                 # Now pick the appropriate drawing function, depending on the length of the line:
-                if len(xy_seq) == 1:
+                if len(xy_seq_scaled) == 1:
                     self.draw.point(xy_seq_scaled, fill=options['fill'])
                 else:
                     self.draw.line(xy_seq_scaled, **options)
-            if marker_type and marker_type.lower().strip() not in ['none', '']:
-                self.marker(xy_seq_scaled, marker_type, marker_size=marker_size, **options)
+        if marker_type and marker_type.lower().strip() not in ['none', '']:
+            self.marker([xy for xy_seq_scaled in segments for xy in xy_seq_scaled],
+                        marker_type, marker_size=marker_size, **options)
+
+    def scale_line(self, x, y, maxdx=None):
+        """Break a line around any nulls or gaps between samples, and scale it.
+
+        This gives the same result as scaling each segment returned by xy_seq_line(), but does
+        it in a single pass over the data.
+
+        Args:
+            x(list[float]): sequence of x coordinates
+            y(list[float|None]): sequence of y coordinates, some of which are possibly null
+            maxdx(float): if two data points are more than maxdx apart they are treated as
+                separate segments.
+
+        Returns:
+            list[list[tuple]]: The segments, each a list of (x, y) image coordinates.
+        """
+        xscale, xoffset = self.xscale, self.xoffset
+        yscale, yoffset = self.yscale, self.yoffset
+
+        segments = []
+        segment = []
+        last_x = None
+        for xc, yc in zip(x, y):
+            dx = xc - last_x if last_x is not None else 0
+            last_x = xc
+            # If the y coordinate is None or dx > maxdx, that marks a break
+            if yc is None or (maxdx is not None and dx > maxdx):
+                # If the length of the segment is non-zero, keep it
+                if segment:
+                    segments.append(segment)
+                    segment = [] if yc is None else [(int(xc * xscale + xoffset + 0.5),
+                                                      int(yc * yscale + yoffset + 0.5))]
+            else:
+                segment.append((int(xc * xscale + xoffset + 0.5),
+                                int(yc * yscale + yoffset + 0.5)))
+        if segment:
+            segments.append(segment)
+        return segments
 
     def marker(self, xy_seq, marker_type, marker_size=10, **options):
         half_size = marker_size / 2
         marker = marker_type.lower()
-        for x, y in xy_seq:
-            if marker == 'cross':
-                self.draw.line([(x - half_size, y), (x + half_size, y)], **options)
-                self.draw.line([(x, y - half_size), (x, y + half_size)], **options)
-            elif marker == 'x':
-                self.draw.line([(x - half_size, y - half_size), (x + half_size, y + half_size)],
-                               **options)
-                self.draw.line([(x - half_size, y + half_size), (x + half_size, y - half_size)],
-                               **options)
-            elif marker == 'circle':
-                self.draw.ellipse([(x - half_size, y - half_size),
-                                   (x + half_size, y + half_size)], outline=options['fill'])
-            elif marker == 'box':
-                self.draw.line([(x - half_size, y - half_size),
-                                (x + half_size, y - half_size),
-                                (x + half_size, y + half_size),
-                                (x - half_size, y + half_size),
-                                (x - half_size, y - half_size)], **options)
+        # Look up the drawing functions once, rather than for every marker
+        line = self.draw.line
+        if marker == 'cross':
+            for x, y in xy_seq:
+                line([(x - half_size, y), (x + half_size, y)], **options)
+                line([(x, y - half_size), (x, y + half_size)], **options)
+        elif marker == 'x':
+            for x, y in xy_seq:
+                line([(x - half_size, y - half_size), (x + half_size, y + half_size)],
+                     **options)
+                line([(x - half_size, y + half_size), (x + half_size, y - half_size)],
+                     **options)
+        elif marker == 'circle':
+            ellipse = self.draw.ellipse
+            outline = options['fill']
+            for x, y in xy_seq:
+                ellipse([(x - half_size, y - half_size), (x + half_size, y + half_size)],
+                        outline=outline)
+        elif marker == 'box':
+            for x, y in xy_seq:
+                line([(x - half_size, y - half_size),
+                      (x + half_size, y - half_size),
+                      (x + half_size, y + half_size),
+                      (x - half_size, y + half_size),
+                      (x - half_size, y - half_size)], **options)
 
     def rectangle(self, box, **options):
         """Draw a scaled rectangle.
@@ -441,26 +490,128 @@ class ScaledDraw:
         box_scaled = ((ulix, uliy), (lrix, lriy))
         self.draw.rectangle(box_scaled, **options)
 
-    def vector(self, x, vec, vector_rotate, **options):
+    def bars(self, x, y, bar_width, bottom, fill=None, outline=None):
+        """Draw a series of scaled bars.
 
-        if vec is None:
-            return
-        xstart_scaled = self.xtranslate(x)
-        ystart_scaled = self.ytranslate(0)
+        The result is the same as calling rectangle() for each bar, but bars that touch are
+        drawn together: first their fill, as polygons of up to BARS_PER_POLYGON bars, then their
+        outline, as a single line.
 
-        vecinc_scaled = vec * self.yscale
+        Args:
+            x(list[float]): sequence of x coordinates of the right side of the bars
+            y(list[float|None]): sequence of heights of the bars. No bar is drawn for None.
+            bar_width(list[float]): sequence of widths of the bars
+            bottom(float): The y coordinate of the bottom of the bars
+            fill: The color inside the bars, or None
+            outline: The color of the outline of the bars, or None
+        """
+        if outline == fill:
+            # Then draw.rectangle() draws no outline
+            outline = None
+        if fill is None and outline is None:
+            return
+        for run in self.scale_bars(x, y, bar_width, bottom):
+            bottom_scaled = run[0][1]
+            if fill is not None:
+                # A polygon is filled one row at a time, looking at all of its edges, so a long
+                # run is filled a few bars at a time
+                for i in range(1, len(run) - 1, 2 * BARS_PER_POLYGON):
+                    corners = run[i:i + 2 * BARS_PER_POLYGON]
+                    self.draw.polygon([(corners[0][0], bottom_scaled)] + corners
+                                      + [(corners[-1][0], bottom_scaled)], fill=fill)
+            # Go around each bar, except for its bottom, then back along the bottom of the run.
+            # Without an outline, the edges of the bars are the color of the fill.
+            outline_seq = [run[0]]
+            for (left, top), (right, _) in zip(run[1:-1:2], run[2:-1:2]):
+                if top != bottom_scaled or outline is None:
+                    outline_seq += [(left, top), (right, top), (right, bottom_scaled)]
+                else:
+                    # Like draw.rectangle(), draw the sides of a bar with no height one pixel
+                    # lower
+                    outline_seq += [(left, bottom_scaled + 1), (left, bottom_scaled),
+                                    (right, bottom_scaled), (right, bottom_scaled + 1),
+                                    (right, bottom_scaled)]
+            outline_seq.append(run[0])
+            self.draw.line(outline_seq, fill=fill if outline is None else outline)
+
+    def scale_bars(self, x, y, bar_width, bottom):
+        """Scale a series of bars, and split it into runs of bars that touch.
+
+        A bar starts a new run if it overlaps any bar before it, so that the runs can be drawn
+        one after another, with the same result as drawing the bars one after another.
+
+        Returns:
+            list[list[tuple]]: For each run, the image coordinates of the corners of its
+                outline: the bottom left, then the top left and top right of each bar, then the
+                bottom right.
+        """
+        xscale, xoffset = self.xscale, self.xoffset
+        yscale, yoffset = self.yscale, self.yoffset
+        bottom_scaled = int(bottom * yscale + yoffset + 0.5)
+
+        runs = []
+        run = []
+        # The right side of the last bar, and of the rightmost bar so far
+        last_right = None
+        max_right = -math.inf
+        for xc, yc, width in zip(x, y, bar_width):
+            if yc is None:
+                if run:
+                    runs.append(run)
+                    run = []
+                last_right = None
+                continue
+            left = int((xc - width) * xscale + xoffset + 0.5)
+            right = int(xc * xscale + xoffset + 0.5)
+            top = int(yc * yscale + yoffset + 0.5)
+            if left != last_right or left < max_right:
+                if run:
+                    runs.append(run)
+                run = [(left, bottom_scaled)]
+            run += [(left, top), (right, top)]
+            last_right = right
+            if right > max_right:
+                max_right = right
+        if run:
+            runs.append(run)
+        for run in runs:
+            run.append((run[-1][0], bottom_scaled))
+        return runs
 
-        if vector_rotate:
-            vecinc_scaled *= complex(math.cos(math.radians(vector_rotate)),
-                                     math.sin(math.radians(vector_rotate)))
+    def vector(self, x, vec, vector_rotate, **options):
+        self.vectors([x], [vec], vector_rotate, **options)
 
-        # Subtract off the x increment because the x-axis
-        # *increases* to the right, unlike y, which increases
-        # downwards
-        xend_scaled = xstart_scaled - vecinc_scaled.real
-        yend_scaled = ystart_scaled + vecinc_scaled.imag
+    def vectors(self, x, vec, vector_rotate, **options):
+        """Draw a series of scaled vectors, starting from y = 0.
 
-        self.draw.line(((xstart_scaled, ystart_scaled), (xend_scaled, yend_scaled)), **options)
+        Args:
+            x(list[float]): sequence of x coordinates
+            vec(list[complex|None]): sequence of vectors. No vector is drawn for None.
+            vector_rotate(float|None): How many degrees to rotate the vectors
+            options: passed on to draw.line. Usually contains 'fill' and 'width'
+        """
+        # Work out the rotation once, rather than for every vector
+        rotation = None
+        if vector_rotate:
+            rotation = complex(math.cos(math.radians(vector_rotate)),
+                               math.sin(math.radians(vector_rotate)))
+        yscale = self.yscale
+        ystart_scaled = self.ytranslate(0)
+        xscale, xoffset = self.xscale, self.xoffset
+        line = self.draw.line
+        for xc, vc in zip(x, vec):
+            if vc is None:
+                continue
+            xstart_scaled = int(xc * xscale + xoffset + 0.5)
+            vecinc_scaled = vc * yscale
+            if rotation is not None:
+                vecinc_scaled *= rotation
+            # Subtract off the x increment because the x-axis
+            # *increases* to the right, unlike y, which increases
+            # downwards
+            line(((xstart_scaled, ystart_scaled),
+                  (xstart_scaled - vecinc_scaled.real, ystart_scaled + vecinc_scaled.imag)),
+                 **options)
 
     def xtranslate(self, x):
         return int(x * self.xscale + self.xoffset + 0.5)
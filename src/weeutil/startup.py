@@ -4,12 +4,14 @@
 #    See the file LICENSE.txt for your full rights.
 #
 """Utilities used when starting up a WeeWX application"""
+import contextlib
 import importlib
 import logging
 import os.path
 import sys
 import platform
 import locale
+import time
 
 import configobj
 
@@ -142,4 +144,112 @@ def start_app(log_label, log_name, config_option, config_arg):
     except Exception as ex:
         logger.info("Groups unavailable: %s", ex)
 
-    return config_path, config_dict, logger
\ No newline at end of file
+    return config_path, config_dict, logger
+
+
+class _TimedLoader:
+    """Wraps a module loader, recording how long it takes to load the module."""
+
+    def __init__(self, loader, timings):
+        self.loader = loader
+        self.timings = timings
+
+    def create_module(self, spec):
+        t0 = time.perf_counter()
+        try:
+            return self.loader.create_module(spec)
+        finally:
+            self.timings[spec.name] = self.timings.get(spec.name, 0) + time.perf_counter() - t0
+
+    def exec_module(self, module):
+        t0 = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            name = module.__spec__.name
+            self.timings[name] = self.timings.get(name, 0) + time.perf_counter() - t0
+
+    def __getattr__(self, attr):
+        # Anything else, such as get_data() or get_resource_reader(), goes to the real loader.
+        return getattr(self.loader, attr)
+
+
+class ImportTimer:
+    """A meta path finder that times module imports, much like 'python -X importtime'.
+
+    While installed, it records the cumulative time taken to import each module, including the
+    modules it imports in turn. It does not find any modules itself."""
+
+    def __init__(self):
+        # Key is the module name, value is the cumulative import time in seconds
+        self.timings = {}
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        # Ask the other finders for the spec, then wrap its loader
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _TimedLoader(spec.loader, self.timings)
+        return spec
+
+
+class StartupProfile:
+    """Profile the startup of weewxd.
+
+    Records the time taken by each step of starting the engine, such as loading the driver and
+    each service, as well as the time taken to import each module, then logs them once the
+    first LOOP packet arrives."""
+
+    def __init__(self, start_ts=None, top=25):
+        """Initialize an instance of StartupProfile.
+
+        Args:
+            start_ts (float|None): The time the application was launched. Default is now.
+            top (int): How many of the slowest imports to log.
+        """
+        self.start_ts = start_ts or time.time()
+        self.top = top
+        # A list of two-way tuples (label, seconds)
+        self.steps = []
+        self.import_timer = ImportTimer()
+
+    def start(self):
+        """Start timing imports."""
+        # Whatever happened before now, such as importing the modules used by weewxd itself:
+        self.steps.append(("Launch", time.time() - self.start_ts))
+        self.import_timer.install()
+
+    @contextlib.contextmanager
+    def step(self, label):
+        """Context manager that times a step of the startup."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((label, time.perf_counter() - t0))
+
+    def finish(self, label="First LOOP packet"):
+        """Stop timing imports, then log the results."""
+        elapsed = time.time() - self.start_ts
+        self.import_timer.uninstall()
+        log.info("Startup profile. %s after %.3f seconds", label, elapsed)
+        log.info("  Startup steps:")
+        for step_label, seconds in self.steps:
+            log.info("    %8.3f  %s", seconds, step_label)
+        log.info("  Slowest imports (cumulative):")
+        imports = sorted(self.import_timer.timings.items(), key=lambda x: x[1], reverse=True)
+        for module_name, seconds in imports[:self.top]:
+            log.info("    %8.3f  %s", seconds, module_name)
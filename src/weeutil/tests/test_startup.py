@@ -0,0 +1,65 @@
+#
+#    Copyright (c) 2009-2024 Tom Keffer <tkeffer@gmail.com>
+#
+#    See the file LICENSE.txt for your full rights.
+#
+"""Test the startup profiler in weeutil.startup"""
+
+import importlib
+import os.path
+import sys
+import tempfile
+import unittest
+
+import weeutil.startup
+
+MODULE_NAME = '_weeutil_test_startup_module'
+
+
+class StartupTest(unittest.TestCase):
+
+    def setUp(self):
+        # Make a small module that has never been imported
+        self.tmpdir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmpdir.name, MODULE_NAME + '.py'), 'w') as fd:
+            fd.write("import time\nanswer = 42\n")
+        sys.path.insert(0, self.tmpdir.name)
+        importlib.invalidate_caches()
+
+    def tearDown(self):
+        sys.modules.pop(MODULE_NAME, None)
+        sys.path.remove(self.tmpdir.name)
+        self.tmpdir.cleanup()
+
+    def test_import_timer(self):
+        timer = weeutil.startup.ImportTimer()
+        timer.install()
+        try:
+            self.assertIs(sys.meta_path[0], timer)
+            module = importlib.import_module(MODULE_NAME)
+        finally:
+            timer.uninstall()
+        self.assertNotIn(timer, sys.meta_path)
+        # The module still works, and its import was timed
+        self.assertEqual(module.answer, 42)
+        self.assertIn(MODULE_NAME, timer.timings)
+        self.assertGreaterEqual(timer.timings[MODULE_NAME], 0)
+        # Modules that were already imported are not timed again
+        self.assertNotIn('time', timer.timings)
+
+    def test_startup_profile(self):
+        profile = weeutil.startup.StartupProfile()
+        profile.start()
+        with profile.step("Load module"):
+            importlib.import_module(MODULE_NAME)
+        with self.assertLogs('weeutil.startup', level='INFO') as cm:
+            profile.finish()
+        self.assertNotIn(profile.import_timer, sys.meta_path)
+        self.assertEqual([label for label, _ in profile.steps], ["Launch", "Load module"])
+        self.assertIn(MODULE_NAME, profile.import_timer.timings)
+        self.assertTrue(any(line.endswith("Load module") for line in cm.output))
+        self.assertTrue(any(line.endswith(MODULE_NAME) for line in cm.output))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@
 #
 """Test routines for weeutil.weeutil."""
 
+import os
 import unittest
 
 from weeutil.weeutil import *  # @UnusedWildImport
@@ -1091,5 +1092,19 @@ class WeeutilTest(unittest.TestCase):
         self.assertEqual(natural_compare('10foo', '10foo'), 0)
         self.assertEqual(natural_compare('10foo', '11foo'), -1)
 
+    @unittest.skipUnless(hasattr(os, 'fork'), "Requires fork()")
+    def test_fork_safe_lock(self):
+        from weeutil.weeutil import ForkSafeLock
+        lock = ForkSafeLock()
+        with lock:
+            # The lock is held while forking, but the child gets a fresh one
+            pid = os.fork()
+            if not pid:
+                os._exit(0 if lock.acquire(timeout=5) else 1)
+            _, status = os.waitpid(pid, 0)
+            self.assertEqual(os.WEXITSTATUS(status), 0)
+            self.assertTrue(lock.locked())
+        self.assertFalse(lock.locked())
+
 if __name__ == '__main__':
     unittest.main()
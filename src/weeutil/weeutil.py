@@ -18,7 +18,9 @@ import math
 import os
 import re
 import shutil
+import threading
 import time
+import weakref
 from collections import ChainMap
 
 # importlib.resources is 3.7 or later, importlib_resources is the backport
@@ -1410,6 +1412,55 @@ def get_object(module_class):
 _get_object = get_object
 
 
+class ForkSafeLock:
+    """A lock that can be used in the child of a fork.
+
+    A process forked from a threaded process, such as weewxd, starts with a copy of all its
+    locks. A lock that some other thread was holding at the time would never get released in
+    the child, so every ForkSafeLock is replaced by a fresh lock in the child of a fork.
+
+    It is used like a threading.Lock:
+    >>> lock = ForkSafeLock()
+    >>> with lock:
+    ...     lock.locked()
+    True
+    >>> lock.locked()
+    False
+    """
+
+    # All the instances, so they can be replaced after a fork
+    _instances = weakref.WeakSet()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        ForkSafeLock._instances.add(self)
+
+    def acquire(self, blocking=True, timeout=-1):
+        return self._lock.acquire(blocking, timeout)
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        return self._lock.__enter__()
+
+    def __exit__(self, *args):
+        return self._lock.__exit__(*args)
+
+    @classmethod
+    def _after_fork_in_child(cls):
+        for lock in list(cls._instances):
+            lock._lock = threading.Lock()
+
+
+# Not every platform can fork
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=ForkSafeLock._after_fork_in_child)
+
+
 class GenWithPeek:
     """Generator object which allows a peek at the next object to be returned.
     
@@ -1653,6 +1704,9 @@ def rounder(x, ndigits):
     elif isinstance(x, float):
         return round(x, ndigits) if ndigits else int(x)
     elif is_iterable(x):
+        if ndigits:
+            # Fast path for the common case of a list of floats
+            return [round(v, ndigits) if type(v) is float else rounder(v, ndigits) for v in x]
         return [rounder(v, ndigits) for v in x]
     return x
 
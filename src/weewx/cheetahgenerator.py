@@ -57,6 +57,7 @@ Example:
 
 """
 
+import bisect
 import datetime
 import json
 import logging
@@ -72,6 +73,7 @@ import weeutil.logger
 import weeutil.weeutil
 import weewx.almanac
 import weewx.reportengine
+import weewx.reportprofile
 import weewx.station
 import weewx.tags
 import weewx.units
@@ -80,6 +82,9 @@ from weeutil.weeutil import to_bool, to_int, timestamp_to_string
 
 log = logging.getLogger(__name__)
 
+# How many sets of search list extensions to keep, one for each timespan and binding
+MAX_CACHED_EXTENSIONS = 8
+
 # The default search list includes standard information sources that should be
 # useful in most templates.
 default_search_list = [
@@ -139,6 +144,15 @@ class CheetahGenerator(weewx.reportengine.ReportGenerator):
         # This dictionary will hold the formatted dates of all generated files
         self.outputted_dict = {k: [] for k in CheetahGenerator.generator_dict}
 
+        # Cache of the days that changed, keyed by data binding
+        self.dirty_days = {}
+
+        # Cache of database lookup functions, keyed by data binding
+        self.db_lookups = {}
+        # Cache of search list extensions, keyed by (timespan, data binding). The most recently
+        # used are last.
+        self.extension_cache = {}
+
     def run(self):
         """Main entry point for file generation using Cheetah Templates."""
 
@@ -162,15 +176,21 @@ class CheetahGenerator(weewx.reportengine.ReportGenerator):
         # configure the search list extensions
         self.init_extensions(gen_dict[section_name])
 
+        # Files whose contents have not changed will not be written again
+        self.manifest = weewx.reportengine.FileManifest.fromSkinDict(
+            self.config_dict, self.skin_dict,
+            to_bool(search_up(gen_dict[section_name], 'skip_unchanged', True)))
+
         # Generate any templates in the given dictionary:
         ngen = self.generate(gen_dict[section_name], section_name, self.gen_ts)
 
         self.teardown()
+        self.manifest.save()
 
         elapsed_time = time.time() - t1
         if log_success:
-            log.info("Generated %d files for report %s in %.2f seconds",
-                     ngen, self.skin_dict['REPORT_NAME'], elapsed_time)
+            log.info("Generated %d files for report %s in %.2f seconds (%d unchanged)",
+                     ngen, self.skin_dict['REPORT_NAME'], elapsed_time, self.manifest.nskipped)
 
     def init_extensions(self, gen_dict):
         """Load the search list"""
@@ -198,6 +218,8 @@ class CheetahGenerator(weewx.reportengine.ReportGenerator):
     def teardown(self):
         """Delete any extension objects we created to prevent back references
         from slowing garbage collection"""
+        self.extension_cache.clear()
+        self.db_lookups.clear()
         while self.search_list_objs:
             self.search_list_objs[-1].finalize()
             del self.search_list_objs[-1]
@@ -287,10 +309,12 @@ class CheetahGenerator(weewx.reportengine.ReportGenerator):
             # Get the absolute path for the target of this template
             _fullname = os.path.join(dest_dir, _filename)
 
-            # Skip summary files outside the timespan
+            # Skip summary files outside the timespan, unless their data have changed since
+            # they were generated
             if report_dict['summarize_by'] in CheetahGenerator.generator_dict \
                     and os.path.exists(_fullname) \
-                    and not timespan.includesArchiveTime(stop_ts):
+                    and not timespan.includesArchiveTime(stop_ts) \
+                    and not self._is_dirty(default_binding, timespan, _fullname):
                 continue
 
             # skip files that are fresh, but only if staleness is defined
@@ -298,7 +322,7 @@ class CheetahGenerator(weewx.reportengine.ReportGenerator):
             if stale is not None:
                 t_now = time.time()
                 try:
-                    last_mod = os.path.getmtime(_fullname)
+                    last_mod = self.manifest.getmtime(_fullname)
                     if t_now - last_mod < stale:
                         log.debug("Skip '%s': last_mod=%s age=%s stale=%s",
                                   _filename, last_mod, t_now - last_mod, stale)
@@ -315,11 +339,12 @@ class CheetahGenerator(weewx.reportengine.ReportGenerator):
             # First, compile the template
             try:
                 # TODO: Look into caching the compiled template.
-                compiled_template = Cheetah.Template.Template(
-                    file=template,
-                    searchList=searchList,
-                    filter='AssureUnicode',
-                    filtersLib=weewx.cheetahgenerator)
+                with weewx.reportprofile.timed('template', _fullname, 'compile'):
+                    compiled_template = Cheetah.Template.Template(
+                        file=template,
+                        searchList=searchList,
+                        filter='AssureUnicode',
+                        filtersLib=weewx.cheetahgenerator)
             except Exception as e:
                 log.error("Compilation of template %s failed with exception '%s'", template, type(e))
                 log.error("**** Ignoring template %s", template)
@@ -331,7 +356,8 @@ class CheetahGenerator(weewx.reportengine.ReportGenerator):
             try:
                 # We have a compiled template in hand. Evaluate it. The result will be a long
                 # Unicode string.
-                unicode_string = compiled_template.respond()
+                with weewx.reportprofile.timed('template', _fullname, 'evaluate'):
+                    unicode_string = compiled_template.respond()
             except Cheetah.Parser.ParseError as e:
                 log.error("Parse error while evaluating file %s", template)
                 log.error("**** Ignoring template %s", template)
@@ -363,24 +389,32 @@ class CheetahGenerator(weewx.reportengine.ReportGenerator):
             else:
                 byte_string = unicode_string.encode(encoding)
 
-            # Finally, write the byte string to the target file
-            try:
-                # Write to a temporary file first
-                tmpname = _fullname + '.tmp'
-                # Open it in binary mode. We are writing a byte-string, not a string
-                with open(tmpname, mode='wb') as fd:
-                    fd.write(byte_string)
-                # Now move the temporary file into place
-                os.rename(tmpname, _fullname)
-                ngen += 1
-            finally:
-                try:
-                    os.unlink(tmpname)
-                except OSError:
-                    pass
+            # Finally, write the byte string to the target file, unless it already holds it
+            with weewx.reportprofile.timed('template', _fullname, 'write'):
+                self.manifest.write(_fullname, byte_string)
+            ngen += 1
 
         return ngen
 
+    def _is_dirty(self, binding, timespan, file_name):
+        """Return True if data in the timespan changed after the file was generated."""
+        if binding not in self.dirty_days:
+            db_manager = self.db_binder.get_manager(binding)
+            try:
+                dirty_days = db_manager.get_dirty_days()
+            except (AttributeError, weedb.DatabaseError):
+                # No daily summaries, or no log of the days that changed.
+                dirty_days = []
+            # Save as two lists: the start of each day, and the time it last changed
+            self.dirty_days[binding] = ([row[0] for row in dirty_days],
+                                        [row[1] for row in dirty_days])
+        sods, modified = self.dirty_days[binding]
+        i = bisect.bisect_left(sods, timespan.start)
+        j = bisect.bisect_left(sods, timespan.stop)
+        if i == j:
+            return False
+        return max(modified[i:j]) > self.manifest.getmtime(file_name)
+
     def _getSearchList(self, encoding, timespan, default_binding, section_name, file_name):
         """Get the complete search list to be used by Cheetah."""
 
@@ -394,11 +428,28 @@ class CheetahGenerator(weewx.reportengine.ReportGenerator):
                        self.outputted_dict]
 
         # Bind to the default_binding:
-        db_lookup = self.db_binder.bind_default(default_binding)
-
-        # Then add the V3.X style search list extensions
-        for obj in self.search_list_objs:
-            search_list += obj.get_extension_list(timespan, db_lookup)
+        if default_binding not in self.db_lookups:
+            self.db_lookups[default_binding] = self.db_binder.bind_default(default_binding)
+        db_lookup = self.db_lookups[default_binding]
+
+        # Then add the V3.X style search list extensions. Templates with the same timespan and
+        # binding can share the extensions that are cacheable.
+        # Summaries by day or month go through many timespans, so only the most recently used
+        # are kept.
+        cache_key = (tuple(timespan), default_binding)
+        extension_lists = self.extension_cache.pop(cache_key, None)
+        if extension_lists is None:
+            if len(self.extension_cache) >= MAX_CACHED_EXTENSIONS:
+                # Forget the least recently used
+                del self.extension_cache[next(iter(self.extension_cache))]
+            extension_lists = [
+                obj.get_extension_list(timespan, db_lookup) if obj.is_cacheable() else None
+                for obj in self.search_list_objs]
+        self.extension_cache[cache_key] = extension_lists
+        for obj, extension_list in zip(self.search_list_objs, extension_lists):
+            if extension_list is None:
+                extension_list = obj.get_extension_list(timespan, db_lookup)
+            search_list += extension_list
 
         return search_list
 
@@ -475,6 +526,11 @@ class CheetahGenerator(weewx.reportengine.ReportGenerator):
 class SearchList:
     """Abstract base class used for search list extensions."""
 
+    # Set to True if get_extension_list() returns the same thing, given the same timespan and
+    # data binding. Then the generator will call it only once for all the templates that share
+    # a timespan and binding.
+    cacheable = False
+
     def __init__(self, generator):
         """Create an instance of SearchList.
 
@@ -496,6 +552,12 @@ class SearchList:
         """
         return [self]
 
+    def is_cacheable(self):
+        """Return True if the results of get_extension_list() can be reused.
+
+        Extensions that do not override get_extension_list() can always be reused."""
+        return self.cacheable or type(self).get_extension_list is SearchList.get_extension_list
+
     def finalize(self):
         """Called when the extension is no longer needed"""
 
@@ -503,6 +565,9 @@ class SearchList:
 class Almanac(SearchList):
     """Class that implements the '$almanac' tag."""
 
+    # The almanac is made once, for the time of the report, and shared by all the templates.
+    cacheable = True
+
     def __init__(self, generator):
         SearchList.__init__(self, generator)
 
@@ -571,6 +636,8 @@ class Station(SearchList):
 class Current(SearchList):
     """Class that implements the $current tag"""
 
+    cacheable = True
+
     def get_extension_list(self, timespan, db_lookup):
         record_binder = weewx.tags.RecordBinder(db_lookup, timespan.stop,
                                                 self.generator.formatter, self.generator.converter,
@@ -582,6 +649,8 @@ class Stats(SearchList):
     """Class that implements the time-based statistical tags, such
     as $day.outTemp.max"""
 
+    cacheable = True
+
     def get_extension_list(self, timespan, db_lookup):
         try:
             trend_dict = self.generator.skin_dict['Units']['Trend']
@@ -7,7 +7,9 @@
 """Main engine for the weewx weather system."""
 
 # Python imports
+import contextlib
 import gc
+import importlib.util
 import logging
 import math
 import socket
@@ -52,10 +54,16 @@ class StdEngine:
     When a service loads, it binds callbacks to events. When an event occurs,
     the bound callback will be called."""
 
-    def __init__(self, config_dict):
+    def __init__(self, config_dict, startup_profile=None):
         """Initialize an instance of StdEngine.
         
-        config_dict: The configuration dictionary. """
+        config_dict: The configuration dictionary.
+
+        startup_profile: An instance of weeutil.startup.StartupProfile. If given, the time taken
+        by each step of the startup will be recorded, and the engine will exit after the first
+        LOOP packet. Default is None (no profiling)."""
+
+        self.startup_profile = startup_profile
 
         # Set a default socket time out, in case FTP or HTTP hang:
         timeout = int(config_dict.get('socket_timeout', 20))
@@ -101,7 +109,8 @@ class StdEngine:
         log.info("Loading station type %s (%s)", station_type, driver)
 
         # Import the driver:
-        __import__(driver)
+        with self._profile_step("Import driver %s" % driver):
+            __import__(driver)
 
         # Open up the weather station, wrapping it in a try block in case
         # of failure.
@@ -112,7 +121,8 @@ class StdEngine:
             # Find the function 'loader' within the module:
             loader_function = getattr(driver_module, 'loader')
             # Call it with the configuration dictionary as the only argument:
-            self.console = loader_function(config_dict, self)
+            with self._profile_step("Load driver %s" % driver):
+                self.console = loader_function(config_dict, self)
         except Exception as ex:
             log.error("Import of driver failed: %s (%s)", ex, type(ex))
             weeutil.logger.log_traceback(log.critical, "    ****  ")
@@ -154,7 +164,8 @@ class StdEngine:
                     log.debug("Loading service %s", svc)
                     # Get the class, then instantiate it with self and the config dictionary as
                     # arguments:
-                    obj = weeutil.weeutil.get_object(svc)(self, config_dict)
+                    with self._profile_step("Load service %s" % svc):
+                        obj = weeutil.weeutil.get_object(svc)(self, config_dict)
                     # Append it to the list of open services.
                     self.service_obj.append(obj)
                     log.debug("Finished loading service %s", svc)
@@ -164,6 +175,12 @@ class StdEngine:
             self.shutDown()
             raise
 
+    def _profile_step(self, label):
+        """Return a context manager that times a startup step, if profiling."""
+        if self.startup_profile:
+            return self.startup_profile.step(label)
+        return contextlib.nullcontext()
+
     def run(self):
         """Main execution entry point."""
 
@@ -171,7 +188,8 @@ class StdEngine:
         # should an exception occur:
         try:
             # Send out a STARTUP event:
-            self.dispatchEvent(weewx.Event(weewx.STARTUP))
+            with self._profile_step("STARTUP event"):
+                self.dispatchEvent(weewx.Event(weewx.STARTUP))
 
             log.info("Starting main packet loop.")
 
@@ -205,6 +223,11 @@ class StdEngine:
                         # Package the packet as an event, then dispatch it.
                         self.dispatchEvent(weewx.Event(weewx.NEW_LOOP_PACKET, packet=packet))
 
+                        # If we are profiling the startup, we are done.
+                        if self.startup_profile:
+                            self.startup_profile.finish()
+                            return
+
                         # Allow services to break the loop by throwing
                         # an exception:
                         self.dispatchEvent(weewx.Event(weewx.CHECK_LOOP, packet=packet))
@@ -849,12 +872,11 @@ class StdReport(StdService):
         self.launch_time = None
         self.record = None
 
-        # check if pyephem is installed and make a suitable log entry
-        try:
-            import ephem
+        # Check if pyephem is installed and make a suitable log entry. Only look for it: it is
+        # slow to import, and only the report thread needs it.
+        if importlib.util.find_spec('ephem'):
             log.info("'pyephem' detected, extended almanac data is available")
-            del ephem
-        except ImportError:
+        else:
             log.info("'pyephem' not detected, extended almanac data is not available")
 
         self.bind(weewx.NEW_ARCHIVE_RECORD, self.new_archive_record)
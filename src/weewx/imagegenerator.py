@@ -6,8 +6,13 @@
 """Generate images for up to an effective date.
 Should probably be refactored into smaller functions."""
 
+import concurrent.futures
 import datetime
+import hashlib
+import io
+import json
 import logging
+import multiprocessing
 import os.path
 import time
 
@@ -15,11 +20,14 @@ import weeplot.genplot
 import weeplot.utilities
 import weeutil.logger
 import weeutil.weeutil
+import weewx.manager
 import weewx.reportengine
+import weewx.reportprofile
+import weewx.seriescache
 import weewx.units
 import weewx.xtypes
 from weeutil.config import search_up, accumulateLeaves
-from weeutil.weeutil import to_bool, to_int, to_float, TimeSpan
+from weeutil.weeutil import to_bool, to_int, to_float, max_with_none, option_as_list, TimeSpan
 from weewx.units import ValueTuple
 
 log = logging.getLogger(__name__)
@@ -47,6 +55,16 @@ class ImageGenerator(weewx.reportengine.ReportGenerator):
         self.image_dict = self.skin_dict['ImageGenerator']
         self.formatter = weewx.units.Formatter.fromSkinDict(self.skin_dict)
         self.converter = weewx.units.Converter.fromSkinDict(self.skin_dict)
+        # Series used by more than one plot line. Key is the key of the request, value is a
+        # two-way tuple (series, number of lines still to use it).
+        self.shared_series = {}
+        # The time of the last record in an x-domain. Key is a three-way tuple (binding, start,
+        # stop).
+        self.last_timestamps = {}
+        # Aggregated series can be cached on disk, for all reports. Key is a binding, value is
+        # an instance of weewx.seriescache.SeriesCache, or None if there is no cache.
+        self.series_caches = {}
+        self.use_series_cache = to_bool(search_up(self.image_dict, 'plot_cache', False))
         # ensure that the skin_dir is in the image_dict
         self.image_dict['skin_dir'] = os.path.join(
             self.config_dict['WEEWX_ROOT'],
@@ -70,6 +88,17 @@ class ImageGenerator(weewx.reportengine.ReportGenerator):
         # determine how much logging is desired
         log_success = to_bool(search_up(self.image_dict, 'log_success', True))
 
+        # Images that have not changed will not be saved again
+        self.manifest = weewx.reportengine.FileManifest.fromSkinDict(
+            self.config_dict, self.skin_dict,
+            to_bool(search_up(self.image_dict, 'skip_unchanged', True)))
+
+        # Make a list of the plots that need to be done. Each is a four-way tuple
+        # (timespan, plotname, plotgen_ts, img_file).
+        jobs = []
+        # The watermark of each plot to be done, keyed by its image file
+        watermarks = {}
+
         # Loop over each time span class (day, week, month, etc.):
         for timespan in self.image_dict.sections:
 
@@ -89,43 +118,354 @@ class ImageGenerator(weewx.reportengine.ReportGenerator):
 
                 image_root = os.path.join(self.config_dict['WEEWX_ROOT'],
                                           plot_options['HTML_ROOT'])
+                try:
+                    renderer = weeplot.genplot.get_renderer(plot_options.get('renderer', 'pil'))
+                except ValueError as e:
+                    log.error("Skipped plot %s: %s", plotname, e)
+                    continue
                 # Get the path that the image is going to be saved to:
-                img_file = os.path.join(image_root, '%s.png' % plotname)
+                img_file = os.path.join(image_root, '%s.%s' % (plotname, renderer.extension))
 
                 # Check whether this plot needs to be done at all:
-                if _skip_this_plot(plotgen_ts, plot_options, img_file):
+                watermark = self.plot_watermark(plotgen_ts, plot_options,
+                                                self.image_dict[timespan][plotname])
+                if _skip_this_plot(plotgen_ts, plot_options, img_file, self.manifest,
+                                   watermark):
                     continue
 
-                # Generate the plot.
-                plot = self.gen_plot(plotgen_ts,
-                                     plot_options,
-                                     self.image_dict[timespan][plotname])
-
-                # 'plot' will be None if skip_if_empty was truthy, and the plot contains no data
-                if plot:
-                    # We have a valid plot. Render it onto an image
-                    image = plot.render()
-
-                    # Create the subdirectory that the image is to be put in. Wrap in a try block
-                    # in case it already exists.
-                    try:
-                        os.makedirs(os.path.dirname(img_file))
-                    except OSError:
-                        pass
-
-                    try:
-                        # Now save the image
-                        image.save(img_file)
-                        ngen += 1
-                    except IOError as e:
-                        log.error("Unable to save to file '%s' %s:", img_file, e)
+                jobs.append((timespan, plotname, plotgen_ts, img_file))
+                watermarks[img_file] = watermark
+
+        # Fetch the series used by more than one plot line. If the plots are generated by a
+        # pool of workers, they all start with these.
+        self.share_series(jobs)
+
+        max_workers = to_int(search_up(self.image_dict, 'image_workers', 1))
+
+        for img_file, png, timings in self.run_jobs(jobs, max_workers):
+            log.debug("Plot %s: %s", img_file,
+                      ", ".join("%s %.3f s" % (step, seconds) for step, seconds in timings))
+            if weewx.reportprofile.current:
+                for step, seconds in timings:
+                    weewx.reportprofile.current.add('plot', img_file, step, seconds)
+
+            # 'png' will be None if skip_if_empty was truthy, and the plot contains no data
+            if png is None:
+                continue
+
+            # Create the subdirectory that the image is to be put in. Wrap in a try block
+            # in case it already exists.
+            try:
+                os.makedirs(os.path.dirname(img_file))
+            except OSError:
+                pass
+
+            try:
+                # Now save the image, unless it has not changed
+                with weewx.reportprofile.timed('plot', img_file, 'write'):
+                    self.manifest.write(img_file, png)
+                self.manifest.set_watermark(img_file, watermarks[img_file])
+                ngen += 1
+            except IOError as e:
+                log.error("Unable to save to file '%s' %s:", img_file, e)
+
+        self.manifest.save()
+        self.shared_series = {}
+        self.last_timestamps = {}
 
         t2 = time.time()
 
         if log_success:
-            log.info("Generated %d images for report %s in %.2f seconds",
+            log.info("Generated %d images for report %s in %.2f seconds (%d unchanged)",
                      ngen,
-                     self.skin_dict['REPORT_NAME'], t2 - t1)
+                     self.skin_dict['REPORT_NAME'], t2 - t1, self.manifest.nskipped)
+
+    def plot_watermark(self, plotgen_ts, plot_options, plot_dict):
+        """Return what goes into the image of a plot, as a list that can be saved as JSON. If it
+        is the same as when the image was generated, the image would not change.
+
+        The watermark is a list [last_ts, start, stop, bottom_label, options_hash]. Element
+        last_ts is the time of the last record in the x-domain (start, stop] of the plot. If the
+        plot and its lines use more than one binding, it is the latest of them. Element
+        options_hash is a hash of the options of the plot and its lines, the location of the
+        station, and the units and labels of the skin.
+        """
+        x_domain, _ = _get_x_domain(plotgen_ts, plot_options)
+        lines = {line_name: accumulateLeaves(plot_dict[line_name])
+                 for line_name in plot_dict.sections}
+        bindings = {plot_options['data_binding']}
+        bindings.update(line_options['data_binding'] for line_options in lines.values())
+        last_ts = max_with_none(self._last_timestamp(binding, x_domain) for binding in bindings)
+        options = json.dumps([plot_options, lines,
+                              self.stn_info.latitude_f, self.stn_info.longitude_f,
+                              self.skin_dict.get('Units'), self.skin_dict.get('Labels'),
+                              self.text_dict],
+                             sort_keys=True, default=str)
+        return [last_ts, x_domain.start, x_domain.stop,
+                _get_bottom_label(plotgen_ts, plot_options),
+                hashlib.blake2b(options.encode('utf-8'), digest_size=16).hexdigest()]
+
+    def _last_timestamp(self, binding, x_domain):
+        """Return the time of the last record in an x-domain, or None if there is none."""
+        key = (binding, x_domain.start, x_domain.stop)
+        if key not in self.last_timestamps:
+            db_manager = self.db_binder.get_manager(binding)
+            row = db_manager.getSql("SELECT MAX(dateTime) FROM %s "
+                                    "WHERE dateTime > ? AND dateTime <= ?"
+                                    % db_manager.table_name, x_domain)
+            self.last_timestamps[key] = row[0] if row else None
+        return self.last_timestamps[key]
+
+    def share_series(self, jobs):
+        """Find the series that are used by more than one line of the plots, and fetch them.
+
+        Lines share a series if they ask for the same type, from the same binding, over the same
+        x-domain, with the same aggregation.
+
+        Args:
+            jobs (list[tuple]): Four-way tuples (timespan, plotname, plotgen_ts, img_file).
+        """
+        # Key is the key of a request, value is a list [args, number of lines]
+        requests = {}
+        nlines = 0
+        for timespan, plotname, plotgen_ts, _ in jobs:
+            plot_dict = self.image_dict[timespan][plotname]
+            plot, x_domain = self._new_plot(plotgen_ts, accumulateLeaves(plot_dict))
+            for line_name in plot_dict.sections:
+                line_options = accumulateLeaves(plot_dict[line_name])
+                plot_type = line_options.get('plot_type', 'line').lower()
+                try:
+                    aggregate_type, aggregate_interval = _get_aggregation(line_options)
+                except KeyError:
+                    # Function gen_plot() will log the error
+                    continue
+                if plot_type not in {'line', 'bar', 'vector'}:
+                    continue
+                key, option_dict = self._series_request(plot, x_domain, plotgen_ts, line_name,
+                                                        line_options, plot_type, aggregate_type,
+                                                        aggregate_interval)
+                args = (key[1], x_domain, key[0], aggregate_type, aggregate_interval,
+                        option_dict)
+                requests.setdefault(key, [args, 0])[1] += 1
+                nlines += 1
+
+        self.shared_series = {}
+        for key, (args, uses) in requests.items():
+            if uses > 1:
+                try:
+                    self.shared_series[key] = (self.fetch_series(*args), uses)
+                except Exception as e:
+                    # Leave it to each line. It may not even need the series, if the plot
+                    # turns out to be empty.
+                    log.debug("Unable to fetch series '%s' to share: %s", key[1], e)
+        log.debug("Fetched %d series for %d plot lines (%d queries saved)",
+                  len(requests), nlines, nlines - len(requests))
+
+    def run_jobs(self, jobs, max_workers=1):
+        """Generate the images of a list of plots, using up to max_workers processes.
+
+        Args:
+            jobs (list[tuple]): Four-way tuples (timespan, plotname, plotgen_ts, img_file).
+            max_workers (int): How many plots to generate at the same time.
+
+        Yields:
+            tuple: The results of gen_image(), in the same order as the jobs.
+        """
+        if max_workers > 1 and len(jobs) > 1 \
+                and 'fork' in multiprocessing.get_all_start_methods():
+            log.debug("Generating %d images with up to %d workers", len(jobs), max_workers)
+            # Use 'fork', so the workers start with everything that has been set up in this
+            # process, including this generator.
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=min(max_workers, len(jobs)),
+                    mp_context=multiprocessing.get_context('fork'),
+                    initializer=_init_worker,
+                    initargs=(self,)) as executor:
+                for result, (bands, wind_bins) in executor.map(_gen_image_in_worker, jobs):
+                    # Keep what the worker has cached, so it is still there for the next run.
+                    _merge_cache(weeplot.genplot._daynight_bands, bands,
+                                 weeplot.genplot.MAX_DAYNIGHT_BANDS)
+                    _merge_cache(_wind_bins, wind_bins, MAX_WIND_BIN_DAYS)
+                    yield result
+        else:
+            for job in jobs:
+                yield self.gen_image(*job)
+
+    def gen_image(self, timespan, plotname, plotgen_ts, img_file):
+        """Generate the image of a single plot, in the format of its renderer.
+
+        Args:
+            timespan (str): The time span class of the plot, such as 'day_images'.
+            plotname (str): The name of the plot within the time span class.
+            plotgen_ts (float): The time for which the plot will be valid.
+            img_file (str): The path the image will be saved to.
+
+        Returns:
+            tuple: A three-way tuple (img_file, png, timings). Element 'png' is the image data,
+                such as PNG, or None if skip_if_empty was truthy and the plot contains no data.
+                Element 'timings' is a list of two-way tuples (step, seconds).
+        """
+        plot_dict = self.image_dict[timespan][plotname]
+        timings = []
+
+        t0 = time.perf_counter()
+        plot_options = accumulateLeaves(plot_dict)
+        if plot_options.get('plot_type', 'line').lower() == 'windrose':
+            plot = self.gen_windrose(plotgen_ts, plot_options)
+        else:
+            plot = self.gen_plot(plotgen_ts, plot_options, plot_dict)
+        timings.append(('fetch', time.perf_counter() - t0))
+        if not plot:
+            return img_file, None, timings
+
+        t0 = time.perf_counter()
+        image = plot.render()
+        timings.append(('render', time.perf_counter() - t0))
+
+        t0 = time.perf_counter()
+        buf = io.BytesIO()
+        image.save(buf, format=plot.renderer.format)
+        timings.append(('encode', time.perf_counter() - t0))
+        return img_file, buf.getvalue(), timings
+
+    def gen_windrose(self, plotgen_ts, plot_options):
+        """Generate a wind rose.
+
+        Args:
+            plotgen_ts (float): A timestamp for which the plot will be valid.
+            plot_options (dict): The options of the plot.
+
+        Returns:
+            weeplot.genplot.WindRosePlot|None: The wind rose, ready to render, or None if
+                skip_if_empty was truthy and there was no wind, or the database is still empty.
+        """
+        plot = weeplot.genplot.WindRosePlot(plot_options)
+        x_domain, _ = _get_x_domain(plotgen_ts, plot_options)
+        plot.setBottomLabel(_get_bottom_label(plotgen_ts, plot_options))
+        ordinates = self.formatter.ordinate_names
+        if len(ordinates) >= 16:
+            plot.setDirectionLabels(ordinates[0:16:4])
+
+        db_manager = self.db_binder.get_manager(plot_options['data_binding'])
+        if db_manager.std_unit_system is None:
+            # No records yet, so the unit of the speeds is not known
+            return None
+        speed_type = plot_options.get('speed_type', 'windSpeed')
+        direction_type = plot_options.get('direction_type', 'windDir')
+        ndirections = to_int(plot_options.get('direction_bins', 16))
+
+        # The speed classes are in the unit of the plot. They have to be converted to the unit
+        # of the database.
+        if plot_options.get('unit'):
+            unit = plot_options['unit']
+            unit_group = weewx.units.getUnitGroup(speed_type)
+        else:
+            unit, unit_group = self.converter.getTargetUnit(speed_type)
+        speed_bins = [float(v) for v in option_as_list(
+            plot_options.get('speed_bins', DEFAULT_SPEED_BINS.get(unit, [2, 5, 10, 15, 20])))]
+        calm_speed = float(plot_options.get('calm_speed', 0))
+        db_unit, _ = weewx.units.getStandardUnitType(db_manager.std_unit_system, speed_type)
+        db_values = weewx.units.convert(ValueTuple(speed_bins + [calm_speed], unit, unit_group),
+                                        db_unit)[0]
+
+        counts, calm = get_wind_bins(db_manager, x_domain, speed_type, direction_type,
+                                     db_values[:-1], db_values[-1], ndirections)
+        total = calm + sum(sum(speeds) for speeds in counts)
+        if not total and _get_check_domain(plot_options.get('skip_if_empty', False), x_domain):
+            return None
+
+        labels = ['< %g' % speed_bins[0]] \
+            + ['%g-%g' % pair for pair in zip(speed_bins, speed_bins[1:])] \
+            + ['> %g' % speed_bins[-1]]
+        percent = 100.0 / total if total else 0.0
+        plot.setBins([[count * percent for count in speeds] for speeds in counts],
+                     calm * percent if to_bool(plot_options.get('show_calm', True)) else None,
+                     labels)
+        plot.setUnitLabel(plot_options.get(
+            'y_label', self.formatter.get_label_string(unit)).strip())
+        return plot
+
+    def _new_plot(self, plotgen_ts, plot_options):
+        """Create a new time plot, with its x-scaling set.
+
+        Returns:
+            tuple: A two-way tuple (plot, x_domain).
+        """
+        plot = weeplot.genplot.TimePlot(plot_options)
+        x_domain, timeinc = _get_x_domain(plotgen_ts, plot_options)
+        plot.setXScaling((x_domain.start, x_domain.stop, timeinc))
+        return plot, x_domain
+
+    def _series_request(self, plot, x_domain, plotgen_ts, line_name, line_options, plot_type,
+                        aggregate_type, aggregate_interval):
+        """Work out the series a plot line needs.
+
+        Returns:
+            tuple: A two-way tuple (key, option_dict). Lines with the same key can share the
+                series. The first two elements of the key are the binding and the type. The
+                option dictionary is to be passed on to the xtypes. Any of its options may
+                change the series, so they are all part of the key, except plotgen_ts.
+        """
+        var_type = line_options.get('data_type', line_name)
+
+        # We need to pass the line options and plotgen_ts to our xtype.
+        # First get a copy of line_options...
+        option_dict = dict(line_options)
+        # ...then pop off aggregate_type and aggregate_interval because they appear as explicit
+        # arguments in our xtypes call...
+        option_dict.pop('aggregate_type', None)
+        option_dict.pop('aggregate_interval', None)
+        # ...then add plotgen_ts.
+        option_dict['plotgen_ts'] = plotgen_ts
+
+        # A line with more points than pixel columns can be thinned out without changing
+        # how it looks. The columns depend on the size of the plot.
+        decimate_column = _get_decimate_column(plot, plot_type, aggregate_type,
+                                               line_options, x_domain)
+        if decimate_column:
+            option_dict['decimate_column'] = decimate_column
+            columns = (plot.image_width, plot.lmargin, plot.rmargin, plot.padding)
+        else:
+            columns = None
+
+        options = tuple(sorted((name, repr(value)) for name, value in option_dict.items()
+                               if name not in ('plotgen_ts', 'decimate_column')))
+        key = (line_options['data_binding'], var_type, x_domain.start, x_domain.stop,
+               aggregate_type, aggregate_interval, options, columns)
+        return key, option_dict
+
+    def fetch_series(self, var_type, x_domain, binding, aggregate_type, aggregate_interval,
+                     option_dict):
+        """Fetch the series of a plot line from the database.
+
+        Returns:
+            tuple: A three-way tuple (start_vec_t, stop_vec_t, data_vec_t) of ValueTuples.
+        """
+        db_manager = self.db_binder.get_manager(binding)
+        if self.use_series_cache and binding not in self.series_caches:
+            self.series_caches[binding] = weewx.seriescache.SeriesCache.fromConfigDict(
+                self.config_dict, binding)
+        series_cache = self.series_caches.get(binding)
+        get_series = series_cache.get_series if series_cache else weewx.xtypes.get_series
+        start_vec_t, stop_vec_t, data_vec_t = get_series(
+            var_type,
+            x_domain,
+            db_manager,
+            aggregate_type=aggregate_type,
+            aggregate_interval=aggregate_interval,
+            **option_dict)
+
+        # Not all xtypes know how to thin out the data. Do it here, if they did not.
+        decimate_column = option_dict.get('decimate_column')
+        if decimate_column and len(stop_vec_t[0]) > 4 * (decimate_column(x_domain.stop)
+                                                         - decimate_column(x_domain.start)):
+            rows = list(weewx.xtypes.decimate(zip(start_vec_t[0], stop_vec_t[0],
+                                                  data_vec_t[0]),
+                                              decimate_column))
+            start_vec_t = ValueTuple([row[0] for row in rows], start_vec_t[1], start_vec_t[2])
+            stop_vec_t = ValueTuple([row[1] for row in rows], stop_vec_t[1], stop_vec_t[2])
+            data_vec_t = ValueTuple([row[2] for row in rows], data_vec_t[1], data_vec_t[2])
+        return start_vec_t, stop_vec_t, data_vec_t
 
     def gen_plot(self, plotgen_ts, plot_options, plot_dict):
         """Generate a single plot image.
@@ -145,28 +485,14 @@ class ImageGenerator(weewx.reportengine.ReportGenerator):
         """
 
         # Create a new instance of a time plot and start adding to it
-        plot = weeplot.genplot.TimePlot(plot_options)
-
-        time_length = weeutil.weeutil.nominal_spans(plot_options.get('time_length', 86400))
-        # Calculate a suitable min, max time for the requested time.
-        minstamp, maxstamp, timeinc = weeplot.utilities.scaletime(plotgen_ts - time_length,
-                                                                  plotgen_ts)
-        x_domain = weeutil.weeutil.TimeSpan(minstamp, maxstamp)
-
-        # Override the x interval if the user has given an explicit interval:
-        timeinc_user = to_int(plot_options.get('x_interval'))
-        if timeinc_user is not None:
-            timeinc = timeinc_user
-        plot.setXScaling((x_domain.start, x_domain.stop, timeinc))
+        plot, x_domain = self._new_plot(plotgen_ts, plot_options)
 
         # Set the y-scaling, using any user-supplied hints:
         yscale = plot_options.get('yscale', ['None', 'None', 'None'])
         plot.setYScaling(weeutil.weeutil.convertToFloat(yscale))
 
         # Get a suitable bottom label:
-        bottom_label_format = plot_options.get('bottom_label_format', '%m/%d/%y %H:%M')
-        bottom_label = time.strftime(bottom_label_format, time.localtime(plotgen_ts))
-        plot.setBottomLabel(bottom_label)
+        plot.setBottomLabel(_get_bottom_label(plotgen_ts, plot_options))
 
         # Set day/night display
         plot.setLocation(self.stn_info.latitude_f, self.stn_info.longitude_f)
@@ -208,38 +534,13 @@ class ImageGenerator(weewx.reportengine.ReportGenerator):
             have_data = True
 
             # Look for aggregation type:
-            aggregate_type = line_options.get('aggregate_type')
-            if aggregate_type in (None, '', 'None', 'none'):
-                # No aggregation specified.
-                aggregate_type = aggregate_interval = None
-            else:
-                try:
-                    # Aggregation specified. Get the interval.
-                    aggregate_interval = weeutil.weeutil.nominal_spans(
-                        line_options['aggregate_interval'])
-                except KeyError:
-                    log.error("Aggregate interval required for aggregate type %s",
-                              aggregate_type)
-                    log.error("Line type %s skipped", var_type)
-                    continue
-
-            # We need to pass the line options and plotgen_ts to our xtype.
-            # First get a copy of line_options...
-            option_dict = dict(line_options)
-            # ...then pop off aggregate_type and aggregate_interval because they appear as explicit
-            # arguments in our xtypes call...
-            option_dict.pop('aggregate_type', None)
-            option_dict.pop('aggregate_interval', None)
-            # ...then add plotgen_ts.
-            option_dict['plotgen_ts'] = plotgen_ts
-            # Now we're ready to fetch the data
-            start_vec_t, stop_vec_t, data_vec_t = weewx.xtypes.get_series(
-                var_type,
-                x_domain,
-                db_manager,
-                aggregate_type=aggregate_type,
-                aggregate_interval=aggregate_interval,
-                **option_dict)
+            try:
+                aggregate_type, aggregate_interval = _get_aggregation(line_options)
+            except KeyError:
+                log.error("Aggregate interval required for aggregate type %s",
+                          line_options['aggregate_type'])
+                log.error("Line type %s skipped", var_type)
+                continue
 
             # Get the type of plot ('bar', 'line', or 'vector')
             plot_type = line_options.get('plot_type', 'line').lower()
@@ -247,6 +548,20 @@ class ImageGenerator(weewx.reportengine.ReportGenerator):
                 log.error("Unknown plot type '%s'. Ignored", plot_type)
                 continue
 
+            # Now we're ready to fetch the data
+            key, option_dict = self._series_request(plot, x_domain, plotgen_ts, line_name,
+                                                    line_options, plot_type, aggregate_type,
+                                                    aggregate_interval)
+            if key in self.shared_series:
+                (start_vec_t, stop_vec_t, data_vec_t), uses = self.shared_series[key]
+                if uses > 1:
+                    self.shared_series[key] = ((start_vec_t, stop_vec_t, data_vec_t), uses - 1)
+                else:
+                    del self.shared_series[key]
+            else:
+                start_vec_t, stop_vec_t, data_vec_t = self.fetch_series(
+                    var_type, x_domain, binding, aggregate_type, aggregate_interval, option_dict)
+
             if aggregate_type and plot_type != 'bar':
                 # If aggregating, put the point in the middle of the interval
                 start_vec_t = ValueTuple(
@@ -339,24 +654,210 @@ class ImageGenerator(weewx.reportengine.ReportGenerator):
         return plot if have_data else None
 
 
-def _skip_this_plot(time_ts, plot_options, img_file):
+# The ImageGenerator used by a worker process
+_worker_generator = None
+
+
+def _init_worker(generator):
+    """Set up a worker process, forked from the process running the generator.
+
+    That process may itself be a report forked from weewxd, and other threads may have been
+    holding locks when it forked. The locks that the xtypes and the report engine use are
+    instances of ForkSafeLock, so the worker gets fresh ones.
+    """
+    global _worker_generator
+    # The database connections inherited from the parent must not be used, or closed, by the
+    # worker. It opens its own, which it uses only for reading.
+    generator.db_binder = weewx.manager.DBBinder(generator.config_dict)
+    _worker_generator = generator
+
+
+def _gen_image_in_worker(job):
+    """Generate the image of a plot in a worker process.
+
+    A worker is thrown away at the end of the run, along with anything it has cached, so the
+    day/night bands and wind bins it added to its caches are returned along with the image, to
+    be kept by the parent. Bands that are cached do not need the day/night transitions, so their
+    cache is not returned.
+
+    Returns:
+        tuple: A two-way tuple (result, caches). Element result is what gen_image() returns.
+            Element caches is a two-way tuple with the new entries of the caches of day/night
+            bands and wind bins.
+    """
+    bands = set(weeplot.genplot._daynight_bands)
+    wind_bins = set(_wind_bins)
+    result = _worker_generator.gen_image(*job)
+    return result, ({key: value for key, value in weeplot.genplot._daynight_bands.items()
+                     if key not in bands},
+                    {key: value for key, value in _wind_bins.items() if key not in wind_bins})
+
+
+def _merge_cache(cache, entries, max_entries):
+    """Add entries to a cache, forgetting the oldest ones if it gets too big."""
+    for key, value in entries.items():
+        if key in cache:
+            continue
+        if len(cache) >= max_entries:
+            del cache[next(iter(cache))]
+        cache[key] = value
+
+
+# The default speed classes of wind roses, by unit
+DEFAULT_SPEED_BINS = {
+    'mile_per_hour': [2, 5, 10, 15, 20],
+    'km_per_hour': [5, 10, 20, 30, 40],
+    'meter_per_second': [1, 3, 5, 8, 11],
+    'knot': [2, 5, 10, 15, 20],
+}
+
+# Wind binned by get_wind_bins(), for days that are over. Key is a tuple of all the arguments,
+# with the timespan of the day. Value is a two-way tuple (counts, calm).
+_wind_bins = {}
+# How many days to keep
+MAX_WIND_BIN_DAYS = 5000
+
+
+def get_wind_bins(db_manager, timespan, speed_type, direction_type, speed_bins, calm_speed,
+                  ndirections=16):
+    """Count the records in a timespan by wind direction and speed.
+
+    The counting is done by the database, with a GROUP BY, a day at a time. The counts of days
+    that are over are remembered, so only the current day has to be counted again.
+
+    Args:
+        db_manager (weewx.manager.Manager): The database.
+        timespan (TimeSpan): Count the records in (start, stop].
+        speed_type (str): The type holding the speed, such as 'windSpeed'.
+        direction_type (str): The type holding the direction, such as 'windDir'.
+        speed_bins (list[float]): The upper bounds of the speed classes, in the unit of the
+            database. Speeds at or above the last one make up a class of their own.
+        calm_speed (float): Speeds up to and including this one, or with no direction, are
+            calm.
+        ndirections (int): How many directions. The first one is centered on north.
+
+    Returns:
+        tuple: A two-way tuple (counts, calm). Element counts is a list with a list for each
+            direction, clockwise from north. It holds the count of each speed class, slowest
+            first. Element calm is the count of records with calm wind.
+    """
+    speed_bins = tuple(speed_bins)
+    counts = [[0] * (len(speed_bins) + 1) for _ in range(ndirections)]
+    calm = 0
+    last_ts = db_manager.lastGoodStamp()
+    for day in weeutil.weeutil.genDaySpans(timespan.start, timespan.stop):
+        span = TimeSpan(max(day.start, timespan.start), min(day.stop, timespan.stop))
+        if span.start >= span.stop:
+            continue
+        key = (db_manager.database_name, db_manager.table_name, speed_type, direction_type,
+               speed_bins, calm_speed, ndirections, span)
+        if key in _wind_bins:
+            day_counts, day_calm = _wind_bins[key]
+        else:
+            day_counts, day_calm = _count_wind(db_manager, span, speed_type, direction_type,
+                                               speed_bins, calm_speed, ndirections)
+            # The records of a day that is over will not change
+            if last_ts is not None and span.stop <= last_ts:
+                if len(_wind_bins) >= MAX_WIND_BIN_DAYS:
+                    # Forget the oldest
+                    del _wind_bins[next(iter(_wind_bins))]
+                _wind_bins[key] = (day_counts, day_calm)
+        for speeds, day_speeds in zip(counts, day_counts):
+            for i, count in enumerate(day_speeds):
+                speeds[i] += count
+        calm += day_calm
+    return counts, calm
+
+
+def _count_wind(db_manager, timespan, speed_type, direction_type, speed_bins, calm_speed,
+                ndirections):
+    """Count the records in a timespan by wind direction and speed, with one query. See
+    get_wind_bins()."""
+    # Only comparisons are used to find the classes, so the SQL works with any database
+    half_sector = 180.0 / ndirections
+    direction_case = "CASE WHEN %s IS NULL OR %s <= %r THEN -1 %s ELSE 0 END" % (
+        direction_type, speed_type, float(calm_speed),
+        ' '.join("WHEN %s < %r THEN %d" % (direction_type, (2 * i + 1) * half_sector, i)
+                 for i in range(ndirections)))
+    speed_case = "CASE %s ELSE %d END" % (
+        ' '.join("WHEN %s < %r THEN %d" % (speed_type, float(bound), i)
+                 for i, bound in enumerate(speed_bins)),
+        len(speed_bins))
+    sql_stmt = "SELECT %s, %s, COUNT(*) FROM %s " \
+               "WHERE dateTime > ? AND dateTime <= ? AND %s IS NOT NULL " \
+               "GROUP BY 1, 2" % (direction_case, speed_case, db_manager.table_name, speed_type)
+
+    counts = [[0] * (len(speed_bins) + 1) for _ in range(ndirections)]
+    calm = 0
+    for direction, speed, count in db_manager.genSql(sql_stmt, timespan):
+        if direction < 0:
+            calm += count
+        else:
+            counts[direction][speed] += count
+    return counts, calm
+
+
+def _get_x_domain(plotgen_ts, plot_options):
+    """Return a two-way tuple (x_domain, timeinc) with the time domain of a plot, and the
+    interval between its x-axis labels."""
+    time_length = weeutil.weeutil.nominal_spans(plot_options.get('time_length', 86400))
+    # Calculate a suitable min, max time for the requested time.
+    minstamp, maxstamp, timeinc = weeplot.utilities.scaletime(plotgen_ts - time_length,
+                                                              plotgen_ts)
+    x_domain = weeutil.weeutil.TimeSpan(minstamp, maxstamp)
+
+    # Override the x interval if the user has given an explicit interval:
+    timeinc_user = to_int(plot_options.get('x_interval'))
+    if timeinc_user is not None:
+        timeinc = timeinc_user
+    return x_domain, timeinc
+
+
+def _get_bottom_label(plotgen_ts, plot_options):
+    """Return a suitable bottom label for a plot."""
+    bottom_label_format = plot_options.get('bottom_label_format', '%m/%d/%y %H:%M')
+    return time.strftime(bottom_label_format, time.localtime(plotgen_ts))
+
+
+def _skip_this_plot(time_ts, plot_options, img_file, manifest=None, watermark=None):
     """A plot can be skipped if it was generated recently and has not changed. This happens if the
     time since the plot was generated is less than the aggregation interval.
 
+    If a watermark is given, and it is the same as the one saved in the manifest when the plot
+    was generated, it is skipped. If the options differ, it is not. See
+    ImageGenerator.plot_watermark().
+
     If a stale_age has been specified, then it can also be skipped if the file has been
     freshly generated.
+
+    If a FileManifest is given, it is used to find when the plot was last generated. This may be
+    later than the last time the image changed.
     """
+    getmtime = manifest.getmtime if manifest else os.path.getmtime
 
     # Convert from possible string to an integer:
     aggregate_interval = weeutil.weeutil.nominal_spans(plot_options.get('aggregate_interval'))
 
-    # Images without an aggregation interval have to be plotted every time. Also, the image
-    # definitely has to be generated if it doesn't exist.
-    if aggregate_interval is None or not os.path.exists(img_file):
+    # The image definitely has to be generated if it doesn't exist.
+    if not os.path.exists(img_file):
+        return False
+
+    if manifest and watermark:
+        saved = manifest.get_watermark(img_file)
+        if saved == watermark:
+            # Nothing that goes into the image has changed
+            log.debug("Skip '%s': no new data", img_file)
+            return True
+        if saved and saved[4] != watermark[4]:
+            # The options have changed
+            return False
+
+    # Images without an aggregation interval have to be plotted every time.
+    if aggregate_interval is None:
         return False
 
     # If it's a very old image, then it has to be regenerated
-    if time_ts - os.stat(img_file).st_mtime >= aggregate_interval:
+    if time_ts - getmtime(img_file) >= aggregate_interval:
         return False
 
     # If we're on an aggregation boundary, regenerate.
@@ -370,7 +871,7 @@ def _skip_this_plot(time_ts, plot_options, img_file):
     if stale:
         t_now = time.time()
         try:
-            last_mod = os.path.getmtime(img_file)
+            last_mod = getmtime(img_file)
             if t_now - last_mod < stale:
                 log.debug("Skip '%s': last_mod=%s age=%s stale=%s",
                           img_file, last_mod, t_now - last_mod, stale)
@@ -382,6 +883,46 @@ def _skip_this_plot(time_ts, plot_options, img_file):
     return True
 
 
+def _get_aggregation(line_options):
+    """Return a two-way tuple (aggregate_type, aggregate_interval) for a plot line. Both are None
+    if there is no aggregation. Raises KeyError if an aggregate interval is required, but missing.
+    """
+    aggregate_type = line_options.get('aggregate_type')
+    if aggregate_type in (None, '', 'None', 'none'):
+        # No aggregation specified.
+        return None, None
+    # Aggregation specified. Get the interval.
+    return aggregate_type, weeutil.weeutil.nominal_spans(line_options['aggregate_interval'])
+
+
+def _get_decimate_column(plot, plot_type, aggregate_type, line_options, x_domain):
+    """Return a function that gives the pixel column of a time, if the data of a line can be
+    thinned out to a few points per column. Otherwise, return None.
+
+    This is possible only for thin lines, without aggregation or markers. Points in the same
+    column are then drawn on top of each other anyway.
+    """
+    if plot_type != 'line' or aggregate_type or not to_bool(line_options.get('decimate', True)):
+        return None
+    marker_type = line_options.get('marker_type')
+    if marker_type and marker_type.lower().strip() not in ('none', ''):
+        return None
+    # Wide lines are drawn slightly differently, depending on the direction of each segment.
+    # Work out the width the same way genplot does. Lines without a width of their own take one
+    # of the plot's chart_line_width, depending on their place in the plot.
+    width = to_int(line_options.get('width'))
+    widths = plot.chart_line_widths if width is None else [width]
+    if any(w * plot.anti_alias != 1 for w in widths):
+        return None
+    column_of = plot.getXTranslator()
+    # Thinning out may leave gaps of up to a column. They must not break the line.
+    line_gap_fraction = to_float(line_options.get('line_gap_fraction'))
+    if line_gap_fraction is not None \
+            and line_gap_fraction * (column_of(x_domain.stop) - column_of(x_domain.start)) < 1:
+        return None
+    return column_of
+
+
 def _get_check_domain(skip_if_empty, x_domain):
     # Convert to lower-case. It might not be a string, so be prepared for an AttributeError
     try:
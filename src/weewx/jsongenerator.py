@@ -0,0 +1,380 @@
+#
+#    Copyright (c) 2009-2024 Tom Keffer <tkeffer@gmail.com>
+#
+#    See the file LICENSE.txt for your full rights.
+#
+"""Generate JSON data files for use by interactive skins.
+
+The generator is configured in the [JSONGenerator] section of a skin configuration file. Each
+subsection results in a single file, named after the subsection. The subsection [[current]] holds
+the values of the current record. All others hold a time series for each of their
+sub-subsections, plus, optionally, some aggregates over the same time span. For example:
+
+    [JSONGenerator]
+        data_binding = wx_binding
+        compression = gzip, brotli
+        [[current]]
+            observations = outTemp, barometer, windSpeed, windDir
+        [[day]]
+            time_length = 86400
+            [[[outTemp]]]
+                aggregates = min, max
+            [[[rain]]]
+                aggregate_type = sum
+                aggregate_interval = hour
+
+Series files are updated incrementally: the data in the file from the last run are reused, and
+only the newer data are fetched from the database.
+"""
+
+import gzip
+import io
+import json
+import logging
+import os
+import os.path
+import time
+
+import weeutil.weeutil
+import weewx.reportengine
+import weewx.reportprofile
+import weewx.units
+import weewx.xtypes
+from weeutil.config import search_up, accumulateLeaves
+from weeutil.weeutil import to_bool, to_int, TimeSpan
+from weewx.units import ValueTuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+log = logging.getLogger(__name__)
+
+
+# =============================================================================
+#                    Class JSONGenerator
+# =============================================================================
+
+class JSONGenerator(weewx.reportengine.ReportGenerator):
+    """Class for generating JSON data files."""
+
+    def run(self):
+        self.setup()
+        self.gen_files(self.gen_ts)
+
+    def setup(self):
+        self.json_dict = self.skin_dict['JSONGenerator']
+        self.formatter = weewx.units.Formatter.fromSkinDict(self.skin_dict)
+        self.converter = weewx.units.Converter.fromSkinDict(self.skin_dict)
+        self.json_root = os.path.join(self.config_dict['WEEWX_ROOT'],
+                                      self.skin_dict['HTML_ROOT'])
+        compression = weeutil.weeutil.option_as_list(self.json_dict.get('compression', 'gzip'))
+        self.compression = [c.lower() for c in compression or [] if c.lower() != 'none']
+        if 'brotli' in self.compression and brotli is None:
+            log.info("Module 'brotli' is not installed. No .br files will be generated.")
+            self.compression.remove('brotli')
+
+    def gen_files(self, gen_ts):
+        """Generate the JSON files.
+
+        Args:
+            gen_ts (int|None): The time for which the files are to be generated. If None, the time
+                of the last record in the database will be used.
+        """
+        t1 = time.time()
+        ngen = 0
+
+        # determine how much logging is desired
+        log_success = to_bool(search_up(self.json_dict, 'log_success', True))
+
+        # Files that have not changed will not be written again
+        self.manifest = weewx.reportengine.FileManifest.fromSkinDict(
+            self.config_dict, self.skin_dict,
+            to_bool(search_up(self.json_dict, 'skip_unchanged', True)))
+
+        for name in self.json_dict.sections:
+            options = accumulateLeaves(self.json_dict[name])
+            db_manager = self.db_binder.get_manager(options['data_binding'])
+
+            filegen_ts = gen_ts or db_manager.lastGoodStamp()
+            if not filegen_ts:
+                # Nothing in the database yet
+                continue
+
+            json_file = os.path.join(self.json_root, '%s.json' % name)
+
+            with weewx.reportprofile.timed('json', json_file, 'fetch'):
+                if name == 'current':
+                    doc = self.gen_current(filegen_ts, options, db_manager)
+                else:
+                    doc = self.gen_timespan(filegen_ts, options, self.json_dict[name],
+                                            db_manager, json_file)
+            if doc is None:
+                continue
+
+            try:
+                with weewx.reportprofile.timed('json', json_file, 'write'):
+                    self.write(json_file, doc)
+                ngen += 1
+            except IOError as e:
+                log.error("Unable to save to file '%s': %s", json_file, e)
+
+        self.manifest.save()
+
+        t2 = time.time()
+
+        if log_success:
+            log.info("Generated %d JSON files for report %s in %.2f seconds (%d unchanged)",
+                     ngen, self.skin_dict['REPORT_NAME'], t2 - t1, self.manifest.nskipped)
+
+    def gen_current(self, filegen_ts, options, db_manager):
+        """Return a document with the values in the current record.
+
+        The record is the one the report is running for. If there is none, the record at
+        filegen_ts is retrieved from the database.
+        """
+        record = self.record
+        if not record or record.get('dateTime') != filegen_ts:
+            record = db_manager.getRecord(filegen_ts)
+        if record is None:
+            log.debug("No record at %s", weeutil.weeutil.timestamp_to_string(filegen_ts))
+            return None
+
+        obs_types = weeutil.weeutil.option_as_list(options.get('observations'))
+        if not obs_types:
+            obs_types = [obs_type for obs_type in record
+                         if obs_type not in ('dateTime', 'usUnits', 'interval')]
+
+        observations = {}
+        for obs_type in obs_types:
+            if obs_type not in record:
+                continue
+            val_t = self.converter.convert(weewx.units.as_value_tuple(record, obs_type))
+            observations[obs_type] = {
+                'value': val_t[0],
+                'unit': val_t[1],
+                'label': self.formatter.get_label_string(val_t[1]),
+                'formatted': self.formatter.toString(val_t, addLabel=False),
+            }
+
+        return {'dateTime': filegen_ts, 'observations': observations}
+
+    def gen_timespan(self, filegen_ts, options, section, db_manager, json_file):
+        """Return a document with a series for each subsection of a time span section."""
+
+        time_length = weeutil.weeutil.nominal_spans(options.get('time_length', 86400))
+        incremental = to_bool(options.get('incremental', True))
+
+        # Reuse the series from the last run, if there is one
+        previous = _load(json_file) if incremental else None
+
+        series = {}
+        for obs_name in section.sections:
+            obs_options = accumulateLeaves(section[obs_name])
+            old_series = previous['series'].get(obs_name) if previous else None
+            try:
+                series[obs_name] = self.gen_series(filegen_ts, time_length, obs_name,
+                                                   obs_options, db_manager, old_series)
+            except (weewx.UnknownType, weewx.UnknownAggregation) as e:
+                log.error("Series '%s' in '%s' skipped: %s", obs_name, json_file, e)
+
+        return {'dateTime': filegen_ts,
+                'timespan': [filegen_ts - time_length, filegen_ts],
+                'series': series}
+
+    def gen_series(self, filegen_ts, time_length, obs_name, obs_options, db_manager,
+                   old_series=None):
+        """Return the series and aggregates for a single observation type.
+
+        Args:
+            filegen_ts (int): The end of the series.
+            time_length (int): The length of the series in seconds.
+            obs_name (str): The name of the section with the observation type.
+            obs_options (dict): The options for the series.
+            db_manager (weewx.manager.Manager): The database to use.
+            old_series (dict|None): The same series from the last run. If its options match,
+                only the data after it are fetched.
+
+        Returns:
+            dict: A dictionary suitable for encoding into JSON.
+        """
+        obs_type = obs_options.get('data_type', obs_name)
+
+        aggregate_type = obs_options.get('aggregate_type')
+        if aggregate_type in (None, '', 'None', 'none'):
+            aggregate_type = aggregate_interval = None
+        else:
+            aggregate_interval = weeutil.weeutil.nominal_spans(
+                obs_options.get('aggregate_interval', 'hour'))
+
+        ndigits = to_int(obs_options.get('ndigits'))
+        time_unit = obs_options.get('time_unit', 'unix_epoch')
+
+        start_ts = filegen_ts - time_length
+        if aggregate_interval:
+            # Align the start, so the aggregation intervals stay the same from run to run
+            start_ts = _align(start_ts, aggregate_interval)
+
+        # The options given to xtypes. Take out the ones that are explicit arguments.
+        option_dict = dict(obs_options)
+        option_dict.pop('aggregate_type', None)
+        option_dict.pop('aggregate_interval', None)
+
+        new_series = {
+            'obs_type': obs_type,
+            'aggregate_type': aggregate_type,
+            'aggregate_interval': aggregate_interval,
+            'ndigits': ndigits,
+            'time_unit': time_unit,
+        }
+
+        # See whether the series from the last run can be reused
+        start_vec, stop_vec, data_vec = [], [], []
+        fetch_start = start_ts
+        old_unit = None
+        if old_series and all(old_series.get(k) == v for k, v in new_series.items()) \
+                and old_series.get('stop'):
+            # Convert its times back to seconds
+            old_start = _to_epoch(old_series['start'], time_unit)
+            old_stop = _to_epoch(old_series['stop'], time_unit)
+            if old_stop[-1] <= filegen_ts:
+                if aggregate_type:
+                    # The last aggregation interval may have been incomplete. Fetch it again.
+                    keep = len(old_stop) - 1
+                    fetch_start = old_start[-1]
+                else:
+                    keep = len(old_stop)
+                    fetch_start = old_stop[-1]
+                # Drop anything that has fallen out of the time span. Aggregation intervals
+                # are aligned with its start, while a record belongs to it as long as the
+                # record ends after the start.
+                first = 0
+                if aggregate_type:
+                    while first < keep and old_start[first] < start_ts:
+                        first += 1
+                else:
+                    while first < keep and old_stop[first] <= start_ts:
+                        first += 1
+                fetch_start = max(fetch_start, start_ts)
+                start_vec = old_start[first:keep]
+                stop_vec = old_stop[first:keep]
+                data_vec = old_series['data'][first:keep]
+                old_unit = old_series.get('unit')
+
+        start_vec_t, stop_vec_t, data_vec_t = self._fetch(obs_type, fetch_start, filegen_ts,
+                                                          aggregate_type, aggregate_interval,
+                                                          ndigits, option_dict, db_manager)
+        if old_unit and data_vec_t[1] and data_vec_t[1] != old_unit:
+            # The target unit has changed since the last run. Start over.
+            start_vec, stop_vec, data_vec = [], [], []
+            start_vec_t, stop_vec_t, data_vec_t = self._fetch(obs_type, start_ts, filegen_ts,
+                                                              aggregate_type,
+                                                              aggregate_interval, ndigits,
+                                                              option_dict, db_manager)
+
+        start_vec = start_vec + list(start_vec_t[0])
+        stop_vec = stop_vec + list(stop_vec_t[0])
+        data_vec = data_vec + list(data_vec_t[0])
+
+        # If there were no new data, the unit may not be known
+        unit = data_vec_t[1] or old_unit
+        new_series.update({
+            'unit': unit,
+            'label': self.formatter.get_label_string(unit) if unit else '',
+            'start': weewx.units.convert(ValueTuple(start_vec, 'unix_epoch', 'group_time'),
+                                         time_unit)[0],
+            'stop': weewx.units.convert(ValueTuple(stop_vec, 'unix_epoch', 'group_time'),
+                                        time_unit)[0],
+            'data': data_vec,
+        })
+
+        aggregates = weeutil.weeutil.option_as_list(obs_options.get('aggregates'))
+        if aggregates:
+            timespan = TimeSpan(start_ts, filegen_ts)
+            new_series['aggregates'] = {}
+            for agg in aggregates:
+                agg_vt = weewx.xtypes.get_aggregate(obs_type, timespan, agg, db_manager,
+                                                    **option_dict)
+                # Use the unit of the series, unless the aggregate is of a different kind,
+                # such as a count
+                agg_vt = self._convert(agg_vt, unit if agg_vt[2] == data_vec_t[2]
+                                       else None, ndigits)
+                new_series['aggregates'][agg] = agg_vt[0]
+
+        return new_series
+
+    def _fetch(self, obs_type, start_ts, stop_ts, aggregate_type, aggregate_interval, ndigits,
+               option_dict, db_manager):
+        """Fetch a series from xtypes, then convert and round its data."""
+        start_vec_t, stop_vec_t, data_vec_t = weewx.xtypes.get_series(
+            obs_type,
+            TimeSpan(start_ts, stop_ts),
+            db_manager,
+            aggregate_type=aggregate_type,
+            aggregate_interval=aggregate_interval,
+            **option_dict)
+        return start_vec_t, stop_vec_t, self._convert(data_vec_t, option_dict.get('unit'),
+                                                      ndigits)
+
+    def _convert(self, val_t, unit, ndigits):
+        """Convert to an explicit unit or, if none was given, to the unit used by the skin. Then
+        round to ndigits."""
+        if unit:
+            val_t = weewx.units.convert(val_t, unit)
+        else:
+            val_t = self.converter.convert(val_t)
+        if ndigits is not None:
+            val_t = ValueTuple(weeutil.weeutil.rounder(val_t[0], ndigits), val_t[1], val_t[2])
+        return val_t
+
+    def write(self, json_file, doc):
+        """Write a document to a JSON file, along with any precompressed versions of it. Files
+        that have not changed are left alone."""
+        data = json.dumps(doc, cls=weewx.units.ComplexEncoder,
+                          separators=(',', ':')).encode('utf-8')
+        os.makedirs(os.path.dirname(json_file), exist_ok=True)
+        self.manifest.write(json_file, data)
+        if 'gzip' in self.compression:
+            # Leave the timestamp out of the header, so equal data give equal files
+            self.manifest.write(json_file + '.gz', _gzip(data))
+        if 'brotli' in self.compression:
+            self.manifest.write(json_file + '.br', brotli.compress(data))
+
+
+def _gzip(data):
+    """Compress data with gzip. Unlike gzip.compress(), this allows mtime to be set under
+    Python 3.7."""
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb', mtime=0) as fd:
+        fd.write(data)
+    return buf.getvalue()
+
+
+def _align(ts, interval):
+    """Return the start of the interval of length 'interval' that contains 'ts'. Intervals of a
+    day or longer start at midnight, local time. Shorter ones are counted from midnight."""
+    day_start = weeutil.weeutil.startOfDay(ts)
+    if interval >= 86400:
+        return day_start
+    return day_start + int((ts - day_start) // interval) * interval
+
+
+def _to_epoch(times, time_unit):
+    """Convert a list of times in unit time_unit back to whole unix epoch seconds."""
+    if time_unit != 'unix_epoch':
+        times = weewx.units.convert(ValueTuple(times, time_unit, 'group_time'), 'unix_epoch')[0]
+    return [int(round(x)) for x in times]
+
+
+def _load(json_file):
+    """Return the document in a JSON file, or None if it cannot be read."""
+    try:
+        with open(json_file, 'r', encoding='utf-8') as fd:
+            doc = json.load(fd)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(doc, dict) or not isinstance(doc.get('series'), dict):
+        return None
+    return doc
+
@@ -911,6 +911,24 @@ def get_manager_dict_from_config(config_dict, data_binding,
     return manager_dict
 
 
+def get_sqlite_root(config_dict, data_binding):
+    """Return the directory for files that go with the database of a binding. This is the
+    SQLITE_ROOT of the database or, if that is not an SQLite database, of the SQLite databases.
+    Returns None if there is no SQLITE_ROOT."""
+    try:
+        manager_dict = get_manager_dict_from_config(config_dict, data_binding)
+    except weewx.UnknownBinding:
+        manager_dict = {'database_dict': {}}
+    sqlite_root = manager_dict['database_dict'].get('SQLITE_ROOT')
+    if not sqlite_root:
+        try:
+            sqlite_root = os.path.join(config_dict['WEEWX_ROOT'],
+                                       config_dict['DatabaseTypes']['SQLite']['SQLITE_ROOT'])
+        except KeyError:
+            return None
+    return sqlite_root
+
+
 # The following is for backwards compatibility:
 def get_manager_dict(bindings_dict, databases_dict, data_binding,
                      default_binding_dict=default_binding_dict):
@@ -1009,6 +1027,10 @@ class DaySummaryManager(Manager):
     In addition to all the tables for each type, there is one additional table called
     'archive_day__metadata', which currently holds the version number and the time of the last
     update.
+
+    Finally, table 'archive_day__dirty' holds, for each day, the last time its data were changed.
+    Report generators use it to find summaries that have gone stale, for example because old data
+    were imported, or recalculated.
     """
 
     version = "4.0"
@@ -1051,6 +1073,12 @@ class DaySummaryManager(Manager):
     meta_replace_str = "REPLACE INTO %s_day__metadata VALUES(?, ?)"
     meta_select_str = "SELECT value FROM %s_day__metadata WHERE name=?"
 
+    # SQL statements used by the log of days whose data have changed.
+    dirty_create_str = "CREATE TABLE %s_day__dirty (dateTime INTEGER NOT NULL " \
+                       "PRIMARY KEY, modified REAL);"
+    dirty_replace_str = "REPLACE INTO %s_day__dirty VALUES(?, ?)"
+    dirty_select_str = "SELECT dateTime, modified FROM %s_day__dirty ORDER BY dateTime"
+
     def __init__(self, connection, table_name='archive', schema=None):
         """Initialize an instance of DaySummaryManager
 
@@ -1073,6 +1101,10 @@ class DaySummaryManager(Manager):
             # Database has not been initialized. Initialize it:
             self._initialize_day_tables(schema)
 
+        # Whether the log of days whose data have changed exists. Daily summaries from before
+        # the log do not have it. It is added the first time a day changes, so databases that
+        # are only read are left alone. None means it is not known yet.
+        self.has_dirty_table = None
         self.version = None
         self.daykeys = None
         DaySummaryManager._create_sync(self)
@@ -1094,10 +1126,11 @@ class DaySummaryManager(Manager):
         all_tables = self.connection.tables()
         prefix = "%s_day_" % self.table_name
         n_prefix = len(prefix)
-        meta_name = '%s_day__metadata' % self.table_name
+        # Tables that start with a double underscore, such as the metadata, are not types.
+        meta_prefix = '%s_day__' % self.table_name
         # Create a set of types that are in the daily summaries:
         self.daykeys = {x[n_prefix:] for x in all_tables
-                        if (x.startswith(prefix) and x != meta_name)}
+                        if (x.startswith(prefix) and not x.startswith(meta_prefix))}
 
         self.version = self._read_metadata('Version')
         if self.version is None:
@@ -1139,6 +1172,8 @@ class DaySummaryManager(Manager):
             cursor.execute(DaySummaryManager.meta_create_str % self.table_name)
             # ... then put the version number in it:
             self._write_metadata('Version', DaySummaryManager.version, cursor)
+            # Finally, the log of changed days
+            cursor.execute(DaySummaryManager.dirty_create_str % self.table_name)
 
             log.info("Created daily summary tables")
 
@@ -1221,6 +1256,11 @@ class DaySummaryManager(Manager):
         # Then save the results:
         self._set_day_summary(_stats_dict, accumulator.timespan.stop, cursor)
 
+    def updateValue(self, timestamp, obs_type, new_value):
+        """Update (replace) a single value in the database, noting that its day has changed."""
+        super().updateValue(timestamp, obs_type, new_value)
+        self.mark_dirty([weeutil.weeutil.startOfArchiveDay(timestamp)])
+
     def backfill_day_summary(self, start_d=None, stop_d=None,
                              progress_fn=show_progress, trans_days=5):
 
@@ -1516,6 +1556,7 @@ class DaySummaryManager(Manager):
                                                       set_stmt=', '.join(set_list))
             # Update this observation type's weighted sums:
             cursor.execute(update_sql, (day_accum.timespan.start,))
+        self.mark_dirty([day_accum.timespan.start], cursor)
 
     def patch_sums(self):
         """Version 4.2.0 accidentally interpreted V2.0 daily sums as V1.0, so the weighted sums
@@ -1644,10 +1685,50 @@ class DaySummaryManager(Manager):
             except weedb.OperationalError as e:
                 log.error("Replace failed for database %s: %s", self.database_name, e)
 
+        # Note that the day has changed
+        self.mark_dirty([_sod], cursor)
+
         # If requested, update the time of the last daily summary update:
         if lastUpdate is not None:
             self._write_metadata('lastUpdate', str(int(lastUpdate)), cursor)
 
+    def mark_dirty(self, sod_list, cursor=None):
+        """Note that the data for some days have changed.
+
+        Args:
+            sod_list (list[int]): The start-of-day timestamps of the days that changed.
+            cursor (Cursor|None): An optional cursor to use. If None, a cursor will be opened up.
+        """
+        now = time.time()
+        _cursor = cursor or self.connection.cursor()
+        try:
+            if not self._check_dirty_table():
+                _cursor.execute(DaySummaryManager.dirty_create_str % self.table_name)
+                self.has_dirty_table = True
+            _cursor.executemany(DaySummaryManager.dirty_replace_str % self.table_name,
+                                [(int(sod), now) for sod in sorted(set(sod_list))])
+        finally:
+            if cursor is None:
+                _cursor.close()
+
+    def get_dirty_days(self):
+        """Get the last time the data for each day changed.
+
+        Returns:
+            list[tuple]: A list of two-way tuples (start-of-day, time of last change), in order
+                of the start-of-day.
+        """
+        if not self._check_dirty_table():
+            return []
+        return [(int(row[0]), row[1]) for row in
+                self.genSql(DaySummaryManager.dirty_select_str % self.table_name)]
+
+    def _check_dirty_table(self):
+        """Return True if the log of days whose data have changed exists."""
+        if not self.has_dirty_table:
+            self.has_dirty_table = '%s_day__dirty' % self.table_name in self.connection.tables()
+        return self.has_dirty_table
+
     def _calc_weight(self, record):
         """Returns the weighting to be used, depending on the version of the daily summaries."""
         if 'interval' not in record:
@@ -9,8 +9,11 @@
 import datetime
 import ftplib
 import glob
+import hashlib
+import json
 import locale
 import logging
+import multiprocessing
 import os.path
 import threading
 import time
@@ -26,8 +29,9 @@ import weeutil.logger
 import weeutil.weeutil
 import weewx.defaults
 import weewx.manager
+import weewx.reportprofile
 import weewx.units
-from weeutil.weeutil import to_bool, to_int
+from weeutil.weeutil import to_bool, to_int, ForkSafeLock
 
 log = logging.getLogger(__name__)
 
@@ -79,8 +83,9 @@ def set_cwd(new_cwd):
         os.chdir(old_cwd)
 
 
-# Setting a locale is not thread safe, so we need a lock
-LOCALE_LOCK = threading.Lock()
+# Setting a locale is not thread safe, so we need a lock. Reports may run in forked processes,
+# so it must be fork safe as well.
+LOCALE_LOCK = ForkSafeLock()
 
 
 @contextmanager
@@ -158,6 +163,9 @@ class StdReportEngine(threading.Thread):
         # all of them may be enabled).
         run_reports = reports or self.config_dict['StdReport'].sections
 
+        # This will be a list of two-way tuples (report, skin_dict) of the reports to be run
+        jobs = []
+
         # Iterate over each requested report
         for report in run_reports:
 
@@ -173,8 +181,6 @@ class StdReportEngine(threading.Thread):
                     log.debug("Report '%s' not enabled. Skipping.", report)
                     continue
 
-            log.debug("Running report '%s'", report)
-
             # Fetch and build the skin_dict:
             try:
                 skin_dict = build_skin_dict(self.config_dict, report)
@@ -210,63 +216,295 @@ class StdReportEngine(threading.Thread):
                                   "running report anyway", report)
                         log.debug("       ****  %s", timing.validation_error)
 
-            # We are using two "with" statements below:
-            # 1. Set the current working directory to the skin's location. This allows #include
-            # statements to work.
-            # 2. Set the locale to 'lang'. If 'lang' was not specified, set it to the user's
-            # default locale.
-            with set_cwd(os.path.join(self.config_dict['WEEWX_ROOT'],
-                                      skin_dict['SKIN_ROOT'],
-                                      skin_dict['skin'])) as cwd, \
-                    set_locale(skin_dict.get('lang', '')) as loc:
-                log.debug("Running generators for report '%s' in directory '%s' with locale '%s'",
-                          report, cwd, loc)
-
-                if 'Generators' in skin_dict and 'generator_list' in skin_dict['Generators']:
-                    for generator in weeutil.weeutil.option_as_list(
-                            skin_dict['Generators']['generator_list']):
-
-                        try:
-                            # Instantiate an instance of the class.
-                            obj = weeutil.weeutil.get_object(generator)(
-                                self.config_dict,
-                                skin_dict,
-                                self.gen_ts,
-                                self.first_run,
-                                self.stn_info,
-                                self.record)
-                        except Exception as e:
-                            log.error("Unable to instantiate generator '%s'", generator)
-                            log.error("        ****  %s", e)
-                            weeutil.logger.log_traceback(log.error, "        ****  ")
-                            log.error("        ****  Generator ignored")
-                            traceback.print_exc()
-                            continue
+            jobs.append((report, skin_dict))
+
+        max_workers = to_int(self.config_dict['StdReport'].get('report_workers', 1))
+        if max_workers > 1 and len(jobs) > 1:
+            self.run_concurrently(jobs, max_workers)
+        else:
+            for report, skin_dict in jobs:
+                self.run_report(report, skin_dict)
+
+    def run_report(self, report, skin_dict):
+        """Run all the generators of a single report.
+
+        Args:
+            report(str): The name of the report.
+            skin_dict(configobj.ConfigObj): The skin dictionary for the report.
+        """
+
+        log.debug("Running report '%s'", report)
+        t1 = time.time()
+
+        # We are using two "with" statements below:
+        # 1. Set the locale to 'lang'. If 'lang' was not specified, set it to the user's
+        # default locale. This holds a lock, so only one report at a time in a process can be in
+        # this block.
+        # 2. Set the current working directory to the skin's location. This allows #include
+        # statements to work.
+        with set_locale(skin_dict.get('lang', '')) as loc, \
+                set_cwd(os.path.join(self.config_dict['WEEWX_ROOT'],
+                                     skin_dict['SKIN_ROOT'],
+                                     skin_dict['skin'])) as cwd:
+            log.debug("Running generators for report '%s' in directory '%s' with locale '%s'",
+                      report, cwd, loc)
+
+            if 'Generators' in skin_dict and 'generator_list' in skin_dict['Generators']:
+                for generator in weeutil.weeutil.option_as_list(
+                        skin_dict['Generators']['generator_list']):
+
+                    try:
+                        # Instantiate an instance of the class.
+                        obj = weeutil.weeutil.get_object(generator)(
+                            self.config_dict,
+                            skin_dict,
+                            self.gen_ts,
+                            self.first_run,
+                            self.stn_info,
+                            self.record)
+                    except Exception as e:
+                        log.error("Unable to instantiate generator '%s'", generator)
+                        log.error("        ****  %s", e)
+                        weeutil.logger.log_traceback(log.error, "        ****  ")
+                        log.error("        ****  Generator ignored")
+                        traceback.print_exc()
+                        continue
 
-                        try:
-                            # Call its start() method
+                    try:
+                        # Call its start() method
+                        with weewx.reportprofile.timed('generator', report, generator):
                             obj.start()
 
-                        except Exception as e:
-                            # Caught unrecoverable error. Log it, continue on to the
-                            # next generator.
-                            log.error("Caught unrecoverable exception in generator '%s'",
-                                      generator)
-                            log.error("        ****  %s", e)
-                            weeutil.logger.log_traceback(log.error, "        ****  ")
-                            log.error("        ****  Generator terminated")
-                            traceback.print_exc()
-                            continue
+                    except Exception as e:
+                        # Caught unrecoverable error. Log it, continue on to the
+                        # next generator.
+                        log.error("Caught unrecoverable exception in generator '%s'",
+                                  generator)
+                        log.error("        ****  %s", e)
+                        weeutil.logger.log_traceback(log.error, "        ****  ")
+                        log.error("        ****  Generator terminated")
+                        traceback.print_exc()
+                        continue
 
-                        finally:
-                            obj.finalize()
+                    finally:
+                        obj.finalize()
 
-                else:
-                    log.debug("No generators specified for report '%s'", report)
+            else:
+                log.debug("No generators specified for report '%s'", report)
+
+        log.debug("Report '%s' finished in %.2f seconds", report, time.time() - t1)
+
+    def run_concurrently(self, jobs, max_workers):
+        """Run reports concurrently, honoring any dependencies between them.
+
+        Reports that generate files run in their own process, so they do not compete for the
+        locale and the working directory, which are global to a process. Reports that upload
+        files run in a thread. By default, an uploading report waits for all the reports listed
+        before it to finish. This can be overridden with the report option 'depends_on'.
+
+        Args:
+            jobs(list[tuple]): A list of two-way tuples (report, skin_dict).
+            max_workers(int): How many reports to run at the same time.
+        """
+        deadline = to_int(self.config_dict['StdReport'].get('report_deadline'))
+        stop_ts = time.time() + deadline if deadline else None
+
+        # Set of names of the reports that each report depends on.
+        dependencies = get_dependencies(jobs)
+        pending = list(jobs)
+        # Key is a report name, value is a two-way tuple (worker, start time)
+        running = {}
+        done = set()
+
+        log.debug("Running %d reports with up to %d workers", len(jobs), max_workers)
+
+        while pending or running:
+            # Reap any reports that have finished.
+            for report in list(running):
+                worker, t1, skin_dict = running[report]
+                if not worker.is_alive():
+                    worker.join()
+                    del running[report]
+                    done.add(report)
+                    # Threads have no exit code. Processes have a non-zero one if they failed.
+                    exitcode = getattr(worker, 'exitcode', 0)
+                    if exitcode:
+                        log.error("Report '%s' failed after %.2f seconds (exit code %d)",
+                                  report, time.time() - t1, exitcode)
+                    elif to_bool(skin_dict.get('log_success', True)):
+                        log.info("Report '%s' finished in %.2f seconds", report, time.time() - t1)
+
+            # Launch any reports that are ready to go.
+            launched = False
+            for job in list(pending):
+                if len(running) >= max_workers:
+                    break
+                report, skin_dict = job
+                if dependencies[report] <= done:
+                    pending.remove(job)
+                    running[report] = (self._start_worker(report, skin_dict), time.time(),
+                                       skin_dict)
+                    launched = True
+
+            if stop_ts and time.time() > stop_ts and (pending or running):
+                log.error("Reports did not finish within report_deadline of %d seconds",
+                          deadline)
+                for report in pending:
+                    log.error("        ****  Report '%s' not run", report[0])
+                for report, (worker, t1, _) in running.items():
+                    log.error("        ****  Report '%s' still running after %.2f seconds",
+                              report, time.time() - t1)
+                    # Processes can be stopped. Threads will finish on their own.
+                    if isinstance(worker, multiprocessing.process.BaseProcess):
+                        worker.terminate()
+                        worker.join()
+                break
+
+            if not launched:
+                time.sleep(0.1)
+
+    def _start_worker(self, report, skin_dict):
+        """Start running a report. Returns the process or thread that is running it."""
+        if not is_uploader(skin_dict) and 'fork' in multiprocessing.get_all_start_methods():
+            # Use 'fork', so everything already set up in this process, such as the xtypes
+            # and the logging, will also be available in the child.
+            ctx = multiprocessing.get_context('fork')
+            worker = ctx.Process(target=self._run_report_in_process,
+                                 args=(report, skin_dict),
+                                 name="ReportProcess-%s" % report)
+        else:
+            worker = threading.Thread(target=self.run_report,
+                                      args=(report, skin_dict),
+                                      name="ReportThread-%s" % report,
+                                      daemon=True)
+        worker.start()
+        return worker
+
+    def _run_report_in_process(self, report, skin_dict):
+        """Run a report in a child process."""
+        # Locks that some other thread was holding when the process was forked, such as
+        # LOCALE_LOCK, or those of the xtypes, have been replaced. See ForkSafeLock.
+        self.run_report(report, skin_dict)
+
+
+def is_uploader(skin_dict):
+    """Return True if the generators of a skin only upload files made by other reports."""
+    generators = weeutil.weeutil.option_as_list(
+        skin_dict.get('Generators', {}).get('generator_list', []))
+    if not generators:
+        return False
+    for generator in generators:
+        try:
+            if not getattr(weeutil.weeutil.get_object(generator), 'uploader', False):
+                return False
+        except (ImportError, AttributeError, ValueError):
+            # The report will log the problem when it tries to run the generator.
+            return False
+    return True
+
+
+def get_dependencies(jobs):
+    """Find which reports each report depends on.
+
+    A report can list the reports that it depends on with option 'depends_on'. Otherwise,
+    a report that uploads files depends on all the reports listed before it, and other reports
+    do not depend on anything. If reports depend on each other, an error is logged, and those
+    reports depend only on the reports listed before them.
+
+    Args:
+        jobs(list[tuple]): A list of two-way tuples (report, skin_dict), in the order they were
+            listed.
+
+    Returns:
+        dict: Key is a report name, value is the set of reports it depends on. Only reports in
+            jobs are included.
+    """
+    names = [report for report, _ in jobs]
+    dependencies = {}
+    for i, (report, skin_dict) in enumerate(jobs):
+        if 'depends_on' in skin_dict:
+            depends_on = set(weeutil.weeutil.option_as_list(skin_dict['depends_on']))
+            dependencies[report] = depends_on.intersection(names)
+        elif is_uploader(skin_dict):
+            dependencies[report] = set(names[:i])
+        else:
+            dependencies[report] = set()
+
+    # Find any reports that would never run, because they depend on each other, directly or
+    # through other reports. They depend only on the reports listed before them instead.
+    resolved = set()
+    while True:
+        ready = {report for report in names
+                 if report not in resolved and dependencies[report] <= resolved}
+        if not ready:
+            break
+        resolved |= ready
+    stuck = [report for report in names if report not in resolved]
+    if stuck:
+        log.error("Reports %s would never run, because of a cycle in option 'depends_on'",
+                  ", ".join("'%s'" % report for report in stuck))
+        log.error("        ****  They will be run in the order they are listed")
+        for i, report in enumerate(names):
+            if report in stuck:
+                dependencies[report] &= set(names[:i])
+    return dependencies
+
+
+# Cache of skin dictionaries. Key is the report name, value is a 3-way tuple (config_key,
+# file_stamps, skin_dict).
+_skin_dict_cache = {}
+_skin_dict_lock = ForkSafeLock()
 
 
 def build_skin_dict(config_dict, report):
-    """Find and build the skin_dict for the given report"""
+    """Find and build the skin_dict for the given report.
+
+    Building a skin_dict requires parsing the skin's configuration file and language files, so
+    the results are cached. A cached skin_dict is used as long as the relevant parts of the
+    configuration dictionary, and the modification times of the skin's files, are unchanged.
+
+    Returns:
+        configobj.ConfigObj: A skin dictionary. It is a copy, so the caller is free to modify it.
+    """
+    config_key = _get_config_key(config_dict)
+    file_stamps = _get_file_stamps(config_dict, report)
+    with _skin_dict_lock:
+        entry = _skin_dict_cache.get(report)
+    if entry and entry[0] == config_key and entry[1] == file_stamps:
+        skin_dict = entry[2]
+    else:
+        skin_dict = _build_skin_dict(config_dict, report)
+        with _skin_dict_lock:
+            _skin_dict_cache[report] = (config_key, file_stamps, skin_dict)
+    return weeutil.config.deep_copy(skin_dict)
+
+
+def _get_config_key(config_dict):
+    """Return a key that captures the parts of config_dict that go into a skin_dict."""
+    return repr((config_dict.get('WEEWX_ROOT'),
+                 config_dict.get('log_success'),
+                 config_dict.get('log_failure'),
+                 config_dict['StdReport'].dict()))
+
+
+def _get_file_stamps(config_dict, report):
+    """Return the modification times of the skin configuration file and language files."""
+    skin_dir = os.path.join(config_dict['WEEWX_ROOT'],
+                            config_dict['StdReport']['SKIN_ROOT'],
+                            config_dict['StdReport'][report].get('skin', ''))
+    paths = [os.path.join(skin_dir, 'skin.conf')]
+    paths.extend(sorted(glob.glob(os.path.join(skin_dir, 'lang', '*.conf'))))
+    stamps = []
+    for path in paths:
+        try:
+            stamps.append((path, os.stat(path).st_mtime_ns))
+        except OSError:
+            stamps.append((path, None))
+    return tuple(stamps)
+
+
+def _build_skin_dict(config_dict, report):
+    """Build the skin_dict for the given report, without using the cache."""
 
     #######################################################################
     # Start with the defaults in the defaults module. Because we will be modifying it, we need
@@ -452,6 +690,10 @@ def merge_lang(lang_spec, config_dict, report, skin_dict):
 class ReportGenerator:
     """Base class for all report generators."""
 
+    # Set to True by generators that only upload the files created by other reports. When
+    # reports run concurrently, these are run only after the reports listed before them.
+    uploader = False
+
     def __init__(self, config_dict, skin_dict, gen_ts, first_run, stn_info, record=None):
         self.config_dict = config_dict
         self.skin_dict = skin_dict
@@ -471,6 +713,141 @@ class ReportGenerator:
         self.db_binder.close()
 
 
+# =============================================================================
+#                    Class FileManifest
+# =============================================================================
+
+class FileManifest:
+    """Keeps a hash of every file a report generates, so a file whose contents have not changed
+    is not written again. Its modification time then stays the same, and uploaders can skip it.
+
+    The hashes are kept in a file '<report name>.manifest' in directory 'manifests' in the
+    SQLITE_ROOT of the report's database, so it is not uploaded along with the files of the
+    report. Files are identified by their path relative to HTML_ROOT.
+    """
+
+    def __init__(self, html_root, manifest_path, enabled=True):
+        """Initialize an instance of FileManifest.
+
+        Args:
+            html_root (str): The directory the files of the report are in.
+            manifest_path (str|None): The file the hashes are kept in. If None, the manifest
+                is disabled.
+            enabled (bool): If False, files are always written.
+        """
+        self.html_root = html_root
+        self.path = manifest_path
+        self.enabled = enabled and manifest_path is not None
+        self.nwritten = 0
+        self.nskipped = 0
+        self.changed = False
+        self.entries = {}
+        if self.enabled:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as fd:
+                    self.entries = json.load(fd)
+            except (OSError, ValueError):
+                pass
+
+    @classmethod
+    def fromSkinDict(cls, config_dict, skin_dict, enabled=True):
+        """Return the FileManifest of a report."""
+        html_root = os.path.join(config_dict['WEEWX_ROOT'], skin_dict['HTML_ROOT'])
+        sqlite_root = weewx.manager.get_sqlite_root(config_dict,
+                                                    skin_dict.get('data_binding', 'wx_binding'))
+        if sqlite_root:
+            manifest_path = os.path.join(sqlite_root, 'manifests',
+                                         '%s.manifest' % skin_dict['REPORT_NAME'])
+        else:
+            log.debug("No SQLITE_ROOT. Files of report '%s' will always be written.",
+                      skin_dict['REPORT_NAME'])
+            manifest_path = None
+        return cls(html_root, manifest_path, enabled)
+
+    def _key(self, path):
+        """Return the key of a file: its path relative to HTML_ROOT."""
+        return os.path.relpath(path, self.html_root)
+
+    def write(self, path, data):
+        """Write bytes to a file, unless the file already holds them.
+
+        Args:
+            path (str): The path to the file.
+            data (bytes): The new contents of the file.
+
+        Returns:
+            bool: True if the file was written, False if it was unchanged.
+        """
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        key = self._key(path)
+        entry = self.entries.get(key)
+        if self.enabled and entry and entry[0] == digest and os.path.exists(path):
+            # Remember that the file is up-to-date as of now. This must be saved, or the next
+            # run would take the file to be older than the data that went into it.
+            now = int(time.time())
+            if now > entry[1]:
+                entry[1] = now
+                self.changed = True
+            self.nskipped += 1
+            return False
+
+        # Write to a temporary file first, then move it into place
+        tmpname = path + '.tmp'
+        try:
+            with open(tmpname, mode='wb') as fd:
+                fd.write(data)
+            os.replace(tmpname, path)
+        finally:
+            try:
+                os.unlink(tmpname)
+            except OSError:
+                pass
+        self.entries[key] = [digest, int(time.time())]
+        self.changed = True
+        self.nwritten += 1
+        return True
+
+    def getmtime(self, path):
+        """Return the last time a file was generated. This is the time it was last found to be
+        up-to-date, which may be later than its modification time."""
+        mtime = os.path.getmtime(path)
+        entry = self.entries.get(self._key(path))
+        if entry:
+            mtime = max(mtime, entry[1])
+        return mtime
+
+    def get_watermark(self, path):
+        """Return the watermark saved with a file, or None if there is none. See
+        set_watermark()."""
+        entry = self.entries.get(self._key(path))
+        if self.enabled and entry and len(entry) > 2:
+            return entry[2]
+        return None
+
+    def set_watermark(self, path, watermark):
+        """Save a watermark with a file that has been written. A watermark is anything that can
+        be saved as JSON, and that tells what went into the file. If it has not changed, the file
+        does not need to be generated again."""
+        entry = self.entries.get(self._key(path))
+        if entry and entry[2:] != [watermark]:
+            entry[2:] = [watermark]
+            self.changed = True
+
+    def save(self):
+        """Save the hashes, if any have changed."""
+        if not self.enabled or not self.changed:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmpname = self.path + '.tmp'
+            with open(tmpname, 'w', encoding='utf-8') as fd:
+                json.dump(self.entries, fd)
+            os.replace(tmpname, self.path)
+            self.changed = False
+        except OSError as e:
+            log.error("Unable to save file manifest '%s': %s", self.path, e)
+
+
 # =============================================================================
 #                    Class FtpGenerator
 # =============================================================================
@@ -480,6 +857,8 @@ class FtpGenerator(ReportGenerator):
 
     This will ftp everything in the public_html subdirectory to a webserver."""
 
+    uploader = True
+
     def run(self):
         import weeutil.ftpupload
 
@@ -540,6 +919,8 @@ class RsyncGenerator(ReportGenerator):
 
     This will rsync everything in the public_html subdirectory to a server."""
 
+    uploader = True
+
     def run(self):
         import weeutil.rsyncupload
         log_success = to_bool(weeutil.config.search_up(self.skin_dict, 'log_success', True))
@@ -0,0 +1,193 @@
+#
+#    Copyright (c) 2009-2024 Tom Keffer <tkeffer@gmail.com>
+#
+#    See the file LICENSE.txt for your full rights.
+#
+"""Profile report generation.
+
+While a ReportProfile is installed, the report engine and the generators record how long each
+report, template, and plot takes. In addition, the tags used by templates are timed, by hooking
+AggTypeBinder._do_query() and ObservationBinder.series().
+
+Example:
+
+    profile = ReportProfile()
+    profile.install()
+    try:
+        ... run the reports ...
+    finally:
+        profile.uninstall()
+    profile.print_table()
+    profile.save('report-profile.json')
+"""
+
+import contextlib
+import json
+import os.path
+import sys
+import time
+
+import weewx
+import weewx.tags
+
+# The ReportProfile currently installed, if any
+current = None
+
+# The columns the table can be sorted by
+SORT_KEYS = ('total', 'count', 'max', 'name')
+
+
+def timed(category, name, detail=''):
+    """Return a context manager that times a step in the currently installed profile. If no
+    profile is installed, it does nothing.
+
+    Args:
+        category (str): The kind of thing being timed, such as 'template' or 'plot'.
+        name (str): Its name, such as the path of the template.
+        detail (str): The step being timed, such as 'compile' or 'evaluate'.
+    """
+    if current is None:
+        return contextlib.nullcontext()
+    return current.time(category, name, detail)
+
+
+class ReportProfile:
+    """Collects the time taken by the various steps of generating reports."""
+
+    def __init__(self, root=None):
+        """Initialize an instance of ReportProfile.
+
+        Args:
+            root (str|None): Paths of files under this directory, such as WEEWX_ROOT, are shown
+                relative to it.
+        """
+        self.root = root
+        # Key is a tuple (category, name, detail), value is a list [count, total, max]
+        self.stats = {}
+        # The report or template being generated. Tags are charged to it.
+        self.context = ''
+        self._saved = None
+
+    def install(self):
+        """Make this the current profile, and start timing tags."""
+        global current
+        current = self
+        agg_do_query = weewx.tags.AggTypeBinder._do_query
+        obs_series = weewx.tags.ObservationBinder.series
+        self._saved = (agg_do_query, obs_series)
+        profile = self
+
+        def _do_query(binder):
+            t0 = time.perf_counter()
+            try:
+                return agg_do_query(binder)
+            finally:
+                profile.add('tag', _tag_name(binder, binder.aggregate_type), profile.context,
+                            time.perf_counter() - t0)
+
+        def series(binder, aggregate_type=None, aggregate_interval=None, *args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return obs_series(binder, aggregate_type, aggregate_interval, *args, **kwargs)
+            finally:
+                func = 'series(%s)' % ', '.join(str(x) for x in (aggregate_type,
+                                                                 aggregate_interval) if x)
+                profile.add('tag', _tag_name(binder, func), profile.context,
+                            time.perf_counter() - t0)
+
+        weewx.tags.AggTypeBinder._do_query = _do_query
+        weewx.tags.ObservationBinder.series = series
+
+    def uninstall(self):
+        """Stop timing tags. The statistics are kept."""
+        global current
+        if self._saved:
+            weewx.tags.AggTypeBinder._do_query, weewx.tags.ObservationBinder.series = self._saved
+            self._saved = None
+        if current is self:
+            current = None
+
+    def add(self, category, name, detail, seconds):
+        """Add the time taken by one step."""
+        stat = self.stats.setdefault((category, name, detail), [0, 0.0, 0.0])
+        stat[0] += 1
+        stat[1] += seconds
+        stat[2] = max(stat[2], seconds)
+
+    @contextlib.contextmanager
+    def time(self, category, name, detail=''):
+        """Context manager that times a step. Tags used in the step are charged to its name."""
+        saved_context = self.context
+        self.context = name
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(category, name, detail, time.perf_counter() - t0)
+            self.context = saved_context
+
+    def rows(self, sort_by='total', category=None):
+        """Return the statistics as a list of dictionaries.
+
+        Args:
+            sort_by (str): One of 'total', 'count', 'max', or 'name'. The numbers are sorted
+                largest first.
+            category (str|None): Return only the rows of this category. Default is all.
+
+        Returns:
+            list[dict]: One dictionary per step, with keys 'category', 'name', 'detail',
+                'count', 'total', and 'max'.
+        """
+        if sort_by not in SORT_KEYS:
+            raise ValueError("Unknown sort key '%s'" % sort_by)
+        rows = [{'category': key[0], 'name': self._relative(key[1]),
+                 'detail': self._relative(key[2]),
+                 'count': stat[0], 'total': stat[1], 'max': stat[2]}
+                for key, stat in self.stats.items()
+                if category is None or key[0] == category]
+        if sort_by == 'name':
+            rows.sort(key=lambda row: (row['category'], row['name'], row['detail']))
+        else:
+            rows.sort(key=lambda row: row[sort_by], reverse=True)
+        return rows
+
+    def print_table(self, sort_by='total', top=20, file=None):
+        """Print a table for each category, with the top rows in each."""
+        file = file or sys.stdout
+        for category in sorted({key[0] for key in self.stats}):
+            rows = self.rows(sort_by, category)[:top]
+            width = max(len('Detail'), *(len(row['detail']) for row in rows))
+            print("\n%s (%d of %d, by %s):" % (category.capitalize(), len(rows),
+                                               len(self.rows(category=category)), sort_by),
+                  file=file)
+            print("%10s %8s %10s  %-*s  %s" % ('Total (s)', 'Count', 'Max (s)',
+                                              width, 'Detail', 'Name'), file=file)
+            for row in rows:
+                print("%10.3f %8d %10.4f  %-*s  %s" % (row['total'], row['count'], row['max'],
+                                                      width, row['detail'], row['name']),
+                      file=file)
+
+    def save(self, path):
+        """Save all the statistics to a JSON file. The rows are sorted by name, so files from
+        different runs can be compared with diff."""
+        doc = {
+            'version': weewx.__version__,
+            'rows': [dict(row, total=round(row['total'], 6), max=round(row['max'], 6))
+                     for row in self.rows('name')],
+        }
+        with open(path, 'w', encoding='utf-8') as fd:
+            json.dump(doc, fd, indent=1)
+            fd.write('\n')
+
+    def _relative(self, name):
+        if self.root and name.startswith(self.root):
+            return os.path.relpath(name, self.root)
+        return name
+
+
+def _tag_name(binder, attr):
+    """Return a name for a tag, such as '$month.outTemp.max'."""
+    name = '$%s.%s.%s' % (binder.context, binder.obs_type, attr)
+    if binder.data_binding:
+        name += " (%s)" % binder.data_binding
+    return name
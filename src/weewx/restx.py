@@ -83,6 +83,7 @@ of various RESTful services.
 
 """
 
+import bisect
 import datetime
 import http.client
 import logging
@@ -106,7 +107,8 @@ import weewx.engine
 import weewx.manager
 import weewx.units
 from weeutil.config import search_up, accumulateLeaves
-from weeutil.weeutil import to_int, to_float, to_bool, timestamp_to_string, to_sorted_string
+from weeutil.weeutil import to_int, to_float, to_bool, timestamp_to_string, to_sorted_string, \
+    ForkSafeLock
 
 log = logging.getLogger(__name__)
 
@@ -140,6 +142,18 @@ class StdRESTful(weewx.engine.StdService):
     
     Offers a few common bits of functionality."""
 
+    def bind_rain_totals(self, manager_dict):
+        """Keep the shared, in-memory totals of recent rain up to date.
+
+        This should be called before binding any other NEW_ARCHIVE_RECORD callbacks, so that
+        the totals include a new record before it gets queued for a posting thread."""
+        self.rain_totals = get_rain_totals(manager_dict, create=True)
+        self.bind(weewx.NEW_ARCHIVE_RECORD, self.update_rain_totals)
+
+    def update_rain_totals(self, event):
+        """Add a new archive record to the totals of recent rain."""
+        self.rain_totals.add_record(event.record)
+
     def shutDown(self):
         """Shut down any threads"""
         if hasattr(self, 'loop_queue') and hasattr(self, 'loop_thread'):
@@ -165,6 +179,172 @@ class StdRESTful(weewx.engine.StdService):
 StdRESTbase = StdRESTful
 
 
+class RainTotals:
+    """Rolling totals of recent rain, kept in memory.
+
+    Archive records are added as they arrive. The totals used by many uploaders, 'hourRain',
+    'rain24', and 'dayRain', can then be calculated without querying the database. They give
+    the same results as the equivalent SQL queries against the archive.
+
+    Cumulative sums of rain, and the number of non-null rain values, are kept for each record,
+    so the total over any window is just a difference between two of them.
+    """
+
+    def __init__(self):
+        self.lock = ForkSafeLock()
+        # If the database held mixed unit systems the last time the totals were primed, the
+        # time of the last record before the change. The totals cannot be primed until it is
+        # out of their window.
+        self.mixed_ts = None
+        self._reset()
+
+    def _reset(self):
+        # Unit system of the records held
+        self.unit_system = None
+        # Earliest time for which the totals are complete. None means not yet primed from the
+        # database.
+        self.start_ts = None
+        self.timestamps = []
+        self.cum_rain = []
+        self.cum_count = []
+        # Cumulative rain and count before the first retained record
+        self.base_rain = 0.0
+        self.base_count = 0
+
+    def add_record(self, record):
+        """Add a new archive record."""
+        with self.lock:
+            self._add(record['dateTime'], record['usUnits'], record.get('rain'))
+            self._trim()
+
+    def _add(self, time_ts, unit_system, rain):
+        if self.timestamps and time_ts <= self.timestamps[-1]:
+            # Already seen it (several services feed the same totals), or it's an old record
+            # being backfilled. If the latter, the totals can no longer be trusted.
+            i = bisect.bisect_left(self.timestamps, time_ts)
+            if self.timestamps[i] != time_ts:
+                log.debug("Out of order record %s. Resetting rain totals",
+                          timestamp_to_string(time_ts))
+                self._reset()
+            return
+        if self.unit_system is None:
+            self.unit_system = unit_system
+        elif unit_system != self.unit_system:
+            log.debug("Mixed unit systems (%s vs %s). Resetting rain totals",
+                      self.unit_system, unit_system)
+            self._reset()
+            return
+        last_rain, last_count = self._cum(len(self.timestamps))
+        self.timestamps.append(time_ts)
+        if rain is None:
+            self.cum_rain.append(last_rain)
+            self.cum_count.append(last_count)
+        else:
+            self.cum_rain.append(last_rain + rain)
+            self.cum_count.append(last_count + 1)
+
+    def _trim(self):
+        """Drop records that are too old to be needed by any of the totals."""
+        if not self.timestamps:
+            return
+        latest_ts = self.timestamps[-1]
+        cutoff_ts = min(latest_ts - 24 * 3600, weeutil.weeutil.startOfDay(latest_ts))
+        i = bisect.bisect_left(self.timestamps, cutoff_ts)
+        if i:
+            self.base_rain, self.base_count = self._cum(i)
+            del self.timestamps[:i]
+            del self.cum_rain[:i]
+            del self.cum_count[:i]
+        if self.start_ts is not None:
+            self.start_ts = max(self.start_ts, cutoff_ts)
+
+    def _prime(self, time_ts, dbmanager):
+        """Load the records needed by the totals from the database."""
+        self._reset()
+        start_ts = min(time_ts - 24 * 3600, weeutil.weeutil.startOfDay(time_ts))
+        for _row in dbmanager.genSql("SELECT dateTime, usUnits, rain FROM %s "
+                                     "WHERE dateTime>=? ORDER BY dateTime ASC;"
+                                     % dbmanager.table_name, (start_ts,)):
+            if self.unit_system is not None and _row[1] != self.unit_system:
+                # Mixed unit systems in the database. The totals cannot be used. Remember
+                # that, so the database is not searched again for every record.
+                log.debug("Mixed unit systems (%s vs %s). Rain totals will come from the "
+                          "database", self.unit_system, _row[1])
+                self.mixed_ts = self.timestamps[-1]
+                self._reset()
+                return
+            self._add(*_row)
+        self.start_ts = start_ts
+        self.mixed_ts = None
+        self._trim()
+
+    def _cum(self, i):
+        """Return the cumulative rain and count of all records before index i."""
+        if i:
+            return self.cum_rain[i - 1], self.cum_count[i - 1]
+        return self.base_rain, self.base_count
+
+    def _sum(self, lo, hi):
+        """Return the sum of rain for records with index in [lo, hi). Like SQL SUM(), the
+        result is None if there are no non-null values."""
+        rain_hi, count_hi = self._cum(hi)
+        rain_lo, count_lo = self._cum(lo)
+        if count_hi == count_lo:
+            return None
+        return rain_hi - rain_lo
+
+    def get_totals(self, time_ts, unit_system, dbmanager):
+        """Calculate 'hourRain', 'rain24', and 'dayRain' as of time time_ts.
+
+        Args:
+            time_ts (float): The time of the record being augmented.
+            unit_system (int): The unit system of the record being augmented.
+            dbmanager (weewx.manager.Manager): A database manager, used to prime the totals
+                the first time through.
+
+        Returns:
+            dict|None: A dictionary with the totals, or None if they cannot be calculated from
+                memory. In that case, the caller should query the database.
+        """
+        with self.lock:
+            _sod_ts = weeutil.weeutil.startOfDay(time_ts)
+            window_start_ts = min(time_ts - 24 * 3600, _sod_ts)
+            if self.start_ts is None \
+                    and (self.mixed_ts is None or window_start_ts > self.mixed_ts):
+                self._prime(time_ts, dbmanager)
+            if self.start_ts is None \
+                    or window_start_ts < self.start_ts \
+                    or (self.unit_system is not None and unit_system != self.unit_system):
+                return None
+            hi = bisect.bisect_right(self.timestamps, time_ts)
+            # See RESTThread.get_record() for why the windows are open or closed on each end.
+            return {
+                'hourRain': self._sum(bisect.bisect_right(self.timestamps, time_ts - 3600), hi),
+                'rain24': self._sum(bisect.bisect_right(self.timestamps, time_ts - 24 * 3600), hi),
+                'dayRain': self._sum(bisect.bisect_left(self.timestamps, _sod_ts), hi),
+            }
+
+
+# Shared rain totals, keyed by database and table
+_rain_totals_dict = {}
+_rain_totals_lock = ForkSafeLock()
+
+
+def get_rain_totals(manager_dict, create=False):
+    """Get the shared RainTotals object for the database described by manager_dict.
+
+    Returns None if manager_dict is None, or if no service is keeping totals for the database
+    and create is False."""
+    if manager_dict is None:
+        return None
+    key = (manager_dict.get('table_name'),
+           tuple(sorted((k, str(v)) for k, v in manager_dict.get('database_dict', {}).items())))
+    with _rain_totals_lock:
+        if create:
+            return _rain_totals_dict.setdefault(key, RainTotals())
+        return _rain_totals_dict.get(key)
+
+
 class RESTThread(threading.Thread):
     """Abstract base class for RESTful protocol threads.
     
@@ -254,7 +434,8 @@ class RESTThread(threading.Thread):
         Should return results in the same units as the record and the database.
         
         This is a general version that for each of types 'hourRain', 'rain24', and 'dayRain',
-        it checks for existence. If not there, then the database is used to add it. This works for:
+        it checks for existence. If not there, then it is calculated from the shared, in-memory
+        rain totals, if a service is keeping them, otherwise from the database. This works for:
           - WeatherUnderground
           - PWSweather
           - WOW
@@ -283,10 +464,20 @@ class RESTThread(threading.Thread):
         # Make a copy of the record, then start adding to it:
         _datadict = dict(record)
 
+        # If a service is keeping the totals of recent rain in memory, use them.
+        _rain_totals = get_rain_totals(self.manager_dict)
+
         # If the type 'rain' does not appear in the archive schema,
         # or the database is locked, an exception will be raised. Be prepared
         # to catch it.
         try:
+            if _rain_totals is not None:
+                _totals = _rain_totals.get_totals(_time_ts, record['usUnits'], dbmanager)
+                if _totals is not None:
+                    for _obs_type in _totals:
+                        _datadict.setdefault(_obs_type, _totals[_obs_type])
+
+            # Anything still missing comes from the database.
             if 'hourRain' not in _datadict:
                 # CWOP says rain should be "rain that fell in the past hour".
                 # WU says it should be "the accumulated rainfall in the past
@@ -630,6 +821,7 @@ class StdWunderground(StdRESTful):
         # Get the manager dictionary:
         _manager_dict = weewx.manager.get_manager_dict_from_config(
             config_dict, 'wx_binding')
+        self.bind_rain_totals(_manager_dict)
 
         # The default is to not do an archive post if a rapidfire post
         # has been specified, but this can be overridden
@@ -749,6 +941,7 @@ class StdPWSWeather(StdRESTful):
         # Get the manager dictionary:
         _manager_dict = weewx.manager.get_manager_dict_from_config(
             config_dict, 'wx_binding')
+        self.bind_rain_totals(_manager_dict)
 
         _ambient_dict.setdefault('server_url', StdPWSWeather.archive_url)
         self.archive_queue = queue.Queue()
@@ -1123,6 +1316,7 @@ class StdWOW(StdRESTful):
         # Get the manager dictionary:
         _manager_dict = weewx.manager.get_manager_dict_from_config(
             config_dict, 'wx_binding')
+        self.bind_rain_totals(_manager_dict)
 
         _ambient_dict.setdefault('server_url', self.archive_url)
         self.archive_queue = queue.Queue()
@@ -1179,6 +1373,7 @@ class StdCWOP(StdRESTful):
         # Get the database manager dictionary:
         _manager_dict = weewx.manager.get_manager_dict_from_config(
             config_dict, 'wx_binding')
+        self.bind_rain_totals(_manager_dict)
 
         self.archive_queue = queue.Queue()
         self.archive_thread = CWOPThread(self.archive_queue, _manager_dict,
@@ -1700,6 +1895,7 @@ class StdAWEKAS(StdRESTful):
 
         site_dict['manager_dict'] = weewx.manager.get_manager_dict_from_config(
             config_dict, 'wx_binding')
+        self.bind_rain_totals(site_dict['manager_dict'])
 
         self.archive_queue = queue.Queue()
         self.archive_thread = AWEKASThread(self.archive_queue, **site_dict)
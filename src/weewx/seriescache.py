@@ -0,0 +1,262 @@
+#
+#    Copyright (c) 2009-2024 Tom Keffer <tkeffer@gmail.com>
+#
+#    See the file LICENSE.txt for your full rights.
+#
+"""A cache on disk of the aggregated series used by plots.
+
+Every skin that plots, say, the hourly averages of outTemp over a week fetches the same series,
+one aggregation interval at a time. Once a day is over, its part of the series will not change,
+so it is saved in a file, where it can be read by any report, in any process.
+
+The files are kept in directory 'plot_cache' in SQLITE_ROOT. There is one per day, for each
+database, table, observation type, aggregation type, aggregation interval, and set of options
+passed on to the xtypes. The series are saved as arrays in machine format, so a file is read with
+a single call. The directory can be deleted at any time.
+
+A file is not used if its day changed after the file was written, according to the log of changed
+days kept with the daily summaries. This covers records that are added late, and tools that
+change old records, such as 'weectl database calc-missing' and 'weectl import'. Databases without
+daily summaries have no such log, so the directory must be deleted if their old records change.
+
+The files are made when a report first needs them, not as archive records arrive. Series that
+do not hold only numbers, such as wind vectors, cannot be saved. Once one is found, it is marked
+as such, and fetched without splitting it into days from then on.
+"""
+
+import array
+import datetime
+import hashlib
+import json
+import logging
+import math
+import os.path
+import re
+
+import weedb
+import weeutil.weeutil
+import weewx.manager
+import weewx.xtypes
+from weeutil.weeutil import TimeSpan
+from weewx.units import ValueTuple
+
+log = logging.getLogger(__name__)
+
+# Increment if the layout of the files changes
+FORMAT_VERSION = 1
+# The name of the file that marks a series that cannot be saved
+UNCACHEABLE = 'uncacheable'
+
+
+class SeriesCache:
+    """Gets series, using the files of the days that are over."""
+
+    def __init__(self, cache_root):
+        """Initialize an instance of SeriesCache.
+
+        Args:
+            cache_root (str): The directory the files are kept in.
+        """
+        self.cache_root = cache_root
+        # Key is a two-way tuple (database name, table name). Value is a dictionary, with the
+        # last time the data of a day changed, keyed by the start of the day.
+        self.changed_days = {}
+
+    @classmethod
+    def fromConfigDict(cls, config_dict, data_binding):
+        """Return a SeriesCache for the database of a binding. It keeps its files in the
+        SQLITE_ROOT of the database or, if that is not an SQLite database, of the SQLite
+        databases. Returns None if there is no SQLITE_ROOT."""
+        sqlite_root = weewx.manager.get_sqlite_root(config_dict, data_binding)
+        if not sqlite_root:
+            return None
+        return cls(os.path.join(sqlite_root, 'plot_cache'))
+
+    def get_series(self, obs_type, timespan, db_manager, aggregate_type=None,
+                   aggregate_interval=None, **option_dict):
+        """Like weewx.xtypes.get_series(). If the series can be split into days, the days that
+        are over are read from their files, or saved to them."""
+        aggregate_interval = weeutil.weeutil.nominal_spans(aggregate_interval)
+        if not can_split(timespan, aggregate_type, aggregate_interval):
+            return weewx.xtypes.get_series(obs_type, timespan, db_manager,
+                                           aggregate_type=aggregate_type,
+                                           aggregate_interval=aggregate_interval,
+                                           **option_dict)
+
+        directory = self._directory(db_manager, obs_type, aggregate_type, aggregate_interval,
+                                    option_dict)
+        if os.path.exists(os.path.join(directory, UNCACHEABLE)):
+            # The series cannot be saved, so there is nothing to gain by splitting it
+            return weewx.xtypes.get_series(obs_type, timespan, db_manager,
+                                           aggregate_type=aggregate_type,
+                                           aggregate_interval=aggregate_interval,
+                                           **option_dict)
+
+        changed_days = self._get_changed_days(db_manager)
+        start_vec, stop_vec, data_vec = [], [], []
+        units = [None] * 6
+
+        def add(series):
+            start_vec.extend(series[0][0])
+            stop_vec.extend(series[1][0])
+            data_vec.extend(series[2][0])
+            # The units are the first that are known
+            units[:] = [u if u is not None else v for u, v in
+                        zip(units, (series[0][1], series[0][2], series[1][1], series[1][2],
+                                    series[2][1], series[2][2]))]
+
+        for day in weeutil.weeutil.genDaySpans(timespan.start, timespan.stop):
+            span = TimeSpan(max(day.start, timespan.start), min(day.stop, timespan.stop))
+            if span.start >= span.stop:
+                continue
+            path = os.path.join(directory, '%d-%d.bin' % span)
+            series = _read_series(path, changed_days.get(day.start))
+            if series is None:
+                series = weewx.xtypes.get_series(obs_type, span, db_manager,
+                                                 aggregate_type=aggregate_type,
+                                                 aggregate_interval=aggregate_interval,
+                                                 **option_dict)
+                if not _can_write(series):
+                    # Remember not to split the series again, then get the rest of it at once
+                    _mark_uncacheable(directory)
+                    add(series)
+                    if span.stop < timespan.stop:
+                        add(weewx.xtypes.get_series(obs_type,
+                                                    TimeSpan(span.stop, timespan.stop),
+                                                    db_manager,
+                                                    aggregate_type=aggregate_type,
+                                                    aggregate_interval=aggregate_interval,
+                                                    **option_dict))
+                    break
+                # The records of a day that is over will not change
+                if db_manager.last_timestamp is not None \
+                        and span.stop <= db_manager.last_timestamp:
+                    _write_series(path, series)
+            add(series)
+
+        return (ValueTuple(start_vec, units[0], units[1]),
+                ValueTuple(stop_vec, units[2], units[3]),
+                ValueTuple(data_vec, units[4], units[5]))
+
+    def _directory(self, db_manager, obs_type, aggregate_type, aggregate_interval, option_dict):
+        """Return the directory of the files of a series."""
+        # Any of the options may change the series, except the time of the plot. The function
+        # used to thin out the data is not used for aggregates. See ImageGenerator.
+        options = repr(sorted((name, repr(value)) for name, value in option_dict.items()
+                              if name not in ('plotgen_ts', 'decimate_column')))
+        names = [db_manager.database_name, db_manager.table_name, obs_type,
+                 '%s-%d-%s' % (aggregate_type, aggregate_interval,
+                               hashlib.blake2b(options.encode('utf-8'),
+                                               digest_size=8).hexdigest())]
+        # Keep only what is safe in a file name
+        return os.path.join(self.cache_root, *(re.sub(r'[^\w.,-]', '_', str(name))
+                                               for name in names))
+
+
+    def _get_changed_days(self, db_manager):
+        """Return a dictionary with the last time the data of each day changed, keyed by the
+        start of the day. It is read once."""
+        key = (db_manager.database_name, db_manager.table_name)
+        if key not in self.changed_days:
+            try:
+                self.changed_days[key] = dict(db_manager.get_dirty_days())
+            except (AttributeError, weedb.DatabaseError):
+                # No daily summaries, or no log of the days that changed.
+                self.changed_days[key] = {}
+        return self.changed_days[key]
+
+
+def can_split(timespan, aggregate_type, aggregate_interval):
+    """Return True if a series is the same as the series of the days in its timespan, put
+    together.
+
+    This is the case if the aggregation intervals start on the same boundaries in every day,
+    which are the boundaries of the series. See weeutil.weeutil.intervalgen(). A cumulative series
+    depends on the days before, so it cannot be split.
+    """
+    if not aggregate_type or aggregate_type == 'cumulative' or not aggregate_interval \
+            or 86400 % aggregate_interval:
+        return False
+    start = datetime.datetime.fromtimestamp(timespan.start)
+    return not start.microsecond \
+        and not (start.hour * 3600 + start.minute * 60 + start.second) % aggregate_interval
+
+
+def _read_series(path, changed=None):
+    """Read a series from a file. Return None if there is no file, it cannot be read, or it was
+    written before time 'changed'."""
+    try:
+        with open(path, 'rb') as fd:
+            if changed is not None and os.fstat(fd.fileno()).st_mtime < changed:
+                return None
+            header = json.loads(fd.readline())
+            if header['version'] != FORMAT_VERSION:
+                return None
+            count = header['count']
+            vectors = []
+            for typecode in ('q', 'q', 'd'):
+                vector = array.array(typecode)
+                vector.fromfile(fd, count)
+                vectors.append(vector)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError, KeyError) as e:
+        log.debug("Unable to read cached series '%s': %s", path, e)
+        return None
+
+    start_vec, stop_vec, data_vec = vectors
+    data = [None if math.isnan(x) else x for x in data_vec]
+    if header['ints']:
+        data = [int(x) if x is not None else None for x in data]
+    units = header['units']
+    return (ValueTuple(start_vec.tolist(), units[0], units[1]),
+            ValueTuple(stop_vec.tolist(), units[2], units[3]),
+            ValueTuple(data, units[4], units[5]))
+
+
+def _can_write(series):
+    """Return True if a series can be written to a file. Series that do not hold only numbers,
+    such as the complex numbers of wind vectors, cannot."""
+    start_vt, stop_vt, data_vt = series
+    return all(type(x) is int for x in start_vt[0]) \
+        and all(type(x) is int for x in stop_vt[0]) \
+        and all(x is None or type(x) in (int, float) for x in data_vt[0])
+
+
+def _mark_uncacheable(directory):
+    """Leave a file in the directory of a series, to tell that the series cannot be saved."""
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, UNCACHEABLE), 'w'):
+            pass
+    except OSError as e:
+        log.debug("Unable to mark series '%s' as not cacheable: %s", directory, e)
+
+
+def _write_series(path, series):
+    """Write a series to a file. Series that cannot be, are not written. See _can_write()."""
+    if not _can_write(series):
+        return
+    start_vt, stop_vt, data_vt = series
+    ints = all(type(x) is int for x in data_vt[0] if x is not None)
+    header = {
+        'version': FORMAT_VERSION,
+        'count': len(data_vt[0]),
+        'ints': ints,
+        'units': [start_vt[1], start_vt[2], stop_vt[1], stop_vt[2], data_vt[1], data_vt[2]],
+    }
+    tmpname = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmpname, 'wb') as fd:
+            fd.write(json.dumps(header).encode('utf-8') + b'\n')
+            array.array('q', start_vt[0]).tofile(fd)
+            array.array('q', stop_vt[0]).tofile(fd)
+            array.array('d', [math.nan if x is None else x for x in data_vt[0]]).tofile(fd)
+        os.replace(tmpname, path)
+    except OSError as e:
+        log.error("Unable to save cached series '%s': %s", path, e)
+        try:
+            os.unlink(tmpname)
+        except OSError:
+            pass
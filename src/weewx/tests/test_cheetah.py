@@ -99,5 +99,65 @@ class TestHelpers(unittest.TestCase):
         self.assertIsNone(weewx.cheetahgenerator.JSONHelpers.to_int(None))
 
 
+class CountingExtension(weewx.cheetahgenerator.SearchList):
+    """Search list extension that counts how many times it is asked for its extension list"""
+
+    def __init__(self, generator):
+        super().__init__(generator)
+        self.ncalls = 0
+
+    def get_extension_list(self, timespan, db_lookup):
+        self.ncalls += 1
+        return [{'ncalls': self.ncalls}]
+
+
+class CacheableExtension(CountingExtension):
+    cacheable = True
+
+
+class FakeBinder:
+    def bind_default(self, binding):
+        return lambda data_binding=None: None
+
+
+class TestSearchList(unittest.TestCase):
+    """Test reusing search list extensions"""
+
+    def test_cache(self):
+        generator = weewx.cheetahgenerator.CheetahGenerator.__new__(
+            weewx.cheetahgenerator.CheetahGenerator)
+        generator.db_binder = FakeBinder()
+        generator.db_lookups = {}
+        generator.extension_cache = {}
+        generator.outputted_dict = {}
+        plain = CountingExtension(generator)
+        cacheable = CacheableExtension(generator)
+        default = weewx.cheetahgenerator.SearchList(generator)
+        generator.search_list_objs = [plain, cacheable, default]
+
+        timespan = weeutil.weeutil.TimeSpan(1000, 2000)
+        for i in range(3):
+            generator._getSearchList('utf8', timespan, 'wx_binding', 'index', 'index.html')
+        self.assertEqual(plain.ncalls, 3)
+        self.assertEqual(cacheable.ncalls, 1)
+        self.assertTrue(default.is_cacheable())
+
+        # A different timespan requires a new extension list
+        generator._getSearchList('utf8', weeutil.weeutil.TimeSpan(1000, 3000), 'wx_binding',
+                                 'index', 'index.html')
+        self.assertEqual(cacheable.ncalls, 2)
+
+        # Only the most recently used timespans are kept
+        ntimespans = 3 * weewx.cheetahgenerator.MAX_CACHED_EXTENSIONS
+        for i in range(1, ntimespans + 1):
+            generator._getSearchList('utf8', weeutil.weeutil.TimeSpan(1000 + i, 2000 + i),
+                                     'wx_binding', 'index', 'index.html')
+            generator._getSearchList('utf8', timespan, 'wx_binding', 'index', 'index.html')
+        self.assertEqual(len(generator.extension_cache),
+                         weewx.cheetahgenerator.MAX_CACHED_EXTENSIONS)
+        # The timespan used all along is kept, but the others had to be made again
+        self.assertEqual(cacheable.ncalls, 2 + ntimespans)
+
+
 if __name__ == '__main__':
     unittest.main()
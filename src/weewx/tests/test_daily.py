@@ -198,6 +198,42 @@ class Common:
                                                   'sum', 'count', 'wsum', 'sumtime',
                                                   'last', 'lasttime')]))
 
+    def testDirtyDays(self):
+        with weewx.manager.open_manager_with_config(self.config_dict, 'wx_binding') as manager:
+            start_d = datetime.date(2010, 3, 15)
+            start_ts = int(time.mktime(start_d.timetuple()))
+            t0 = time.time()
+
+            # Rebuilding a day should mark it as changed...
+            manager.backfill_day_summary(start_d=start_d, stop_d=start_d)
+            dirty_days = dict(manager.get_dirty_days())
+            self.assertGreaterEqual(dirty_days[start_ts], t0)
+
+            # ... as should updating a value. Write back the same value, so as not to change the
+            # test database.
+            t1 = time.time()
+            record = manager.getRecord(start_ts + 7200)
+            manager.updateValue(record['dateTime'], 'outTemp', record['outTemp'])
+            dirty_days = dict(manager.get_dirty_days())
+            self.assertGreaterEqual(dirty_days[start_ts], t1)
+
+            # The log should not appear as an observation type
+            self.assertNotIn('_dirty', manager.daykeys)
+
+    def testDirtyDaysOldDatabase(self):
+        """Daily summaries from before the log of changed days should get it when a day
+        changes, but not before."""
+        with weewx.manager.open_manager_with_config(self.config_dict, 'wx_binding') as manager:
+            manager.connection.execute("DROP TABLE archive_day__dirty")
+        with weewx.manager.open_manager_with_config(self.config_dict, 'wx_binding') as manager:
+            self.assertNotIn('archive_day__dirty', manager.connection.tables())
+            self.assertEqual(manager.get_dirty_days(), [])
+
+            start_ts = int(time.mktime(datetime.date(2010, 3, 15).timetuple()))
+            record = manager.getRecord(start_ts + 7200)
+            manager.updateValue(record['dateTime'], 'outTemp', record['outTemp'])
+            self.assertEqual([row[0] for row in manager.get_dirty_days()], [start_ts])
+
     def testTags(self):
         """Test common tags."""
         global skin_dict
@@ -0,0 +1,92 @@
+#
+#    Copyright (c) 2009-2024 Tom Keffer <tkeffer@gmail.com>
+#
+#    See the file LICENSE.txt for your full rights.
+#
+"""Test the image generator."""
+
+import math
+import multiprocessing
+import unittest
+
+import weeplot.genplot
+import weewx.imagegenerator
+import weewx.xtypes
+from weeutil.weeutil import TimeSpan, to_int, ForkSafeLock
+
+START_TS = 1719817200
+STOP_TS = START_TS + 86400
+NPOINTS = 50000
+
+
+class DecimateTest(unittest.TestCase):
+    """Test thinning out long plot lines"""
+
+    def render(self, plot_options, line_options, decimate):
+        """Render a long line. Return a two-way tuple (image bytes, whether it was thinned out)."""
+        plot = weeplot.genplot.TimePlot(plot_options)
+        plot.setXScaling((START_TS, STOP_TS, 3 * 3600))
+        plot.setYScaling((None, None, None))
+        rows = [(START_TS + i * 86400 / NPOINTS, START_TS + (i + 1) * 86400 / NPOINTS,
+                 20.0 + 5.0 * math.sin(i / 2000.0) + 3.0 * math.sin(i * 1.7))
+                for i in range(NPOINTS)]
+        column_of = None
+        if decimate:
+            column_of = weewx.imagegenerator._get_decimate_column(
+                plot, 'line', None, line_options, TimeSpan(START_TS, STOP_TS))
+            if column_of:
+                rows = list(weewx.xtypes.decimate(rows, column_of))
+        plot.addLine(weeplot.genplot.PlotLine([row[1] for row in rows],
+                                              [row[2] for row in rows],
+                                              label='Temperature',
+                                              width=to_int(line_options.get('width'))))
+        return plot.render().tobytes(), column_of is not None
+
+    def test_same_image(self):
+        """Plots drawn with and without thinning out should be the same"""
+        for plot_options, line_options, thinned in (
+                ({}, {}, True),
+                ({}, {'width': '1'}, True),
+                ({'anti_alias': '2'}, {}, False),
+                ({'anti_alias': '2'}, {'width': '1'}, False),
+                ({'chart_line_width': '2'}, {}, False),
+                ({'chart_line_width': ['1', '2']}, {}, False),
+                ({'chart_line_width': '2'}, {'width': '1'}, True),
+                ({'chart_line_width': '2', 'anti_alias': '2'}, {'width': '1'}, False),
+                ({}, {'width': '2'}, False)):
+            with self.subTest(plot_options=plot_options, line_options=line_options):
+                expected, _ = self.render(plot_options, line_options, False)
+                image, was_thinned = self.render(plot_options, line_options, True)
+                self.assertEqual(was_thinned, thinned)
+                self.assertEqual(image, expected)
+
+
+class LockingGenerator:
+    """Stands in for an ImageGenerator. Its images need a lock."""
+
+    def __init__(self):
+        self.config_dict = {}
+        self.lock = ForkSafeLock()
+
+    def gen_image(self, timespan, plotname, plotgen_ts, img_file):
+        if not self.lock.acquire(timeout=5):
+            return img_file, None, []
+        self.lock.release()
+        return img_file, b'png', []
+
+
+class WorkersTest(unittest.TestCase):
+    """Test generating images in a pool of workers"""
+
+    @unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(), "Requires fork")
+    def test_held_lock(self):
+        """Workers should not be stopped by a lock that was held when they were forked"""
+        generator = LockingGenerator()
+        jobs = [('day_images', 'plot%d' % i, STOP_TS, 'plot%d.png' % i) for i in range(4)]
+        with generator.lock:
+            results = list(weewx.imagegenerator.ImageGenerator.run_jobs(generator, jobs, 2))
+        self.assertEqual(results, [(job[3], b'png', []) for job in jobs])
+
+
+if __name__ == '__main__':
+    unittest.main()
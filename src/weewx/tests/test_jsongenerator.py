@@ -0,0 +1,148 @@
+#
+#    Copyright (c) 2009-2024 Tom Keffer <tkeffer@gmail.com>
+#
+#    See the file LICENSE.txt for your full rights.
+#
+"""Test the JSON generator."""
+
+import gzip
+import json
+import logging
+import os
+import os.path
+import shutil
+import sys
+import time
+import unittest
+
+import configobj
+
+import gen_fake_data
+import weeutil.config
+import weeutil.logger
+import weewx
+import weewx.defaults
+import weewx.jsongenerator
+import weewx.manager
+import weewx.station
+
+weewx.debug = 1
+
+log = logging.getLogger(__name__)
+# Set up logging using the defaults.
+weeutil.logger.setup('weetest_jsongenerator')
+
+os.environ['TZ'] = 'America/Los_Angeles'
+time.tzset()
+
+# Find the configuration file. It's assumed to be in the same directory as me.
+my_dir = os.path.normpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+config_path = os.path.join(my_dir, "testgen.conf")
+
+try:
+    config_dict = configobj.ConfigObj(config_path, file_error=True, encoding='utf-8')
+except IOError:
+    sys.stderr.write("Unable to open configuration file %s" % config_path)
+    raise
+
+SKIN_INI = """
+REPORT_NAME = JSONTest
+HTML_ROOT = test_results/JSONTest
+[JSONGenerator]
+    data_binding = wx_binding
+    compression = gzip
+    [[current]]
+        observations = outTemp, barometer
+    [[day]]
+        time_length = 86400
+        [[[outTemp]]]
+            aggregates = min, max
+        [[[rain]]]
+            aggregate_type = sum
+            aggregate_interval = hour
+            ndigits = 2
+"""
+
+
+class TestJSONGenerator(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dict = weeutil.config.deep_copy(config_dict)
+        # This will generate the test databases if necessary:
+        gen_fake_data.configDatabases(self.config_dict, database_type='sqlite')
+
+        self.skin_dict = weeutil.config.deep_copy(weewx.defaults.defaults)
+        self.skin_dict.merge(weeutil.config.config_from_str(SKIN_INI))
+        self.json_dir = os.path.join(self.config_dict['WEEWX_ROOT'], self.skin_dict['HTML_ROOT'])
+        shutil.rmtree(self.json_dir, ignore_errors=True)
+        self.stn_info = weewx.station.StationInfo(**self.config_dict['Station'])
+
+    def run_generator(self, gen_ts):
+        generator = weewx.jsongenerator.JSONGenerator(self.config_dict, self.skin_dict, gen_ts,
+                                                      True, self.stn_info)
+        try:
+            generator.start()
+        finally:
+            generator.finalize()
+
+    def load(self, name):
+        with open(os.path.join(self.json_dir, name + '.json'), encoding='utf-8') as fd:
+            return json.load(fd)
+
+    def test_current(self):
+        gen_ts = gen_fake_data.stop_ts
+        self.run_generator(gen_ts)
+        doc = self.load('current')
+        self.assertEqual(doc['dateTime'], gen_ts)
+        self.assertEqual(set(doc['observations']), {'outTemp', 'barometer'})
+        out_temp = doc['observations']['outTemp']
+        self.assertEqual(out_temp['unit'], 'degree_F')
+        self.assertEqual(out_temp['formatted'], '%.1f' % out_temp['value'])
+
+    def test_series(self):
+        gen_ts = gen_fake_data.stop_ts
+        self.run_generator(gen_ts)
+        doc = self.load('day')
+        out_temp = doc['series']['outTemp']
+        self.assertEqual(out_temp['unit'], 'degree_F')
+        # One record every half hour
+        self.assertEqual(len(out_temp['data']), 48)
+        self.assertEqual(out_temp['stop'][-1], gen_ts)
+        self.assertEqual(out_temp['aggregates']['max'],
+                         max(x for x in out_temp['data'] if x is not None))
+        rain = doc['series']['rain']
+        self.assertEqual(rain['aggregate_interval'], 3600)
+        self.assertEqual(rain['start'][0] % 3600, 0)
+        self.assertEqual(rain['stop'][-1], gen_ts)
+
+        # The precompressed file should hold the same document
+        with gzip.open(os.path.join(self.json_dir, 'day.json.gz'), 'rt', encoding='utf-8') as fd:
+            self.assertEqual(json.load(fd), doc)
+
+    def test_incremental(self):
+        """An incremental update should give the same result as generating from scratch."""
+        gen_ts = gen_fake_data.stop_ts
+        self.run_generator(gen_ts - 3 * 3600 - 1800)
+        self.run_generator(gen_ts - 1800)
+        self.run_generator(gen_ts)
+        incremental = self.load('day')
+
+        shutil.rmtree(self.json_dir)
+        self.run_generator(gen_ts)
+        self.assertEqual(incremental, self.load('day'))
+
+    def test_incremental_unaligned(self):
+        """The same, but with times that do not fall on archive records. The first record then
+        starts before the time span, yet it is still part of the series."""
+        gen_ts = gen_fake_data.stop_ts - 900
+        self.run_generator(gen_ts - 3 * 3600 - 1800)
+        self.run_generator(gen_ts)
+        incremental = self.load('day')
+
+        shutil.rmtree(self.json_dir)
+        self.run_generator(gen_ts)
+        self.assertEqual(incremental, self.load('day'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,13 +7,15 @@
 
 import logging
 import os.path
+import tempfile
 import unittest
+import unittest.mock
 
 import weeutil.config
 import weeutil.logger
 import weeutil.weeutil
 import weewx
-from weewx.reportengine import build_skin_dict
+from weewx.reportengine import build_skin_dict, get_dependencies, FileManifest, StdReportEngine
 
 log = logging.getLogger(__name__)
 weewx.debug = 1
@@ -198,6 +200,121 @@ class TestReportEngine(unittest.TestCase):
         skin_dict = build_skin_dict(self.config_dict, 'SeasonsReport')
         self.assertFalse(skin_dict['log_success'])
 
+    def test_cached_skin_dict(self):
+        """Test that a cached skin_dict is a copy, and is rebuilt when the config changes"""
+        skin_dict1 = build_skin_dict(self.config_dict, 'SeasonsReport')
+        skin_dict1['Units']['Groups']['group_pressure'] = 'kPa'
+        skin_dict2 = build_skin_dict(self.config_dict, 'SeasonsReport')
+        self.assertEqual(skin_dict2['Units']['Groups']['group_pressure'], 'inHg')
+        self.config_dict['StdReport']['Defaults']['unit_system'] = 'metricwx'
+        skin_dict3 = build_skin_dict(self.config_dict, 'SeasonsReport')
+        self.assertEqual(skin_dict3['Units']['Groups']['group_pressure'], 'mbar')
+
+
+class TestDependencies(unittest.TestCase):
+    """Test finding the dependencies between reports"""
+
+    def test_dependencies(self):
+        seasons = {'Generators': {'generator_list': 'weewx.cheetahgenerator.CheetahGenerator'}}
+        smartphone = {'Generators': {'generator_list': 'weewx.cheetahgenerator.CheetahGenerator'}}
+        ftp = {'Generators': {'generator_list': 'weewx.reportengine.FtpGenerator'}}
+        rsync = {'Generators': {'generator_list': 'weewx.reportengine.RsyncGenerator'},
+                 'depends_on': ['Seasons', 'Missing']}
+        jobs = [('Seasons', seasons), ('Smartphone', smartphone), ('FTP', ftp),
+                ('RSYNC', rsync)]
+        dependencies = get_dependencies(jobs)
+        self.assertEqual(dependencies, {'Seasons': set(),
+                                        'Smartphone': set(),
+                                        'FTP': {'Seasons', 'Smartphone'},
+                                        'RSYNC': {'Seasons'}})
+
+    def test_cycle(self):
+        """Reports that depend on each other should run in the order they are listed"""
+        jobs = [('A', {'depends_on': 'B'}),
+                ('B', {'depends_on': 'A'}),
+                ('C', {'depends_on': ['A', 'C']}),
+                ('D', {'depends_on': 'A'})]
+        dependencies = get_dependencies(jobs)
+        self.assertEqual(dependencies, {'A': set(),
+                                        'B': {'A'},
+                                        'C': {'A'},
+                                        'D': {'A'}})
+
+
+class TestRunConcurrently(unittest.TestCase):
+    """Test reaping the reports that run concurrently"""
+
+    class Worker:
+        def __init__(self, exitcode):
+            self.exitcode = exitcode
+
+        def is_alive(self):
+            return False
+
+        def join(self):
+            pass
+
+    def run_reports(self, exitcode):
+        engine = unittest.mock.Mock(config_dict={'StdReport': {}})
+        engine._start_worker.return_value = TestRunConcurrently.Worker(exitcode)
+        with self.assertLogs('weewx.reportengine', level='INFO') as cm:
+            StdReportEngine.run_concurrently(engine, [('Seasons', {})], 2)
+        return cm.output
+
+    def test_finished(self):
+        output = self.run_reports(0)
+        self.assertTrue(output[-1].startswith("INFO:weewx.reportengine:Report 'Seasons' finished"))
+
+    def test_failed(self):
+        output = self.run_reports(-9)
+        self.assertTrue(output[-1].startswith("ERROR:weewx.reportengine:Report 'Seasons' failed"))
+        self.assertTrue(output[-1].endswith("(exit code -9)"))
+
+
+class TestFileManifest(unittest.TestCase):
+    """Test skipping files whose contents have not changed"""
+
+    def test_manifest(self):
+        with tempfile.TemporaryDirectory() as tmp_root:
+            html_root = os.path.join(tmp_root, 'public_html')
+            os.mkdir(html_root)
+            manifest_path = os.path.join(tmp_root, 'manifests', 'Test.manifest')
+            path = os.path.join(html_root, 'index.html')
+            manifest = FileManifest(html_root, manifest_path)
+            self.assertTrue(manifest.write(path, b'abc'))
+            manifest.save()
+            # Files are known by their path relative to HTML_ROOT
+            self.assertEqual(list(manifest.entries), ['index.html'])
+            # Back date the file, and the time it was generated, to see whether they get touched
+            os.utime(path, (1000, 1000))
+            manifest.entries['index.html'][1] = 1000
+            manifest.changed = True
+            manifest.save()
+
+            manifest = FileManifest(html_root, manifest_path)
+            self.assertFalse(manifest.write(path, b'abc'))
+            self.assertEqual(os.path.getmtime(path), 1000)
+            # The manifest knows the file is up-to-date, and saves it
+            self.assertGreater(manifest.getmtime(path), 1000)
+            self.assertTrue(manifest.changed)
+            manifest.save()
+            self.assertGreater(FileManifest(html_root, manifest_path).getmtime(path), 1000)
+            manifest.set_watermark(path, [1, 2])
+            self.assertTrue(manifest.changed)
+            manifest.save()
+            manifest.set_watermark(path, [1, 2])
+            self.assertFalse(manifest.changed)
+
+            self.assertTrue(manifest.write(path, b'abcd'))
+            self.assertEqual((manifest.nwritten, manifest.nskipped), (1, 1))
+            with open(path, 'rb') as fd:
+                self.assertEqual(fd.read(), b'abcd')
+            # Nothing but the generated file is in HTML_ROOT
+            self.assertEqual(os.listdir(html_root), ['index.html'])
+
+            # Disabled, files are always written
+            manifest = FileManifest(html_root, manifest_path, enabled=False)
+            self.assertTrue(manifest.write(path, b'abcd'))
 
 if __name__ == '__main__':
     unittest.main()
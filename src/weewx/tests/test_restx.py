@@ -13,6 +13,7 @@ import unittest
 import urllib.parse
 from unittest import mock
 
+import weedb
 import weewx
 import weewx.restx
 
@@ -247,5 +248,82 @@ class TestAmbient(unittest.TestCase):
         return matcher
 
 
+class TestRainTotals(unittest.TestCase):
+    """Test the in-memory rain totals against the equivalent database queries"""
+
+    start = time.mktime(time.strptime("2018-03-21 18:00", "%Y-%m-%d %H:%M"))
+
+    def setUp(self):
+        import weewx.manager
+        import weewx.schemas.wview_extended
+        self.db_manager = weewx.manager.Manager.open_with_create(
+            {
+                'database_name': ':memory:',
+                'driver': 'weedb.sqlite'
+            },
+            schema=weewx.schemas.wview_extended.schema)
+        # A day and a half of 5-minute records, with rain in every third one. The second half
+        # crosses midnight.
+        self.records = []
+        for i in range(18 * 24):
+            self.records.append({'dateTime': TestRainTotals.start + i * 300,
+                                 'usUnits': weewx.US,
+                                 'interval': 5,
+                                 'rain': 0.01 * (i % 7) if i % 3 == 0 else None})
+
+    def tearDown(self):
+        self.db_manager.close()
+
+    def test_totals(self):
+        thread = weewx.restx.RESTThread(queue.Queue(), 'Test-Rain')
+        rain_totals = weewx.restx.RainTotals()
+
+        # Put the first half in the database, then prime the totals from it
+        for record in self.records[:len(self.records) // 2]:
+            self.db_manager.addRecord(record)
+        # Now feed the rest in, as they would arrive
+        for record in self.records[len(self.records) // 2:]:
+            self.db_manager.addRecord(record)
+            rain_totals.add_record(record)
+            totals = rain_totals.get_totals(record['dateTime'], weewx.US, self.db_manager)
+            # Compare with what the database says
+            expected = thread.get_record(record, self.db_manager)
+            for obs_type in ('hourRain', 'rain24', 'dayRain'):
+                if expected[obs_type] is None:
+                    self.assertIsNone(totals[obs_type])
+                else:
+                    self.assertAlmostEqual(totals[obs_type], expected[obs_type], 6)
+
+        # Records older than the retained window cannot be answered from memory
+        self.assertIsNone(rain_totals.get_totals(self.records[0]['dateTime'], weewx.US,
+                                                 self.db_manager))
+        # Nor can records in a different unit system
+        self.assertIsNone(rain_totals.get_totals(self.records[-1]['dateTime'], weewx.METRIC,
+                                                 self.db_manager))
+
+    def test_mixed_units(self):
+        rain_totals = weewx.restx.RainTotals()
+        for record in self.records[:len(self.records) // 2]:
+            self.db_manager.addRecord(record)
+        # The first records are in another unit system
+        with weedb.Transaction(self.db_manager.connection) as cursor:
+            cursor.execute("UPDATE archive SET usUnits=? WHERE dateTime<=?",
+                           (weewx.METRIC, self.records[11]['dateTime']))
+
+        with mock.patch.object(self.db_manager, 'genSql', wraps=self.db_manager.genSql) as spy:
+            for record in self.records[len(self.records) // 2:]:
+                self.db_manager.addRecord(record)
+                rain_totals.add_record(record)
+                totals = rain_totals.get_totals(record['dateTime'], weewx.US, self.db_manager)
+                if record['dateTime'] - 24 * 3600 <= self.records[11]['dateTime']:
+                    # The totals cannot come from memory while the other unit system is in
+                    # their window...
+                    self.assertIsNone(totals)
+                else:
+                    self.assertIsNotNone(totals)
+            # ... but the database was searched only once for it, then once it was out.
+            self.assertEqual(spy.call_count, 2)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -8,6 +8,7 @@
 import functools
 import os.path
 import sys
+import tempfile
 import time
 import unittest
 
@@ -15,6 +16,7 @@ import configobj
 
 import gen_fake_data
 import weewx
+import weewx.seriescache
 import weewx.units
 import weewx.wxformulas
 import weewx.xtypes
@@ -124,6 +126,30 @@ class Common:
         self.assertEqual(len(stop_vec[0]), (stop_ts - start_ts) / gen_fake_data.interval)
         self.assertEqual(len(data_vec[0]), (stop_ts - start_ts) / gen_fake_data.interval)
 
+    def test_get_series_archive_decimate(self):
+        """Test thinning out a series of outTemp to a few points per day."""
+        with weewx.manager.open_manager_with_config(self.config_dict, 'wx_binding') as db_manager:
+            full = weewx.xtypes.ArchiveTable.get_series('outTemp',
+                                                        TimeSpan(start_ts, stop_ts),
+                                                        db_manager)
+            thin = weewx.xtypes.ArchiveTable.get_series('outTemp',
+                                                        TimeSpan(start_ts, stop_ts),
+                                                        db_manager,
+                                                        decimate_column=lambda t: int(
+                                                            (t - start_ts) // 86400))
+        # All the nulls are kept. Each run of values between them keeps at most 4 points per day.
+        nulls = full[2][0].count(None)
+        self.assertEqual(thin[2][0].count(None), nulls)
+        self.assertLessEqual(len(thin[2][0]), 4 * (31 + nulls) + nulls)
+        self.assertEqual(thin[2][1:], full[2][1:])
+        # The first and last point, and the extremes, are kept
+        self.assertEqual(thin[1][0][0], full[1][0][0])
+        self.assertEqual(thin[1][0][-1], full[1][0][-1])
+        self.assertEqual(min(x for x in thin[2][0] if x is not None),
+                         min(x for x in full[2][0] if x is not None))
+        self.assertEqual(max(x for x in thin[2][0] if x is not None),
+                         max(x for x in full[2][0] if x is not None))
+
     def test_get_series_daily_agg_rain_sum(self):
         """Test a series of daily aggregated rain totals, run against the daily summaries"""
         with weewx.manager.open_manager_with_config(self.config_dict, 'wx_binding') as db_manager:
@@ -285,6 +311,99 @@ class Common:
             self.assertEqual(data_vec[1], 'inHg')
             self.assertEqual(data_vec[2], 'group_pressure')
 
+    def test_get_series_cached(self):
+        """Test getting series through the cache of series on disk."""
+        cases = [
+            ('outTemp', start_ts, 'avg', 3600),
+            ('outTemp', start_ts + 21 * 3600, 'max', 3 * 3600),
+            ('rain', start_ts, 'sum', 'day'),
+            ('rain', start_ts, 'count', 1800),
+            # Vectors are not saved, and these intervals cannot be split into days
+            ('windvec', start_ts, 'avg', 3600),
+            ('rain', start_ts, 'cumulative', 3600),
+            ('outTemp', start_ts + 1800, 'avg', 3600),
+            ('outTemp', start_ts, 'avg', 5 * 3600),
+        ]
+        with weewx.manager.open_manager_with_config(self.config_dict, 'wx_binding') \
+                as db_manager, tempfile.TemporaryDirectory() as cache_root:
+            cache = weewx.seriescache.SeriesCache(cache_root)
+            for obs_type, start, aggregate_type, aggregate_interval in cases:
+                timespan = TimeSpan(start, stop_ts)
+                expected = weewx.xtypes.get_series(obs_type, timespan, db_manager,
+                                                   aggregate_type, aggregate_interval)
+                # The first time, the days are saved. The second time, they are read.
+                for _ in range(2):
+                    self.assertEqual(cache.get_series(obs_type, timespan, db_manager,
+                                                      aggregate_type, aggregate_interval),
+                                     expected)
+            # Only the days of the series that can be split, and hold numbers, have been saved.
+            # The series of vectors has been marked, so it will not be split again.
+            files = [name for _, _, names in os.walk(cache_root) for name in names]
+            self.assertEqual(len(files), 4 * 31 + 1)
+            self.assertIn(weewx.seriescache.UNCACHEABLE, files)
+
+    def test_get_series_cached_options(self):
+        """Series with different options should not share their files."""
+        with weewx.manager.open_manager_with_config(self.config_dict, 'wx_binding') \
+                as db_manager, tempfile.TemporaryDirectory() as cache_root:
+            cache = weewx.seriescache.SeriesCache(cache_root)
+            timespan = TimeSpan(start_ts, start_ts + 2 * 86400)
+            for option_dict in ({}, {'plotgen_ts': stop_ts}, {'some_option': '1'},
+                                {'some_option': '2'}):
+                cache.get_series('outTemp', timespan, db_manager, 'avg', 3600, **option_dict)
+            # The time of the plot makes no difference
+            directories = [path for path, _, names in os.walk(cache_root) if names]
+            self.assertEqual(len(directories), 3)
+
+    def test_get_series_cached_changed(self):
+        """A day should be read again from the database if it changed after it was saved."""
+        with weewx.manager.open_manager_with_config(self.config_dict, 'wx_binding') \
+                as db_manager, tempfile.TemporaryDirectory() as cache_root:
+            timespan = TimeSpan(start_ts, start_ts + 86400)
+            expected = weewx.xtypes.get_series('outTemp', timespan, db_manager, 'avg', 3600)
+            weewx.seriescache.SeriesCache(cache_root).get_series('outTemp', timespan, db_manager,
+                                                                 'avg', 3600)
+            # Change what was saved, behind the back of the database
+            path = [os.path.join(path, names[0]) for path, _, names in os.walk(cache_root)
+                    if names][0]
+            changed = (expected[0], expected[1],
+                       weewx.units.ValueTuple([0.0] * len(expected[2][0]),
+                                              expected[2][1], expected[2][2]))
+            weewx.seriescache._write_series(path, changed)
+            self.assertEqual(weewx.seriescache.SeriesCache(cache_root).get_series(
+                'outTemp', timespan, db_manager, 'avg', 3600), changed)
+            # Once the day is marked as changed, the file is no longer used
+            db_manager.mark_dirty([start_ts])
+            self.assertEqual(weewx.seriescache.SeriesCache(cache_root).get_series(
+                'outTemp', timespan, db_manager, 'avg', 3600), expected)
+
+    def test_get_wind_bins(self):
+        """Wind should be counted like a loop over the records does"""
+        import weewx.imagegenerator
+
+        timespan = TimeSpan(start_ts, start_ts + 10 * 86400 + 1800)
+        speed_bins = [2.0, 5.0, 10.0, 15.0]
+        expected = [[0] * 5 for _ in range(16)]
+        expected_calm = 0
+        with weewx.manager.open_manager_with_config(self.config_dict, 'wx_binding') as db_manager:
+            for record in db_manager.genBatchRecords(*timespan):
+                speed, direction = record['windSpeed'], record['windDir']
+                if speed is None:
+                    continue
+                if direction is None or speed <= 1.0:
+                    expected_calm += 1
+                    continue
+                speed_class = sum(1 for bound in speed_bins if speed >= bound)
+                expected[int((direction + 11.25) / 22.5) % 16][speed_class] += 1
+            self.assertTrue(sum(map(sum, expected)))
+
+            # The second time, the days that are over come from the cache
+            for _ in range(2):
+                counts, calm = weewx.imagegenerator.get_wind_bins(
+                    db_manager, timespan, 'windSpeed', 'windDir', speed_bins, 1.0)
+                self.assertEqual(counts, expected)
+                self.assertEqual(calm, expected_calm)
+
 
 class TestSqlite(Common, unittest.TestCase):
 
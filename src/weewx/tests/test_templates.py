@@ -6,6 +6,7 @@
 #
 """Test tag notation for template generation."""
 
+import glob
 import locale
 import logging
 import os
@@ -18,6 +19,7 @@ import unittest
 import configobj
 
 import gen_fake_data
+import weeplot.genplot
 import weeutil.config
 import weeutil.logger
 import weeutil.weeutil
@@ -203,6 +205,209 @@ class Common:
 
                         print(f"Checked {n:d} lines in {filename_rel}")
 
+    def seasons_generator(self, generator_class, report, customize=None):
+        """Return a generator for a report that uses the Seasons skin.
+
+        Args:
+            generator_class (type): The class of the generator, such as
+                weewx.imagegenerator.ImageGenerator.
+            report (str): The name of the report. Its files go in a directory of the same name.
+            customize (callable|None): If given, it is called with the skin dictionary before
+                the generator is made.
+        """
+        stn_info = weewx.station.StationInfo(**self.config_dict['Station'])
+        with weeutil.weeutil.get_resource_path('weewx_data', 'skins') as skin_root:
+            self.config_dict['StdReport']['SKIN_ROOT'] = skin_root
+        self.seasons_dir = os.path.join(skin_root, 'Seasons')
+        self.config_dict['StdReport'][report] = {
+            'skin': 'Seasons',
+            'HTML_ROOT': os.path.join(self.config_dict['StdReport']['HTML_ROOT'], report)
+        }
+        skin_dict = weewx.reportengine.build_skin_dict(self.config_dict, report)
+        if customize:
+            customize(skin_dict)
+        return generator_class(self.config_dict, skin_dict, gen_fake_data.stop_ts, True,
+                               stn_info)
+
+    def test_seasons_index_benchmark(self):
+        """Benchmark rendering the index page of the Seasons skin"""
+        import weewx.cheetahgenerator
+
+        def customize(skin_dict):
+            # Generate only the index page
+            skin_dict['CheetahGenerator'] = {'encoding': 'html_entities',
+                                             'ToDate': {'index': {'template': 'index.html.tmpl'}}}
+
+        N = 5
+        t0 = time.time()
+        for _ in range(N):
+            generator = self.seasons_generator(weewx.cheetahgenerator.CheetahGenerator,
+                                               'SeasonsBenchmark', customize)
+            with weewx.reportengine.set_cwd(self.seasons_dir):
+                generator.start()
+                generator.finalize()
+        t1 = time.time()
+        log.info("Seasons index.html: %.3f seconds per render", (t1 - t0) / N)
+
+        index_path = os.path.join(self.config_dict['WEEWX_ROOT'],
+                                  generator.skin_dict['HTML_ROOT'], 'index.html')
+        with open(index_path) as fd:
+            contents = fd.read()
+        self.assertTrue('Current Conditions' in contents)
+
+    def test_profile(self):
+        """Profile rendering the index page of the Seasons skin"""
+        import weewx.cheetahgenerator
+        import weewx.reportprofile
+
+        def customize(skin_dict):
+            skin_dict['CheetahGenerator'] = {'encoding': 'html_entities',
+                                             'ToDate': {'index': {'template': 'index.html.tmpl'}}}
+
+        generator = self.seasons_generator(weewx.cheetahgenerator.CheetahGenerator,
+                                           'SeasonsProfile', customize)
+        profile = weewx.reportprofile.ReportProfile(self.config_dict['WEEWX_ROOT'])
+        profile.install()
+        try:
+            with weewx.reportengine.set_cwd(self.seasons_dir):
+                generator.start()
+                generator.finalize()
+        finally:
+            profile.uninstall()
+        # The hooks should be gone
+        self.assertIsNone(weewx.reportprofile.current)
+
+        index_path = os.path.join(generator.skin_dict['HTML_ROOT'], 'index.html')
+        steps = {row['detail'] for row in profile.rows(category='template')
+                 if row['name'] == index_path}
+        self.assertEqual(steps, {'compile', 'evaluate', 'write'})
+        tags = {row['name']: row for row in profile.rows(category='tag')}
+        self.assertIn('$day.outTemp.max', tags)
+        self.assertEqual(tags['$day.outTemp.max']['detail'], index_path)
+
+    def test_image_workers(self):
+        """Images generated by a pool of workers should be identical to those generated
+        serially"""
+        import weewx.imagegenerator
+
+        images = {}
+        for workers in (1, 3):
+            def customize(skin_dict):
+                skin_dict['ImageGenerator']['image_workers'] = workers
+
+            generator = self.seasons_generator(weewx.imagegenerator.ImageGenerator,
+                                               'SeasonsImages%d' % workers, customize)
+            html_root = os.path.join(self.config_dict['WEEWX_ROOT'],
+                                     generator.skin_dict['HTML_ROOT'])
+            shutil.rmtree(html_root, ignore_errors=True)
+            weeplot.genplot._daynight_bands.clear()
+            with weewx.reportengine.set_cwd(self.seasons_dir):
+                generator.start()
+                generator.finalize()
+            # The bands drawn by the workers are kept
+            self.assertTrue(weeplot.genplot._daynight_bands)
+            images[workers] = {}
+            for path in glob.glob(os.path.join(html_root, '*.png')):
+                with open(path, 'rb') as fd:
+                    images[workers][os.path.basename(path)] = fd.read()
+
+        self.assertTrue(images[1])
+        self.assertEqual(images[1], images[3])
+
+    def test_shared_series(self):
+        """Plots of the same data should share the series"""
+        import weewx.imagegenerator
+
+        def customize(skin_dict):
+            skin_dict['ImageGenerator']['day_images'] = {
+                'time_length': 86400,
+                'daytempdew': {'outTemp': {}, 'dewpoint': {}},
+                'daytempchill': {'outTemp': {}, 'windchill': {}},
+                # Options other than the aggregation may also change the series
+                'daytempother': {'outTemp': {'other_option': 'x'}},
+                'dayrain': {'rain': {'plot_type': 'bar', 'aggregate_type': 'sum',
+                                     'aggregate_interval': 'hour'}},
+            }
+
+        generator = self.seasons_generator(weewx.imagegenerator.ImageGenerator,
+                                           'SharedSeries', customize)
+        generator.setup()
+        try:
+            jobs = [('day_images', plotname, generator.gen_ts, plotname + '.png')
+                    for plotname in generator.image_dict['day_images'].sections]
+            generator.share_series(jobs)
+            # Only outTemp is used by more than one line, with the same options
+            self.assertEqual([(key[1], uses) for key, (_, uses)
+                              in generator.shared_series.items()], [('outTemp', 2)])
+            shared = [generator.gen_image(*job)[:2] for job in jobs]
+            self.assertEqual(generator.shared_series, {})
+            # The images should be the same as those made without sharing
+            self.assertEqual(shared, [generator.gen_image(*job)[:2] for job in jobs])
+        finally:
+            generator.finalize()
+
+    def test_plot_watermark(self):
+        """Plots should be generated again only if their data or options have changed"""
+        import weewx.imagegenerator
+
+        day_images = {
+            'time_length': 86400,
+            'daytemp': {'outTemp': {}},
+            'daybarometer': {'barometer': {}},
+        }
+
+        def customize(skin_dict):
+            for timespan in list(skin_dict['ImageGenerator'].sections):
+                del skin_dict['ImageGenerator'][timespan]
+            skin_dict['ImageGenerator']['day_images'] = day_images
+
+        def run_generator():
+            generator = self.seasons_generator(weewx.imagegenerator.ImageGenerator,
+                                               'PlotWatermark', customize)
+            generator.start()
+            generator.finalize()
+            return generator.manifest
+
+        html_root = os.path.join(self.config_dict['WEEWX_ROOT'],
+                                 self.config_dict['StdReport']['HTML_ROOT'], 'PlotWatermark')
+        shutil.rmtree(html_root, ignore_errors=True)
+
+        manifest = run_generator()
+        self.assertEqual(manifest.nwritten, 2)
+        watermark = manifest.get_watermark(os.path.join(html_root, 'daytemp.png'))
+        self.assertEqual(watermark[0], gen_fake_data.stop_ts)
+
+        # Nothing has changed, so no plot should be generated
+        manifest = run_generator()
+        self.assertEqual(manifest.nwritten + manifest.nskipped, 0)
+
+        # Change the options of one plot
+        day_images['daytemp']['outTemp']['color'] = '0x00ff00'
+        manifest = run_generator()
+        self.assertEqual(manifest.nwritten, 1)
+        self.assertNotEqual(manifest.get_watermark(os.path.join(html_root, 'daytemp.png')),
+                            watermark)
+
+    def test_wind_rose(self):
+        """Wind roses should be drawn"""
+        import weewx.imagegenerator
+
+        def customize(skin_dict):
+            skin_dict['ImageGenerator']['month_images'] = {
+                'time_length': 'month',
+                'monthrose': {'plot_type': 'windrose'},
+            }
+
+        generator = self.seasons_generator(weewx.imagegenerator.ImageGenerator, 'WindRose',
+                                           customize)
+        generator.setup()
+        try:
+            _, png, _ = generator.gen_image('month_images', 'monthrose', generator.gen_ts,
+                                            'monthrose.png')
+            self.assertTrue(png.startswith(b'\x89PNG'))
+        finally:
+            generator.finalize()
+
 
 class TestSqlite(Common, unittest.TestCase):
 
@@ -229,7 +434,9 @@ class TestMySQL(Common, unittest.TestCase):
 
 
 def suite():
-    tests = ['test_report_engine']
+    tests = ['test_report_engine', 'test_seasons_index_benchmark', 'test_profile',
+             'test_image_workers', 'test_shared_series', 'test_plot_watermark',
+             'test_wind_rose']
     return unittest.TestSuite(list(map(TestSqlite, tests)) + list(map(TestMySQL, tests)))
     # return unittest.TestSuite(list(map(TestSqlite, tests)) )
 
@@ -6,9 +6,11 @@
 #
 """Test module weewx.units"""
 
+import json
 import unittest
 import operator
 
+import weeutil.weeutil
 import weewx.units
 from weewx.units import ValueTuple
 
@@ -101,7 +103,23 @@ class ConverterTest(unittest.TestCase):
         self.assertEqual(weewx.units.convert(value_t, "second"), (86400.0, 'second', 'group_deltatime'))
         self.assertEqual(weewx.units.convert(value_t, "hour"),   (24.0, 'hour', 'group_deltatime'))
         self.assertEqual(weewx.units.convert(value_t, "day"),    (1.0, 'day', 'group_deltatime'))
-        
+
+    def testAffine(self):
+        # An affine conversion should give the same results for lists as for scalars
+        f_to_c = weewx.units.conversionDict['degree_F']['degree_C']
+        self.assertIsInstance(f_to_c, weewx.units.Affine)
+        values = [-40.0, 32.0, None, 68.018, 212.0]
+        self.assertEqual(f_to_c.convert_list(values),
+                         [f_to_c(x) if x is not None else None for x in values])
+        self.assertEqual(weewx.units.convert((values, 'degree_F', 'group_temperature'),
+                                             'degree_C')[0][:3], [-40.0, 0.0, None])
+        # Integers should stay integers if nothing but integer arithmetic is involved
+        self.assertEqual(weewx.units.Affine(scale=8)(3), 24)
+        self.assertIsInstance(weewx.units.Affine(scale=8)(3), int)
+        # Nonlinear conversions are still done element by element
+        value_t = ([0, 86400], 'unix_epoch', 'group_time')
+        self.assertEqual(weewx.units.convert(value_t, 'dublin_jd')[0], [25567.5, 25568.5])
+
     def testConvertDict(self):
         d_m =  {'outTemp'   : 20.01,
                 'barometer' : 1002.3,
@@ -230,5 +248,80 @@ class ValueHelperTest(unittest.TestCase):
         self.assertEqual(vh.round(2).json(), "[[1.23, 2.35], [9.19, 2.76], null]")
 
 
+class SeriesHelperTest(unittest.TestCase):
+
+    def setUp(self):
+        start = weewx.units.ValueHelper(ValueTuple([0, 3600, 7200], 'unix_epoch', 'group_time'),
+                                        formatter=default_formatter)
+        stop = weewx.units.ValueHelper(ValueTuple([3600, 7200, 10800], 'unix_epoch', 'group_time'),
+                                       formatter=default_formatter)
+        data = weewx.units.ValueHelper(ValueTuple([68.1283, None, 69.9], 'degree_F',
+                                                  'group_temperature'),
+                                       formatter=default_formatter)
+        self.series = weewx.units.SeriesHelper(start, stop, data)
+
+    def test_json(self):
+        self.assertEqual(self.series.json(),
+                         "[[0, 3600, 68.1283], [3600, 7200, null], [7200, 10800, 69.9]]")
+        self.assertEqual(self.series.json(order_by='column'),
+                         "[[0, 3600, 7200], [3600, 7200, 10800], [68.1283, null, 69.9]]")
+        # Encoding in chunks should give the same results
+        self.assertEqual(''.join(self.series.iter_json(chunk_size=2)), self.series.json())
+        self.assertEqual(''.join(self.series.iter_json(order_by='column', chunk_size=2)),
+                         self.series.json(order_by='column'))
+        with self.assertRaises(ValueError):
+            self.series.json(order_by='foo')
+
+    def test_json_options(self):
+        self.assertEqual(self.series.json(ndigits=2, time_unit='unix_epoch_ms'),
+                         "[[0, 3600000, 68.13], [3600000, 7200000, null], "
+                         "[7200000, 10800000, 69.9]]")
+        # Rounding while encoding should give the same results as rounding first
+        self.assertEqual(self.series.json(ndigits=2), self.series.round(2).json())
+        self.assertEqual(self.series.json(ndigits=2), self.series.json(ndigits=2, indent=None))
+
+    def test_json_values_magnitudes(self):
+        """Very small and very large values should be encoded the way repr() shows them"""
+        values = [0.000012, -0.0000123456, 1.0e-7, 0.0, 12.5, None, 1.0e17, -1.23456789e15,
+                  123456789012.345678, float('nan'), 1.0e-5]
+        for ndigits in (1, 2, 6):
+            self.assertEqual(weewx.units._json_values(values, ndigits),
+                             [json.dumps(weeutil.weeutil.rounder(x, ndigits)) for x in values])
+        self.assertEqual(weewx.units._json_values([0.000012, 1.0e17], 6), ['1.2e-05', '1e+17'])
+
+
+class FormatterTest(unittest.TestCase):
+
+    def test_compile_format(self):
+        # Compiled formats should give the same results as locale.format_string
+        import locale
+        for format_string in ('%.1f', '%03d', '%.3f hours', '%.2e', '%.1f%%', '%s'):
+            for val in (12.345, 1, 0.0, -3.5):
+                func = weewx.units._compile_format(format_string)
+                self.assertEqual(func(val), locale.format_string(format_string, val))
+
+    def test_cache(self):
+        formatter = weewx.units.Formatter({'degree_F': '%.1f'}, {'degree_F': ['°F', '°F']})
+        vt = ValueTuple(68.01, 'degree_F', 'group_temperature')
+        self.assertEqual(formatter.toString(vt), "68.0°F")
+        # The same unit in a different context should format the same
+        self.assertEqual(formatter.toString(vt, context='day'), "68.0°F")
+        # Extending the unit system should discard the cached formats
+        weewx.units.default_unit_format_dict['degree_F'] = '%.2f'
+        try:
+            self.assertEqual(formatter.toString(vt), "68.01°F")
+            # ... as should changing it
+            weewx.units.default_unit_format_dict['degree_F'] = '%.3f'
+            self.assertEqual(formatter.toString(vt), "68.010°F")
+        finally:
+            del weewx.units.default_unit_format_dict['degree_F']
+        self.assertEqual(formatter.toString(vt), "68.0°F")
+
+    def test_singular_label(self):
+        formatter = weewx.units.Formatter({'hour': '%.0f'}, {'hour': [' hour', ' hours']})
+        self.assertEqual(formatter.toString(ValueTuple(1, 'hour', 'group_deltatime')), "1 hour")
+        self.assertEqual(formatter.toString(ValueTuple(2, 'hour', 'group_deltatime')), "2 hours")
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -7,6 +7,7 @@
 
 import logging
 import math
+import time
 import unittest
 
 try:
@@ -16,6 +17,7 @@ except ImportError:
     # Python 2 --- must have mock installed
     import mock
 
+import weedb
 import weewx.wxxtypes
 import weeutil.logger
 from weewx.units import ValueTuple
@@ -145,20 +147,23 @@ class TestPressureCooker(unittest.TestCase):
 
     def test_get_temperature_12h(self):
         pc = weewx.wxxtypes.PressureCooker(altitude_vt)
+        ts_12h = self.record['dateTime'] - 12 * 3600
 
         # Mock a database in US units
         db_manager = mock.Mock()
-        with mock.patch.object(db_manager, 'getRecord',
-                               return_value={'usUnits': weewx.US, 'outTemp': 80.3}) as mock_mgr:
+        with mock.patch.object(db_manager, 'genSql',
+                               return_value=[(ts_12h + 300, weewx.US, 80.3)]) as mock_mgr:
             t = pc._get_temperature_12h(self.record['dateTime'], db_manager)
-            # Make sure the mocked database manager got called with a time 12h ago
-            mock_mgr.assert_called_once_with(self.record['dateTime'] - 12 * 3600, max_delta=1800)
+            # Make sure the mocked database manager got called once, for the whole span
+            # between 12h ago and now
+            mock_mgr.assert_called_once()
+            self.assertEqual(mock_mgr.call_args[0][1], (ts_12h - 1800, self.record['dateTime']))
             # The results should be in US units
             self.assertEqual(t, (80.3, 'degree_F', 'group_temperature'))
 
         # Make sure the value has been cached:
-        with mock.patch.object(db_manager, 'getRecord',
-                               return_value={'usUnits': weewx.US, 'outTemp': 80.3}) as mock_mgr:
+        with mock.patch.object(db_manager, 'genSql',
+                               return_value=[(ts_12h, weewx.US, 80.3)]) as mock_mgr:
             t = pc._get_temperature_12h(self.record['dateTime'], db_manager)
             # The cached value should have been used
             mock_mgr.assert_not_called()
@@ -166,45 +171,76 @@ class TestPressureCooker(unittest.TestCase):
 
     def test_get_temperature_12h_metric(self):
         pc = weewx.wxxtypes.PressureCooker(altitude_vt)
+        ts_12h = self.record['dateTime'] - 12 * 3600
 
         # Mock a database in METRICWX units
         db_manager = mock.Mock()
-        with mock.patch.object(db_manager, 'getRecord',
-                               return_value={'usUnits': weewx.METRICWX,
-                                             'outTemp': 30.0}) as mock_mgr:
+        with mock.patch.object(db_manager, 'genSql',
+                               return_value=[(ts_12h, weewx.METRICWX, 30.0)]) as mock_mgr:
             t = pc._get_temperature_12h(self.record['dateTime'], db_manager)
-            # Make sure the mocked database manager got called with a time 12h ago
-            mock_mgr.assert_called_once_with(self.record['dateTime'] - 12 * 3600, max_delta=1800)
+            mock_mgr.assert_called_once()
             self.assertEqual(t, (30.0, 'degree_C', 'group_temperature'))
 
     def test_get_temperature_12h_missing(self):
         pc = weewx.wxxtypes.PressureCooker(altitude_vt)
+        ts_12h = self.record['dateTime'] - 12 * 3600
 
         db_manager = mock.Mock()
         # Mock a database missing a record from 12h ago
-        with mock.patch.object(db_manager, 'getRecord',
-                               return_value=None) as mock_mgr:
+        with mock.patch.object(db_manager, 'genSql',
+                               return_value=[(ts_12h - 3600, weewx.US, 80.3),
+                                             (ts_12h + 3600, weewx.US, 80.3)]) as mock_mgr:
             t = pc._get_temperature_12h(self.record['dateTime'], db_manager)
-            mock_mgr.assert_called_once_with(self.record['dateTime'] - 12 * 3600, max_delta=1800)
+            mock_mgr.assert_called_once()
             self.assertEqual(t, None)
 
-        # Mock a database that has a record from 12h ago, but it's missing outTemp
-        with mock.patch.object(db_manager, 'getRecord',
-                               return_value={'usUnits': weewx.METRICWX}) as mock_mgr:
+        # Mock a database that does not have outTemp
+        pc = weewx.wxxtypes.PressureCooker(altitude_vt)
+        with mock.patch.object(db_manager, 'genSql',
+                               side_effect=weedb.OperationalError("no such column: outTemp")) \
+                as mock_mgr:
             t = pc._get_temperature_12h(self.record['dateTime'], db_manager)
-            mock_mgr.assert_called_once_with(self.record['dateTime'] - 12 * 3600, max_delta=1800)
+            mock_mgr.assert_called_once()
             self.assertEqual(t, None)
 
+    def test_get_temperature_12h_history(self):
+        """Test that the history gets fed by archive records, rather than the database"""
+        pc = weewx.wxxtypes.PressureCooker(altitude_vt)
+        ts = self.record['dateTime']
+
+        db_manager = mock.Mock()
+        with mock.patch.object(db_manager, 'genSql',
+                               return_value=[(ts - 12 * 3600 + i * 300, weewx.US, 60.0 + i)
+                                             for i in range(12 * 12 + 1)]) as mock_mgr:
+            t = pc._get_temperature_12h(ts, db_manager)
+            mock_mgr.assert_called_once()
+            self.assertEqual(t, (60.0, 'degree_F', 'group_temperature'))
+
+        # Feed in another 12 hours worth of records. They should be used to look up the
+        # temperature, without any more queries.
+        with mock.patch.object(db_manager, 'genSql') as mock_mgr:
+            for i in range(1, 12 * 12 + 1):
+                pc.add_record({'dateTime': ts + i * 300, 'usUnits': weewx.US, 'outTemp': 70.0 + i})
+                t = pc._get_temperature_12h(ts + i * 300, db_manager)
+            mock_mgr.assert_not_called()
+            # Twelve hours ago is now covered by the original query. Because a temperature is
+            # reused until it is more than max_delta_12h stale, the one in use is from 20
+            # minutes earlier than that.
+            self.assertEqual(t, (60.0 + 140, 'degree_F', 'group_temperature'))
+            # The history should have been trimmed to a little more than 12 hours
+            self.assertEqual(len(pc.history_ts), 12 * 12 + 1 + 6)
+
     def test_pressure(self):
         """Test interface pressure()"""
 
         # Create a pressure cooker
         pc = weewx.wxxtypes.PressureCooker(altitude_vt)
+        ts_12h = self.record['dateTime'] - 12 * 3600
 
         # Mock up a database manager in US units
         db_manager = mock.Mock()
-        with mock.patch.object(db_manager, 'getRecord',
-                               return_value={'usUnits': weewx.US, 'outTemp': 80.3}):
+        with mock.patch.object(db_manager, 'genSql',
+                               return_value=[(ts_12h, weewx.US, 80.3)]):
             p = pc.pressure(self.record, db_manager)
             self.assertEqual(p, (pressure, 'inHg', 'group_pressure'))
 
@@ -214,14 +250,15 @@ class TestPressureCooker(unittest.TestCase):
                 p = pc.pressure(self.record, db_manager)
 
         # Mock a database missing a record from 12h ago
-        with mock.patch.object(db_manager, 'getRecord',
-                               return_value=None):
+        pc = weewx.wxxtypes.PressureCooker(altitude_vt)
+        with mock.patch.object(db_manager, 'genSql', return_value=[]):
             with self.assertRaises(weewx.CannotCalculate):
                 p = pc.pressure(self.record, db_manager)
 
         # Mock a database that has a record from 12h ago, but it's missing outTemp
-        with mock.patch.object(db_manager, 'getRecord',
-                               return_value={'usUnits': weewx.METRICWX}) as mock_mgr:
+        pc = weewx.wxxtypes.PressureCooker(altitude_vt)
+        with mock.patch.object(db_manager, 'genSql',
+                               return_value=[(ts_12h, weewx.METRICWX, None)]):
             with self.assertRaises(weewx.CannotCalculate):
                 p = pc.pressure(self.record, db_manager)
 
@@ -372,6 +409,31 @@ class TestRainRater(unittest.TestCase):
         self.assertAlmostEqual(rate[0], 25.20, 2)
         self.assertEqual(rate[1:], ('inch_per_hour', 'group_rainrate'))
 
+    def test_heavy_rain_benchmark(self):
+        """Benchmark rainRate with 1-second LOOP packets during heavy rain"""
+        rain_rater = weewx.wxxtypes.RainRater(TestRainRater.rain_period,
+                                              TestRainRater.retain_period)
+        # Two hours of 1-second packets, each with a 0.01" tip of the bucket
+        rain_generator = RainGenerator(TestRainRater.start + 30 * 60, time_increment=1,
+                                       rain_increment=0)
+        rain_generator.rain = 0.01
+        N = 7200
+        t0 = time.time()
+        for record in rain_generator:
+            rain_rater.add_loop_packet(record)
+            rate = rain_rater.get_scalar('rainRate', record, self.db_manager)
+            N -= 1
+            if not N:
+                break
+        t1 = time.time()
+        log.info("RainRater: 7200 1-second packets in %.3f seconds", t1 - t0)
+
+        # The window should hold exactly one packet per second
+        self.assertEqual(len(rain_rater.rain_events), TestRainRater.rain_period + 1)
+        # Each second drops 0.01", so the rate is 36 inches per hour
+        self.assertAlmostEqual(rate[0], 36.0, 6)
+        self.assertEqual(rate[1:], ('inch_per_hour', 'group_rainrate'))
+
 
 class TestDelta(unittest.TestCase):
     """Test XTypes extension 'Delta'."""
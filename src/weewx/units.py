@@ -11,10 +11,13 @@
 # The doctest examples work under Python 3 only!!
 #
 
+import functools
+import itertools
 import json
 import locale
 import logging
 import math
+import re
 import time
 
 import weeutil.weeutil
@@ -342,133 +345,181 @@ std_groups = {
     weewx.METRICWX: MetricWXUnits
 }
 
-# Conversion functions to go from one unit type to another.
+class Affine:
+    """A unit conversion of the form (x * scale + offset) / divisor.
+
+    Steps that would do nothing are skipped, so the results are exactly the same as the
+    equivalent expression written out by hand. Unlike a plain function, an instance can also
+    convert a whole list in one pass.
+
+    Example:
+    >>> FtoC_affine = Affine(offset=-32.0, divisor=1.8)
+    >>> print("%.1f" % FtoC_affine(212.0))
+    100.0
+    >>> print(FtoC_affine.convert_list([32.0, None, 212.0]))
+    [0.0, None, 100.0]
+    """
+
+    __slots__ = ('scale', 'offset', 'divisor')
+
+    def __init__(self, scale=1, offset=0, divisor=1):
+        self.scale = scale
+        self.offset = offset
+        self.divisor = divisor
+
+    def __call__(self, x):
+        if self.divisor == 1:
+            if self.offset == 0:
+                return x * self.scale
+            return x * self.scale + self.offset
+        if self.offset == 0:
+            return x * self.scale / self.divisor
+        return (x * self.scale + self.offset) / self.divisor
+
+    def convert_list(self, values):
+        """Convert a list of values. Values of None are left alone."""
+        scale, offset, divisor = self.scale, self.offset, self.divisor
+        if divisor == 1:
+            if offset == 0:
+                return [x * scale if x is not None else None for x in values]
+            return [x * scale + offset if x is not None else None for x in values]
+        if offset == 0:
+            return [x * scale / divisor if x is not None else None for x in values]
+        return [(x * scale + offset) / divisor if x is not None else None for x in values]
+
+    def __repr__(self):
+        return "Affine(scale=%r, offset=%r, divisor=%r)" % (self.scale, self.offset, self.divisor)
+
+
+# Conversion functions to go from one unit type to another. Conversions that are affine use
+# class Affine, so lists of values can be converted in a single pass. Others, such as time
+# conversions, are plain functions that get applied element by element.
 conversionDict = {
-    'bit'              : {'byte'             : lambda x : x / 8},
-    'byte'             : {'bit'              : lambda x : x * 8},
-    'cm'               : {'inch'             : lambda x : x / CM_PER_INCH,
-                          'mm'               : lambda x : x * 10.0},
-    'cm_per_hour'      : {'inch_per_hour'    : lambda x : x * 0.393700787,
-                          'mm_per_hour'      : lambda x : x * 10.0},
-    'cubic_foot'       : {'gallon'           : lambda x : x * 7.48052,
-                          'litre'            : lambda x : x * 28.3168,
-                          'liter'            : lambda x : x * 28.3168},
-    'day'              : {'second'           : lambda x : x * SECS_PER_DAY,
-                          'minute'           : lambda x : x*1440.0,
-                          'hour'             : lambda x : x*24.0},
+    'bit'              : {'byte'             : Affine(divisor=8)},
+    'byte'             : {'bit'              : Affine(scale=8)},
+    'cm'               : {'inch'             : Affine(divisor=CM_PER_INCH),
+                          'mm'               : Affine(scale=10.0)},
+    'cm_per_hour'      : {'inch_per_hour'    : Affine(scale=0.393700787),
+                          'mm_per_hour'      : Affine(scale=10.0)},
+    'cubic_foot'       : {'gallon'           : Affine(scale=7.48052),
+                          'litre'            : Affine(scale=28.3168),
+                          'liter'            : Affine(scale=28.3168)},
+    'day'              : {'second'           : Affine(scale=SECS_PER_DAY),
+                          'minute'           : Affine(scale=1440.0),
+                          'hour'             : Affine(scale=24.0)},
     'degree_angle'     : {'radian'           : math.radians},
-    'degree_C'         : {'degree_F'         : CtoF,
-                          'degree_E'         : CtoE,
-                          'degree_K'         : CtoK},
-    'degree_C_day'     : {'degree_F_day'     : lambda x : x * (9.0/5.0)},
+    'degree_C'         : {'degree_F'         : Affine(scale=1.8, offset=32.0),
+                          'degree_E'         : Affine(scale=7.0 / 5.0, offset=16.0),
+                          'degree_K'         : Affine(offset=273.15)},
+    'degree_C_day'     : {'degree_F_day'     : Affine(scale=9.0 / 5.0)},
     'degree_E'         : {'degree_C'         : EtoC,
-                          'degree_F'         : EtoF},
-    'degree_F'         : {'degree_C'         : FtoC,
-                          'degree_E'         : FtoE,
+                          'degree_F'         : Affine(scale=9.0, offset=80.0, divisor=7.0)},
+    'degree_F'         : {'degree_C'         : Affine(offset=-32.0, divisor=1.8),
+                          'degree_E'         : Affine(scale=7.0, offset=-80.0, divisor=9.0),
                           'degree_K'         : FtoK},
-    'degree_F_day'     : {'degree_C_day'     : lambda x : x * (5.0/9.0)},
-    'degree_K'         : {'degree_C'         : KtoC,
+    'degree_F_day'     : {'degree_C_day'     : Affine(scale=5.0 / 9.0)},
+    'degree_K'         : {'degree_C'         : Affine(offset=-273.15),
                           'degree_F'         : KtoF},
     'dublin_jd'        : {'unix_epoch'       : lambda x : (x-25567.5) * SECS_PER_DAY,
                           'unix_epoch_ms'    : lambda x : (x-25567.5) * SECS_PER_DAY * 1000,
                           'unix_epoch_ns'    : lambda x : (x-25567.5) * SECS_PER_DAY * 1e06},
-    'foot'             : {'meter'            : lambda x : x * METER_PER_FOOT},
-    'gallon'           : {'liter'            : lambda x : x * 3.78541,
-                          'litre'            : lambda x : x * 3.78541,
-                          'cubic_foot'       : lambda x : x * 0.133681},
-    'hour'             : {'second'           : lambda x : x*3600.0,
-                          'minute'           : lambda x : x*60.0,
-                          'day'              : lambda x : x/24.0},
-    'hPa'              : {'inHg'             : lambda x : x * INHG_PER_MBAR,
-                          'mmHg'             : lambda x : x * 0.75006168,
-                          'mbar'             : lambda x : x,
-                          'kPa'              : lambda x : x / 10.0},
-    'hPa_per_hour'     : {'inHg_per_hour'    : lambda x : x * INHG_PER_MBAR,
-                          'mmHg_per_hour'    : lambda x : x * 0.75006168,
-                          'mbar_per_hour'    : lambda x : x,
-                          'kPa_per_hour'     : lambda x : x / 10.0},
-    'inch'             : {'cm'               : lambda x : x * CM_PER_INCH,
-                          'mm'               : lambda x : x * MM_PER_INCH},
-    'inch_per_hour'    : {'cm_per_hour'      : lambda x : x * 2.54,
-                          'mm_per_hour'      : lambda x : x * 25.4},
-    'inHg'             : {'mbar'             : lambda x : x / INHG_PER_MBAR,
-                          'hPa'              : lambda x : x / INHG_PER_MBAR,
+    'foot'             : {'meter'            : Affine(scale=METER_PER_FOOT)},
+    'gallon'           : {'liter'            : Affine(scale=3.78541),
+                          'litre'            : Affine(scale=3.78541),
+                          'cubic_foot'       : Affine(scale=0.133681)},
+    'hour'             : {'second'           : Affine(scale=3600.0),
+                          'minute'           : Affine(scale=60.0),
+                          'day'              : Affine(divisor=24.0)},
+    'hPa'              : {'inHg'             : Affine(scale=INHG_PER_MBAR),
+                          'mmHg'             : Affine(scale=0.75006168),
+                          'mbar'             : Affine(),
+                          'kPa'              : Affine(divisor=10.0)},
+    'hPa_per_hour'     : {'inHg_per_hour'    : Affine(scale=INHG_PER_MBAR),
+                          'mmHg_per_hour'    : Affine(scale=0.75006168),
+                          'mbar_per_hour'    : Affine(),
+                          'kPa_per_hour'     : Affine(divisor=10.0)},
+    'inch'             : {'cm'               : Affine(scale=CM_PER_INCH),
+                          'mm'               : Affine(scale=MM_PER_INCH)},
+    'inch_per_hour'    : {'cm_per_hour'      : Affine(scale=2.54),
+                          'mm_per_hour'      : Affine(scale=25.4)},
+    'inHg'             : {'mbar'             : Affine(divisor=INHG_PER_MBAR),
+                          'hPa'              : Affine(divisor=INHG_PER_MBAR),
                           'kPa'              : lambda x : x / INHG_PER_MBAR / 10.0,
-                          'mmHg'             : lambda x : x * 25.4},
-    'inHg_per_hour'    : {'mbar_per_hour'    : lambda x : x / INHG_PER_MBAR,
-                          'hPa_per_hour'     : lambda x : x / INHG_PER_MBAR,
+                          'mmHg'             : Affine(scale=25.4)},
+    'inHg_per_hour'    : {'mbar_per_hour'    : Affine(divisor=INHG_PER_MBAR),
+                          'hPa_per_hour'     : Affine(divisor=INHG_PER_MBAR),
                           'kPa_per_hour'     : lambda x : x / INHG_PER_MBAR / 10.0,
-                          'mmHg_per_hour'    : lambda x : x * 25.4},
-    'kilowatt'         : {'watt'             : lambda x : x * 1000.0},
-    'kilowatt_hour'    : {'mega_joule'       : lambda x : x * 3.6,
-                          'watt_second'      : lambda x : x * 3.6e6,
-                          'watt_hour'        : lambda x : x * 1000.0},
-    'km'               : {'meter'            : lambda x : x * 1000.0,
-                          'mile'             : lambda x : x * 0.621371192},
-    'km_per_hour'      : {'mile_per_hour'    : kph_to_mph,
-                          'knot'             : kph_to_knot,
-                          'meter_per_second' : lambda x : x * 0.277777778},
-    'knot'             : {'mile_per_hour'    : lambda x : x * 1.15077945,
-                          'km_per_hour'      : lambda x : x * 1.85200,
-                          'meter_per_second' : lambda x : x * 0.514444444},
-    'knot2'             : {'mile_per_hour2'  : lambda x : x * 1.15077945,
-                           'km_per_hour2'     : lambda x : x * 1.85200,
-                           'meter_per_second2': lambda x : x * 0.514444444},
+                          'mmHg_per_hour'    : Affine(scale=25.4)},
+    'kilowatt'         : {'watt'             : Affine(scale=1000.0)},
+    'kilowatt_hour'    : {'mega_joule'       : Affine(scale=3.6),
+                          'watt_second'      : Affine(scale=3.6e6),
+                          'watt_hour'        : Affine(scale=1000.0)},
+    'km'               : {'meter'            : Affine(scale=1000.0),
+                          'mile'             : Affine(scale=0.621371192)},
+    'km_per_hour'      : {'mile_per_hour'    : Affine(scale=1000.0, divisor=METER_PER_MILE),
+                          'knot'             : Affine(scale=0.539956803),
+                          'meter_per_second' : Affine(scale=0.277777778)},
+    'knot'             : {'mile_per_hour'    : Affine(scale=1.15077945),
+                          'km_per_hour'      : Affine(scale=1.85200),
+                          'meter_per_second' : Affine(scale=0.514444444)},
+    'knot2'             : {'mile_per_hour2'  : Affine(scale=1.15077945),
+                           'km_per_hour2'     : Affine(scale=1.85200),
+                           'meter_per_second2': Affine(scale=0.514444444)},
     'kPa'              : {'inHg'             : lambda x: x * INHG_PER_MBAR * 10.0,
-                          'mmHg'             : lambda x: x * 7.5006168,
-                          'mbar'             : lambda x: x * 10.0,
-                          'hPa'              : lambda x: x * 10.0},
+                          'mmHg'             : Affine(scale=7.5006168),
+                          'mbar'             : Affine(scale=10.0),
+                          'hPa'              : Affine(scale=10.0)},
     'kPa_per_hour'     : {'inHg_per_hour'    : lambda x: x * INHG_PER_MBAR * 10.0,
-                          'mmHg_per_hour'    : lambda x: x * 7.5006168,
-                          'mbar_per_hour'    : lambda x: x * 10.0,
-                          'hPa_per_hour'     : lambda x: x * 10.0},
-    'liter'            : {'gallon'           : lambda x : x * 0.264172,
-                          'cubic_foot'       : lambda x : x * 0.0353147},
-    'mbar'             : {'inHg'             : lambda x : x * INHG_PER_MBAR,
-                          'mmHg'             : lambda x : x * 0.75006168,
-                          'hPa'              : lambda x : x,
-                          'kPa'              : lambda x : x / 10.0},
-    'mbar_per_hour'    : {'inHg_per_hour'    : lambda x : x * INHG_PER_MBAR,
-                          'mmHg_per_hour'    : lambda x : x * 0.75006168,
-                          'hPa_per_hour'     : lambda x : x,
-                          'kPa_per_hour'     : lambda x : x / 10.0},
-    'mega_joule'       : {'kilowatt_hour'    : lambda x : x / 3.6,
-                          'watt_hour'        : lambda x : x * 1000000 / 3600,
-                          'watt_second'      : lambda x : x * 1000000},
-    'meter'            : {'foot'             : lambda x : x / METER_PER_FOOT,
-                          'km'               : lambda x : x / 1000.0},
-    'meter_per_second' : {'mile_per_hour'    : mps_to_mph,
-                          'knot'             : mps_to_knot,
-                          'km_per_hour'      : lambda x : x * 3.6},
-    'meter_per_second2': {'mile_per_hour2'   : lambda x : x * 2.23693629,
-                          'knot2'            : lambda x : x * 1.94384449,
-                          'km_per_hour2'     : lambda x : x * 3.6},
-    'mile'             : {'km'               : lambda x : x * 1.609344},
-    'mile_per_hour'    : {'km_per_hour'      : lambda x : x * 1.609344,
-                          'knot'             : mph_to_knot,
-                          'meter_per_second' : lambda x : x * 0.44704},
-    'mile_per_hour2'   : {'km_per_hour2'     : lambda x : x * 1.609344,
-                          'knot2'            : lambda x : x * 0.868976242,
-                          'meter_per_second2': lambda x : x * 0.44704},
-    'minute'           : {'second'           : lambda x : x * 60.0,
-                          'hour'             : lambda x : x / 60.0,
-                          'day'              : lambda x : x / 1440.0},
-    'mm'               : {'inch'             : lambda x : x / MM_PER_INCH,
-                          'cm'               : lambda x : x * 0.10},
-    'mm_per_hour'      : {'inch_per_hour'    : lambda x : x * .0393700787,
-                          'cm_per_hour'      : lambda x : x * 0.10},
-    'mmHg'             : {'inHg'             : lambda x : x / MM_PER_INCH,
-                          'mbar'             : lambda x : x / 0.75006168,
-                          'hPa'              : lambda x : x / 0.75006168,
-                          'kPa'              : lambda x : x / 7.5006168},
-    'mmHg_per_hour'    : {'inHg_per_hour'    : lambda x : x / MM_PER_INCH,
-                          'mbar_per_hour'    : lambda x : x / 0.75006168,
-                          'hPa_per_hour'     : lambda x : x / 0.75006168,
-                          'kPa_per_hour'     : lambda x : x / 7.5006168},
+                          'mmHg_per_hour'    : Affine(scale=7.5006168),
+                          'mbar_per_hour'    : Affine(scale=10.0),
+                          'hPa_per_hour'     : Affine(scale=10.0)},
+    'liter'            : {'gallon'           : Affine(scale=0.264172),
+                          'cubic_foot'       : Affine(scale=0.0353147)},
+    'mbar'             : {'inHg'             : Affine(scale=INHG_PER_MBAR),
+                          'mmHg'             : Affine(scale=0.75006168),
+                          'hPa'              : Affine(),
+                          'kPa'              : Affine(divisor=10.0)},
+    'mbar_per_hour'    : {'inHg_per_hour'    : Affine(scale=INHG_PER_MBAR),
+                          'mmHg_per_hour'    : Affine(scale=0.75006168),
+                          'hPa_per_hour'     : Affine(),
+                          'kPa_per_hour'     : Affine(divisor=10.0)},
+    'mega_joule'       : {'kilowatt_hour'    : Affine(divisor=3.6),
+                          'watt_hour'        : Affine(scale=1000000, divisor=3600),
+                          'watt_second'      : Affine(scale=1000000)},
+    'meter'            : {'foot'             : Affine(divisor=METER_PER_FOOT),
+                          'km'               : Affine(divisor=1000.0)},
+    'meter_per_second' : {'mile_per_hour'    : Affine(scale=3600.0, divisor=METER_PER_MILE),
+                          'knot'             : Affine(scale=1.94384449),
+                          'km_per_hour'      : Affine(scale=3.6)},
+    'meter_per_second2': {'mile_per_hour2'   : Affine(scale=2.23693629),
+                          'knot2'            : Affine(scale=1.94384449),
+                          'km_per_hour2'     : Affine(scale=3.6)},
+    'mile'             : {'km'               : Affine(scale=1.609344)},
+    'mile_per_hour'    : {'km_per_hour'      : Affine(scale=1.609344),
+                          'knot'             : Affine(scale=0.868976242),
+                          'meter_per_second' : Affine(scale=0.44704)},
+    'mile_per_hour2'   : {'km_per_hour2'     : Affine(scale=1.609344),
+                          'knot2'            : Affine(scale=0.868976242),
+                          'meter_per_second2': Affine(scale=0.44704)},
+    'minute'           : {'second'           : Affine(scale=60.0),
+                          'hour'             : Affine(divisor=60.0),
+                          'day'              : Affine(divisor=1440.0)},
+    'mm'               : {'inch'             : Affine(divisor=MM_PER_INCH),
+                          'cm'               : Affine(scale=0.10)},
+    'mm_per_hour'      : {'inch_per_hour'    : Affine(scale=.0393700787),
+                          'cm_per_hour'      : Affine(scale=0.10)},
+    'mmHg'             : {'inHg'             : Affine(divisor=MM_PER_INCH),
+                          'mbar'             : Affine(divisor=0.75006168),
+                          'hPa'              : Affine(divisor=0.75006168),
+                          'kPa'              : Affine(divisor=7.5006168)},
+    'mmHg_per_hour'    : {'inHg_per_hour'    : Affine(divisor=MM_PER_INCH),
+                          'mbar_per_hour'    : Affine(divisor=0.75006168),
+                          'hPa_per_hour'     : Affine(divisor=0.75006168),
+                          'kPa_per_hour'     : Affine(divisor=7.5006168)},
     'radian'           : {'degree_angle'     : math.degrees},
-    'second'           : {'hour'             : lambda x : x/3600.0,
-                          'minute'           : lambda x : x/60.0,
-                          'day'              : lambda x : x / SECS_PER_DAY},
+    'second'           : {'hour'             : Affine(divisor=3600.0),
+                          'minute'           : Affine(divisor=60.0),
+                          'day'              : Affine(divisor=SECS_PER_DAY)},
     'unix_epoch'       : {'dublin_jd'        : lambda x: x / SECS_PER_DAY + 25567.5,
                           'unix_epoch_ms'    : lambda x : x * 1000,
                           'unix_epoch_ns'    : lambda x : x * 1000000},
@@ -478,21 +529,56 @@ conversionDict = {
     'unix_epoch_ns'    : {'dublin_jd'        : lambda x: x / (SECS_PER_DAY * 1e06) + 25567.5,
                           'unix_epoch'       : lambda x : x / 1e06,
                           'unix_epoch_ms'    : lambda x : x / 1000},
-    'watt'             : {'kilowatt'         : lambda x : x / 1000.0},
-    'watt_hour'        : {'kilowatt_hour'    : lambda x : x / 1000.0,
-                          'mega_joule'       : lambda x : x * 0.0036,
-                          'watt_second'      : lambda x : x * 3600.0},
-    'watt_second'      : {'kilowatt_hour'    : lambda x : x / 3.6e6,
-                          'mega_joule'       : lambda x : x / 1000000,
-                          'watt_hour'        : lambda x : x / 3600.0},
+    'watt'             : {'kilowatt'         : Affine(divisor=1000.0)},
+    'watt_hour'        : {'kilowatt_hour'    : Affine(divisor=1000.0),
+                          'mega_joule'       : Affine(scale=0.0036),
+                          'watt_second'      : Affine(scale=3600.0)},
+    'watt_second'      : {'kilowatt_hour'    : Affine(divisor=3.6e6),
+                          'mega_joule'       : Affine(divisor=1000000),
+                          'watt_hour'        : Affine(divisor=3600.0)},
 }
 
 
+class _VersionedDict(dict):
+    """A dictionary that counts the changes made to it, so anything derived from it can tell
+    when it is out of date."""
+
+    version = 0
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.version += 1
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.version += 1
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.version += 1
+
+    def setdefault(self, key, default=None):
+        self.version += 1
+        return super().setdefault(key, default)
+
+    def pop(self, *args):
+        self.version += 1
+        return super().pop(*args)
+
+    def popitem(self):
+        self.version += 1
+        return super().popitem()
+
+    def clear(self):
+        super().clear()
+        self.version += 1
+
+
 # These used to hold default values for formats and labels, but that has since been moved
 # to weewx.defaults. However, they are still used by modules that extend the unit system
 # programmatically.
-default_unit_format_dict = {}
-default_unit_label_dict = {}
+default_unit_format_dict = _VersionedDict()
+default_unit_label_dict = _VersionedDict()
 
 DEFAULT_DELTATIME_FORMAT = "%(day)d%(day_label)s, " \
                            "%(hour)d%(hour_label)s, " \
@@ -580,6 +666,34 @@ UnknownType = UnknownObsType
 #                        class Formatter
 #==============================================================================
 
+# Matches a format string holding a single numeric conversion, such as "%.1f" or "%03d hours"
+_simple_format_re = re.compile(r'^([^%]*)(%[-#0 +]*[0-9]*(?:\.[0-9]+)?[eEfFgGdiu])([^%]*)$')
+
+
+def _compile_format(format_string, localize=True):
+    """Return a function that formats a single scalar value using format_string.
+
+    If localization is requested, the results are the same as from
+    locale.format_string(format_string, val), but simple formats avoid having to parse
+    format_string on every call.
+    """
+    if not localize:
+        return format_string.__mod__
+    match = _simple_format_re.match(format_string)
+    if not match:
+        return functools.partial(locale.format_string, format_string)
+    prefix, spec, suffix = match.groups()
+
+    def format_func(val):
+        formatted = spec % val
+        if '.' in formatted:
+            # The decimal point must be looked up each time, because the locale can change.
+            formatted = formatted.replace('.', locale.localeconv()['decimal_point'])
+        return prefix + formatted + suffix
+
+    return format_func
+
+
 class Formatter:
     """Holds formatting information for the various unit types. """
 
@@ -607,6 +721,10 @@ class Formatter:
         self.time_format_dict = time_format_dict or {}
         self.ordinate_names    = ordinate_names or DEFAULT_ORDINATE_NAMES
         self.deltatime_format_dict = deltatime_format_dict or {}
+        # Resolved formatting functions and labels. See _get_format_func() and _get_labels().
+        self._format_cache = {}
+        self._label_cache = {}
+        self._cache_stamp = None
 
     @staticmethod
     def fromSkinDict(skin_dict):
@@ -685,6 +803,47 @@ class Formatter:
             # No singular/plural version. It's just a string. Return it.
             return label
 
+    def _check_cache(self):
+        """Discard the resolved formats and labels if the custom unit dictionaries have been
+        changed since they were cached."""
+        stamp = (default_unit_format_dict.version, default_unit_label_dict.version)
+        if stamp != self._cache_stamp:
+            self._format_cache.clear()
+            self._label_cache.clear()
+            self._cache_stamp = stamp
+
+    def _get_format_func(self, unit, context, localize):
+        """Return a function that formats a scalar value in the given unit and context,
+        without a label. The function is resolved once, then cached."""
+        key = (unit, context, localize)
+        try:
+            return self._format_cache[key]
+        except KeyError:
+            pass
+        if unit in {"unix_epoch", "unix_epoch_ms", "unix_epoch_ns"}:
+            time_format = self.time_format_dict.get(context, "%d-%b-%Y %H:%M")
+            divisor = {"unix_epoch_ms": 1000.0, "unix_epoch_ns": 1000000.0}.get(unit)
+            if divisor:
+                def format_func(t):
+                    return time.strftime(time_format, time.localtime(t / divisor))
+            else:
+                def format_func(t):
+                    return time.strftime(time_format, time.localtime(t))
+        else:
+            format_func = _compile_format(self.get_format_string(unit), localize)
+        self._format_cache[key] = format_func
+        return format_func
+
+    def _get_labels(self, unit):
+        """Return the singular and plural labels for a unit as a 2-way tuple."""
+        try:
+            return self._label_cache[unit]
+        except KeyError:
+            labels = (self.get_label_string(unit, plural=False),
+                      self.get_label_string(unit, plural=True))
+            self._label_cache[unit] = labels
+            return labels
+
     def toString(self, val_t, context='current', addLabel=True,
                  useThisFormat=None, None_string=None,
                  localize=True):
@@ -728,7 +887,17 @@ class Formatter:
 
         if type(val_t) is UnknownObsType:
             return str(val_t)
-        elif val_t is None or val_t[0] is None:
+
+        self._check_cache()
+
+        # Fast path: a plain number (or time) using the format from the skin
+        if useThisFormat is None and val_t is not None and type(val_t[0]) in (int, float):
+            val_str = self._get_format_func(val_t[1], context, localize)(val_t[0])
+            if addLabel and val_t[1] not in {"unix_epoch", "unix_epoch_ms", "unix_epoch_ns"}:
+                val_str += self._get_labels(val_t[1])[val_t[0] != 1]
+            return val_str
+
+        if val_t is None or val_t[0] is None:
             if None_string is None:
                 val_str = self.unit_format_dict.get('NONE', u'N/A')
             else:
@@ -870,6 +1039,8 @@ class Converter:
         unit type ('mbar')"""
 
         self.group_unit_dict  = group_unit_dict
+        # Key is (unit, unit_group), value is (target unit, conversion function)
+        self._conversion_cache = {}
 
     @staticmethod
     def fromSkinDict(skin_dict):
@@ -922,12 +1093,39 @@ class Converter:
         """
         if val_t[1] is None and val_t[2] is None:
             return val_t
+        try:
+            new_unit_type, conversion_func = self._conversion_cache[(val_t[1], val_t[2])]
+        except KeyError:
+            new_unit_type, conversion_func = self._get_conversion(val_t[1], val_t[2])
+        if conversion_func is None:
+            # Either no conversion is necessary, or it is a complex conversion
+            return convert(val_t, new_unit_type)
+        if isinstance(val_t[0], (list, tuple)):
+            if type(conversion_func) is Affine:
+                new_val = conversion_func.convert_list(val_t[0])
+            else:
+                new_val = [conversion_func(x) if x is not None else None for x in val_t[0]]
+        else:
+            new_val = conversion_func(val_t[0]) if val_t[0] is not None else None
+        return ValueTuple(new_val, new_unit_type, val_t[2])
+
+    def _get_conversion(self, unit, unit_group):
+        """Look up the target unit for a unit group, and the function that converts to it
+        from the given unit, then cache them."""
         # Determine which units (eg, "mbar") this group should be in.
         # If the user has not specified anything, then fall back to US Units.
-        new_unit_type = self.group_unit_dict.get(val_t[2], USUnits[val_t[2]])
-        # Now convert to this new unit type:
-        new_val_t = convert(val_t, new_unit_type)
-        return new_val_t
+        new_unit_type = self.group_unit_dict.get(unit_group, USUnits[unit_group])
+        if unit == new_unit_type or new_unit_type in complex_conversions:
+            conversion_func = None
+        else:
+            # An exception of type KeyError will occur if the units are invalid
+            try:
+                conversion_func = conversionDict[unit][new_unit_type]
+            except KeyError:
+                log.debug("Unable to convert from %s to %s", unit, new_unit_type)
+                raise
+        self._conversion_cache[(unit, unit_group)] = (new_unit_type, conversion_func)
+        return new_unit_type, conversion_func
 
     def convertDict(self, obs_dict):
         """Convert an observation dictionary into the target unit system.
@@ -1079,6 +1277,8 @@ class ValueHelper:
                                         None_string=None_string)
 
     def json(self, **kwargs):
+        if not kwargs and isinstance(self.raw, (list, tuple)):
+            return '[' + ', '.join(_json_values(self.raw)) + ']'
         return json.dumps(self.raw, cls=ComplexEncoder, **kwargs)
 
     def round(self, ndigits=None):
@@ -1185,17 +1385,25 @@ class SeriesHelper:
         self.stop = stop
         self.data = data
 
-    def json(self, order_by='row', **kwargs):
+    def json(self, order_by='row', ndigits=None, time_unit=None, **kwargs):
         """Return the data in this series as JSON.
 
         Args:
             order_by (str): A string that determines whether the generated string is ordered by
                 row or column. Either 'row' or 'column'.
-            **kwargs (Any): Any extra arguments are passed on to json.loads()
+            ndigits (int|None): If given, round the data part to this many decimal digits.
+            time_unit (str|None): If given, convert the start and stop times to this unit
+                (e.g., 'unix_epoch_ms').
+            **kwargs (Any): Any extra arguments are passed on to json.dumps()
 
         Returns:
             str. A string with the encoded JSON.
         """
+        if not kwargs and self._columns_are_lists():
+            # Fast path. Encode directly from the series buffers.
+            return ''.join(self.iter_json(order_by, ndigits, time_unit))
+        if ndigits is not None or time_unit:
+            return self._with_options(ndigits, time_unit).json(order_by, **kwargs)
 
         if order_by == 'row':
             if self.start and self.stop:
@@ -1216,6 +1424,68 @@ class SeriesHelper:
 
         return json.dumps(json_data, cls=ComplexEncoder, **kwargs)
 
+    def iter_json(self, order_by='row', ndigits=None, time_unit=None, chunk_size=10000):
+        """Generate the JSON for this series in chunks.
+
+        The results, joined together, are the same as from json(). This allows a large series
+        to be written out without building one large string.
+
+        Args:
+            order_by (str): Either 'row' or 'column'.
+            ndigits (int|None): If given, round the data part to this many decimal digits.
+            time_unit (str|None): If given, convert the start and stop times to this unit.
+            chunk_size (int): The number of values to encode at a time.
+
+        Yields:
+            str. Successive pieces of the JSON string.
+        """
+        if time_unit:
+            series = self._with_options(None, time_unit)
+            yield from series.iter_json(order_by, ndigits, chunk_size=chunk_size)
+            return
+        if not self._columns_are_lists():
+            yield self.json(order_by, ndigits)
+            return
+        columns = [vh.raw for vh in (self.start, self.stop) if vh] + [self.data.raw]
+        # Only the data part gets rounded
+        digits = [None] * (len(columns) - 1) + [ndigits]
+        if order_by == 'row':
+            # zip() stops at the shortest column, so do the same
+            n = min(len(column) for column in columns)
+            yield '['
+            for i in range(0, n, chunk_size):
+                encoded = [_json_values(column[i:i + chunk_size], nd)
+                           for column, nd in zip(columns, digits)]
+                yield ('[' if i == 0 else ', [') \
+                    + '], ['.join(map(', '.join, zip(*encoded))) + ']'
+            yield ']'
+        elif order_by == 'column':
+            yield '['
+            for j, (column, nd) in enumerate(zip(columns, digits)):
+                yield ', [' if j else '['
+                for i in range(0, len(column), chunk_size):
+                    yield (', ' if i else '') \
+                        + ', '.join(_json_values(column[i:i + chunk_size], nd))
+                yield ']'
+            yield ']'
+        else:
+            raise ValueError("Unknown option '%s' for parameter 'order_by'" % order_by)
+
+    def _columns_are_lists(self):
+        """True if the series can be encoded directly from its lists of values."""
+        return all(isinstance(vh.raw, (list, tuple))
+                   for vh in (self.start, self.stop, self.data) if vh)
+
+    def _with_options(self, ndigits, time_unit):
+        """Return a SeriesHelper with the data rounded and the times converted."""
+        start, stop, data = self.start, self.stop, self.data
+        if time_unit:
+            start = start.convert(time_unit) if start else start
+            stop = stop.convert(time_unit) if stop else stop
+        if ndigits is not None:
+            data = data.round(ndigits)
+        return SeriesHelper(start, stop, data)
+
     def round(self, ndigits=None):
         """
         Round the data part to ndigits number of decimal digits.
@@ -1454,8 +1724,11 @@ def convert(val_t, target_unit):
             raise
     # Are we converting a list, or a simple scalar?
     if isinstance(val_t[0], (list, tuple)):
-        # A list
-        new_val = [conversion_func(x) if x is not None else None for x in val_t[0]]
+        # A list. Affine conversions can do it in one pass.
+        if type(conversion_func) is Affine:
+            new_val = conversion_func.convert_list(val_t[0])
+        else:
+            new_val = [conversion_func(x) if x is not None else None for x in val_t[0]]
     else:
         # A scalar
         new_val = conversion_func(val_t[0]) if val_t[0] is not None else None
@@ -1651,6 +1924,60 @@ def as_value_tuple(record_dict, obs_type):
     return ValueTuple(val, unit_type, unit_group)
 
 
+# The JSON for numbers and None, where it differs from their repr()
+_json_special = {'None': 'null', 'nan': 'NaN', 'inf': 'Infinity', '-inf': '-Infinity'}
+
+
+def _json_values(values, ndigits=None):
+    """Encode each element of a list of values as JSON.
+
+    The results are the same as json.dumps(rounder(x, ndigits), cls=ComplexEncoder) for each
+    element x. However, lists that hold only floats, ints, and None are encoded without a
+    Python call per element. When rounding floats, they are formatted directly with ndigits
+    decimal digits, rather than rounded and then converted. Values that repr() would show in
+    exponent notation, or with fewer digits, are rounded and converted, as usual.
+
+    Args:
+        values (list|tuple): The values to be encoded.
+        ndigits (int|None): The number of decimal digits to round to, or None to not round.
+
+    Returns:
+        list[str]: The encoded values.
+    """
+    types = set(map(type, values))
+    if not types <= {float, int, type(None)}:
+        return [json.dumps(weeutil.weeutil.rounder(x, ndigits), cls=ComplexEncoder)
+                for x in values]
+    if ndigits is not None and ndigits > 0 and int not in types:
+        format_string = '%%.%df' % ndigits
+        if type(None) in types:
+            encoded = [format_string % x if x is not None else 'None' for x in values]
+        else:
+            encoded = list(map(format_string.__mod__, values))
+        # Strip trailing zeros the way repr() would, so 12.50 becomes 12.5 and 12.00 becomes 12.0
+        encoded = list(map(str.rstrip, encoded, itertools.repeat('0')))
+        encoded = [e + '0' if e[-1] == '.' else e for e in encoded]
+        # The formatting agrees with repr() only for values between 1e-4, below which repr()
+        # uses exponent notation, and the point where ndigits decimal digits are more than a
+        # float holds. Values outside that range are rounded and converted one by one.
+        nonzero = list(filter(None, values))
+        if nonzero:
+            smallest = min(map(abs, nonzero))
+            largest = max(map(abs, nonzero))
+            limit = min(1e16, 10.0 ** (15 - ndigits))
+            # A NaN can hide the others from min() and max()
+            if not 1e-4 <= smallest <= largest < limit:
+                encoded = [repr(round(x, ndigits))
+                           if x is not None and (0 < abs(x) < 1e-4 or abs(x) >= limit) else e
+                           for x, e in zip(values, encoded)]
+    else:
+        encoded = list(map(repr, weeutil.weeutil.rounder(values, ndigits)))
+    if type(None) in types or (float in types
+                               and any(special in encoded for special in _json_special)):
+        encoded = [_json_special.get(e, e) for e in encoded]
+    return encoded
+
+
 class ComplexEncoder(json.JSONEncoder):
     """Custom encoder that knows how to encode complex and polar objects"""
     def default(self, obj):
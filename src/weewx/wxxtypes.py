@@ -4,8 +4,9 @@
 #    See the file LICENSE.txt for your full rights.
 #
 """A set of XTypes extensions for calculating weather-related derived observation types."""
+import bisect
+import collections
 import logging
-import threading
 
 import weedb
 import weeutil.config
@@ -15,7 +16,7 @@ import weewx.units
 import weewx.uwxutils
 import weewx.wxformulas
 import weewx.xtypes
-from weeutil.weeutil import to_int, to_float, to_bool
+from weeutil.weeutil import to_int, to_float, to_bool, ForkSafeLock
 from weewx.units import ValueTuple, mps_to_mph, kph_to_mph, METER_PER_FOOT, CtoF
 
 log = logging.getLogger(__name__)
@@ -372,6 +373,68 @@ class PressureCooker(weewx.xtypes.XType):
         # Temperature 12 hours ago as a ValueTuple
         self.temp_12h_vt = None
 
+        # Time-ordered history of outTemp. The timestamps are kept in their own list, so they
+        # can be searched using bisect. Each entry in history_values is a two-way tuple
+        # (outTemp, usUnits).
+        self.history_ts = []
+        self.history_values = []
+        # The span of time over which the history is known to be complete. None means the
+        # history has not been loaded from the database yet.
+        self.history_start = None
+        self.history_stop = None
+        self.history_lock = ForkSafeLock()
+
+    def add_record(self, record):
+        """Add a new archive record to the outTemp history."""
+        with self.history_lock:
+            # Only extend a history that has already been loaded, and only with newer records.
+            if self.history_stop is None or record['dateTime'] <= self.history_stop:
+                return
+            self.history_ts.append(record['dateTime'])
+            self.history_values.append((record.get('outTemp'), record['usUnits']))
+            self.history_stop = record['dateTime']
+            # We only need enough history to look up the temperature 12 hours ago.
+            self._trim_history(record['dateTime'] - 12 * 3600 - self.max_delta_12h)
+
+    def _trim_history(self, start_ts):
+        """Drop any history before start_ts."""
+        i = bisect.bisect_left(self.history_ts, start_ts)
+        if i:
+            del self.history_ts[:i]
+            del self.history_values[:i]
+        self.history_start = max(self.history_start, start_ts)
+
+    def _load_history(self, start_ts, stop_ts, dbmanager):
+        """Replace the history with outTemp from the database between start_ts and stop_ts,
+        inclusive, using a single query."""
+        self.history_ts = []
+        self.history_values = []
+        try:
+            for row in dbmanager.genSql("SELECT dateTime, usUnits, outTemp FROM %s "
+                                        "WHERE dateTime>=? AND dateTime<=? "
+                                        "ORDER BY dateTime ASC;"
+                                        % dbmanager.table_name, (start_ts, stop_ts)):
+                self.history_ts.append(row[0])
+                self.history_values.append((row[2], row[1]))
+        except weedb.DatabaseError as e:
+            # Most likely, the database does not have a type 'outTemp'
+            log.debug("Database error while loading outTemp history: '%s'" % e)
+        self.history_start = start_ts
+        self.history_stop = stop_ts
+
+    def _lookup_history(self, ts, max_delta):
+        """Return the entry in the history closest to ts, but no further away than max_delta.
+        Return None if there is no such entry."""
+        i = bisect.bisect_left(self.history_ts, ts)
+        # The closest entry is either at i, or just before it. Like the database, prefer the
+        # earlier entry if they are equally distant.
+        best = None
+        for j in (i - 1, i):
+            if 0 <= j < len(self.history_ts) and abs(self.history_ts[j] - ts) <= max_delta:
+                if best is None or abs(self.history_ts[j] - ts) < abs(self.history_ts[best] - ts):
+                    best = j
+        return self.history_values[best] if best is not None else None
+
     def _get_temperature_12h(self, ts, dbmanager):
         """Get the temperature as a ValueTuple from 12 hours ago. The ValueTuple will use the same
          unit system as the database. The value will be None if no temperature is available.
@@ -384,13 +447,20 @@ class PressureCooker(weewx.xtypes.XType):
         if self.ts_12h is None \
                 or self.temp_12h_vt is None \
                 or abs(self.ts_12h - ts_12h) > self.max_delta_12h:
-            # Hit the database to get a newer temperature.
-            record = dbmanager.getRecord(ts_12h, max_delta=self.max_delta_12h)
-            if record and 'outTemp' in record:
-                # Figure out what unit the record is in ...
-                unit = weewx.units.getStandardUnitType(record['usUnits'], 'outTemp')
+            with self.history_lock:
+                # If the history does not cover the time we need, load it from the database. It
+                # will then cover every record up to the present one, so it can serve lookups
+                # for almost 12 hours of records, without going back to the database.
+                if self.history_start is None \
+                        or ts_12h - self.max_delta_12h < self.history_start \
+                        or ts_12h + self.max_delta_12h > self.history_stop:
+                    self._load_history(ts_12h - self.max_delta_12h, ts, dbmanager)
+                entry = self._lookup_history(ts_12h, self.max_delta_12h)
+            if entry:
+                # Figure out what unit the temperature is in ...
+                unit = weewx.units.getStandardUnitType(entry[1], 'outTemp')
                 # ... then form a ValueTuple.
-                self.temp_12h_vt = weewx.units.ValueTuple(record['outTemp'], *unit)
+                self.temp_12h_vt = weewx.units.ValueTuple(entry[0], *unit)
             else:
                 # Invalidate the temperature ValueTuple from 12h ago
                 self.temp_12h_vt = None
@@ -497,11 +567,13 @@ class RainRater(weewx.xtypes.XType):
 
         self.rain_period = rain_period
         self.retain_period = retain_period
-        # This will be a list of two-way tuples (timestamp, rain)
-        self.rain_events = []
+        # This will be a time-ordered deque of two-way tuples (timestamp, rain)
+        self.rain_events = collections.deque()
+        # Running sum of the rain in self.rain_events
+        self.rain_sum = 0.0
         self.unit_system = None
         self.augmented = False
-        self.run_lock = threading.Lock()
+        self.run_lock = ForkSafeLock()
 
     def add_loop_packet(self, packet):
         """Process LOOP packets, adding them to the list of recent rain events."""
@@ -509,8 +581,25 @@ class RainRater(weewx.xtypes.XType):
             self._add_loop_packet(packet)
 
     def _add_loop_packet(self, packet):
-        # Was there any rain? If so, convert the rain to the unit system we are using,
-        # then intern it
+        event = self._make_event(packet)
+        if event is None:
+            return
+
+        # Add it to the deque of rain events, keeping the deque in time order. Almost always,
+        # the new event will be the latest, so it can just be appended.
+        if not self.rain_events or event[0] >= self.rain_events[-1][0]:
+            self.rain_events.append(event)
+        else:
+            self.rain_events.insert(bisect.bisect(self.rain_events, event), event)
+        self.rain_sum += event[1]
+
+        # Trim any old events:
+        self._expire(packet['dateTime'] - self.rain_period)
+
+    def _make_event(self, packet):
+        """Convert a packet to a (timestamp, rain) tuple in the unit system we are using.
+        Return None if there was no rain."""
+        # Was there any rain? If so, convert the rain to the unit system we are using.
         if 'rain' in packet and packet['rain']:
             if self.unit_system is None:
                 # Adopt the unit system of the first record.
@@ -520,12 +609,16 @@ class RainRater(weewx.xtypes.XType):
             u, g = weewx.units.getStandardUnitType(packet['usUnits'], 'rain')
             # Convert to the unit system that we are using
             rain = weewx.units.convertStd((packet['rain'], u, g), self.unit_system)[0]
-            # Add it to the list of rain events
-            self.rain_events.append((packet['dateTime'], rain))
+            return packet['dateTime'], rain
+        return None
 
-            # Trim any old packets:
-            self.rain_events = [x for x in self.rain_events
-                                if x[0] >= packet['dateTime'] - self.rain_period]
+    def _expire(self, cutoff_ts):
+        """Drop all events older than cutoff_ts, keeping the running sum up to date."""
+        while self.rain_events and self.rain_events[0][0] < cutoff_ts:
+            self.rain_sum -= self.rain_events.popleft()[1]
+        if not self.rain_events:
+            # Nothing left. Reset the sum, so rounding errors cannot accumulate.
+            self.rain_sum = 0.0
 
     def get_scalar(self, key, record, db_manager, **option_dict):
         """Calculate the rainRate"""
@@ -538,9 +631,15 @@ class RainRater(weewx.xtypes.XType):
                 self._setup(record['dateTime'], db_manager)
                 self.augmented = True
 
-            # Sum the rain events within the time window...
-            rainsum = sum(x[1] for x in self.rain_events
-                          if x[0] > record['dateTime'] - self.rain_period)
+            # Start with the sum of all retained rain events, then back out any events that
+            # fall on or before the beginning of the time window. Because the deque is time
+            # ordered, there are rarely more than one or two of them.
+            window_start = record['dateTime'] - self.rain_period
+            rainsum = self.rain_sum
+            for event in self.rain_events:
+                if event[0] > window_start:
+                    break
+                rainsum -= event[1]
             # ...then divide by the period and scale to an hour
             val = 3600 * rainsum / self.rain_period
             # Get the unit and unit group for rainRate
@@ -555,9 +654,13 @@ class RainRater(weewx.xtypes.XType):
 
         # Query the database for only the events before what we already have
         if self.rain_events:
-            first_event = min(x[0] for x in self.rain_events)
+            first_event = self.rain_events[0][0]
             stop_ts = min(first_event, stop_ts)
 
+        # Timestamps of the events we already have
+        seen = {x[0] for x in self.rain_events}
+        new_events = []
+
         # Get all rain events since the window start from the database. Put it in
         # a 'try' block because the database may not have a 'rain' field.
         try:
@@ -567,16 +670,21 @@ class RainRater(weewx.xtypes.XType):
                 # Unpack the row:
                 time_ts, unit_system, rain = row
                 # Skip the row if we already have it in rain_events
-                if not any(x[0] == time_ts for x in self.rain_events):
-                    self._add_loop_packet({'dateTime': time_ts,
-                                           'usUnits': unit_system,
-                                           'rain': rain})
+                if time_ts not in seen:
+                    event = self._make_event({'dateTime': time_ts,
+                                              'usUnits': unit_system,
+                                              'rain': rain})
+                    if event is not None:
+                        seen.add(time_ts)
+                        new_events.append(event)
         except weedb.DatabaseError as e:
             log.debug("Database error while initializing rainRate: '%s'" % e)
 
-        # It's not strictly necessary to sort the rain event list for things to work, but it
-        # makes things easier to debug
-        self.rain_events.sort(key=lambda x: x[0])
+        if new_events:
+            # Merge the events from the database with the ones we already have, then
+            # recalculate the running sum from scratch.
+            self.rain_events = collections.deque(sorted(new_events + list(self.rain_events)))
+            self.rain_sum = sum(x[1] for x in self.rain_events)
 
 
 #
@@ -759,10 +867,15 @@ class StdPressureCooker(weewx.engine.StdService):
         # Add pressure_cooker to the XTypes system
         weewx.xtypes.xtypes.append(self.pressure_cooker)
 
+        self.bind(weewx.NEW_ARCHIVE_RECORD, self.new_archive_record)
+
     def shutDown(self):
         """Engine shutting down. """
         weewx.xtypes.xtypes.remove(self.pressure_cooker)
 
+    def new_archive_record(self, event):
+        self.pressure_cooker.add_record(event.record)
+
 
 class StdRainRater(weewx.engine.StdService):
     """"Instantiate and register the XTypes extension RainRater."""
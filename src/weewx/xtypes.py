@@ -79,6 +79,10 @@ def get_scalar(obs_type, record, db_manager=None, **option_dict):
     # Search the list, looking for a get_scalar() method that does not raise an UnknownType
     # exception
     for xtype in xtypes:
+        # Many xtypes only offer series and aggregates. Skip them, rather than paying for an
+        # UnknownType exception from the base class.
+        if getattr(xtype.get_scalar, '__func__', None) is XType.get_scalar:
+            continue
         try:
             # Try this function. Be prepared to catch the TypeError exception if it is a legacy
             # style XType that does not accept kwargs.
@@ -167,6 +171,78 @@ def has_data(obs_type, timespan, db_manager):
     return False
 
 
+def decimate(rows, column_of):
+    """Thin out a time series, keeping only the points that can make a difference to a line plot.
+
+    The function column_of() divides the time axis into columns. Typically, it gives the pixel
+    column in which a time will be drawn. Within each column, only the first, last, smallest, and
+    largest values of each run of non-null values are kept (sometimes called "M4" decimation).
+    These are enough to draw the same line. Of each run of null values, only the first and last
+    are kept, so breaks in the line stay where they were.
+
+    Args:
+        rows (iterable[tuple]): Tuples (start, stop, value), in order of time. The column is
+            chosen by the stop time.
+        column_of (callable): A function that returns the column of a time.
+
+    Yields:
+        tuple: The tuples that were kept, in order of time.
+
+    Example:
+        >>> values = [3, 1, 4, 1, 5, 9, 2, None, None, None, 6]
+        >>> rows = [(i - 1, i, v) for i, v in enumerate(values)]
+        >>> [row[2] for row in decimate(rows, lambda t: t // 10)]
+        [3, 1, 9, 2, None, None, 6]
+    """
+    current = None
+    first = last = lowest = highest = None
+    null_first = null_last = None
+    for row in rows:
+        value = row[2]
+        if value is None:
+            if first is not None:
+                yield from _m4(first, lowest, highest, last)
+                first = None
+            if null_first is None:
+                null_first = row
+            null_last = row
+            continue
+        if null_first is not None:
+            yield null_first
+            if null_last is not null_first:
+                yield null_last
+            null_first = None
+        i = column_of(row[1])
+        if first is not None and i != current:
+            yield from _m4(first, lowest, highest, last)
+            first = None
+        if first is None:
+            current = i
+            first = lowest = highest = row
+        elif value < lowest[2]:
+            lowest = row
+        elif value > highest[2]:
+            highest = row
+        last = row
+    if first is not None:
+        yield from _m4(first, lowest, highest, last)
+    if null_first is not None:
+        yield null_first
+        if null_last is not null_first:
+            yield null_last
+
+
+def _m4(first, lowest, highest, last):
+    """Return the distinct rows among the first, lowest, highest and last, in order of time."""
+    kept = [first]
+    for row in sorted((lowest, highest), key=lambda r: r[1]):
+        if row is not kept[-1]:
+            kept.append(row)
+    if last is not kept[-1]:
+        kept.append(last)
+    return kept
+
+
 #
 # ######################## Class ArchiveTable ##############################
 #
@@ -182,7 +258,9 @@ class ArchiveTable(XType):
         The general strategy is that if aggregation is asked for, chop the series up into separate
         chunks, calculating the aggregate for each chunk. Then assemble the results.
 
-        If no aggregation is called for, just return the data directly out of the database.
+        If no aggregation is called for, just return the data directly out of the database. In
+        this case, option 'decimate_column' can be used to thin out the data as they are read.
+        It is a function that gives the column of a time. See function decimate().
         """
 
         startstamp, stopstamp = timespan
@@ -238,7 +316,8 @@ class ArchiveTable(XType):
 
             # Hit the database. It's possible the type is not in the database, so be prepared
             # to catch a NoColumnError:
-            try:
+            def gen_rows():
+                nonlocal std_unit_system
                 for record in db_manager.genSql(sql_str, (startstamp, stopstamp)):
 
                     # Unpack the record
@@ -250,8 +329,17 @@ class ArchiveTable(XType):
                                                            "within an aggregation interval.")
                     else:
                         std_unit_system = unit_system
-                    start_vec.append(timestamp - interval * 60)
-                    stop_vec.append(timestamp)
+                    yield timestamp - interval * 60, timestamp, value
+
+            rows = gen_rows()
+            decimate_column = option_dict.get('decimate_column')
+            if decimate_column:
+                rows = decimate(rows, decimate_column)
+
+            try:
+                for start, stop, value in rows:
+                    start_vec.append(start)
+                    stop_vec.append(stop)
                     data_vec.append(value)
             except weedb.NoColumnError:
                 # The sql type doesn't exist. Convert to an UnknownType error
@@ -35,6 +35,10 @@ from weeutil.weeutil import TimeSpan
 
 class ExtendedStatistics(SearchList):
 
+    # The results of get_extension_list() depend only on the timespan and binding, so they can be
+    # shared between templates.
+    cacheable = True
+
     def __init__(self, generator):
         SearchList.__init__(self, generator)
 
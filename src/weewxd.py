@@ -31,6 +31,7 @@ usagestr = """%(prog)s --help
                  [--exit]
                  [--loop-on-init]
                  [--log-label=LABEL]
+                 [--profile-startup]
 """
 
 epilog = "Specify either the positional argument FILENAME, " \
@@ -58,6 +59,9 @@ def main():
                         help="Retry forever if device is not ready on startup")
     parser.add_argument("-n", "--log-label", dest="log_label", metavar="LABEL", default="weewxd",
                         help="Label to use in syslog entries")
+    parser.add_argument("--profile-startup", action="store_true", dest="profile_startup",
+                        help="Log how long each step of the startup takes, including module "
+                             "imports, then exit after the first LOOP packet")
     parser.add_argument("config_arg", nargs='?', metavar="FILENAME")
 
     # Get the command line options and arguments:
@@ -73,6 +77,12 @@ def main():
         print(epilog, file=sys.stderr)
         sys.exit(weewx.CMD_ERROR)
 
+    if namespace.profile_startup:
+        startup_profile = weeutil.startup.StartupProfile(weewx.launchtime_ts)
+        startup_profile.start()
+    else:
+        startup_profile = None
+
     config_path, config_dict, log = weeutil.startup.start_app(namespace.log_label,
                                                               __name__,
                                                               namespace.config_option,
@@ -118,13 +128,15 @@ def main():
             log.debug("Initializing engine")
 
             # Create and initialize the engine
-            engine = weewx.engine.StdEngine(config_dict)
+            engine = weewx.engine.StdEngine(config_dict, startup_profile)
 
             log.info("Starting up weewx version %s", weewx.__version__)
 
             # Start the engine. It should run forever unless an exception
             # occurs. Log it if the function returns.
             engine.run()
+            if startup_profile:
+                sys.exit(0)
             log.critical("Unexpected exit from main loop. Program exiting.")
 
         # Catch any console initialization error: